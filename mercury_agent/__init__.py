@@ -1 +0,0 @@
-from mercury_agent import procedures
@@ -14,12 +14,14 @@
 #    limitations under the License.
 
 import logging
+import threading
 import time
 
 from mercury.common.clients.rpc.backend import BackEndClient
 from mercury.common.exceptions import (
     MercuryCritical, MercuryGeneralException, MercuryConfigurationError)
 
+from mercury_agent import backend_client, procedures
 from mercury_agent.capabilities import runtime_capabilities
 from mercury_agent.configuration import get_configuration
 from mercury_agent.pong import spawn_pong_process
@@ -27,12 +29,15 @@ from mercury_agent.register import get_dhcp_ip, register
 from mercury_agent.remote_logging import MercuryLogHandler
 from mercury_agent.rpc import AgentService
 
-from mercury_agent.inspector import inspect
+from mercury_agent.inspector import cache, inspect
+from mercury_agent.inspector.instrumentation import STATS_KEY
 
 # Async Inspectors
 
 from mercury_agent.inspector.inspectors.async_inspectors.lldp import \
     LLDPInspector
+from mercury_agent.inspector.inspectors.async_inspectors.udev_watcher import \
+    UDevWatcher
 
 
 log = logging.getLogger(__name__)
@@ -62,31 +67,40 @@ class Agent(object):
                                      response_timeout=10,
                                      rcv_retry=3)
 
-    def run(self, dhcp_ip_method='simple'):
-        # TODO: Add other mechanisms for enumerating the devices public ip
-        log.debug('Agent: %s, Pong: %s' % (self.agent_bind_address,
-                                           self.pong_bind_address))
+    def inspect(self, incremental=False):
+        inspector_configuration = self.configuration.agent.inspector
+        device_info = inspect.inspect(
+            max_workers=inspector_configuration.max_workers,
+            timeout=inspector_configuration.timeout,
+            timeouts=inspector_configuration.timeouts,
+            incremental=incremental)
 
-        log.info('Running inspectors')
+        if inspector_configuration.cache_path:
+            inspect.save_cache(inspector_configuration.cache_path)
 
-        device_info = inspect.inspect()
+        return device_info
 
-        log.info('Registering device inventory for MercuryID {}'.format(
-            device_info['mercury_id']))
+    def load_cached_inspection(self):
+        """ Restore the inspection persisted by a previous agent process
+        running during this boot
 
-        log.info('Starting pong service')
-        spawn_pong_process(self.pong_bind_address)
-
-        log.info('Registering device')
+        :return: device_info or None
+        """
+        cache_path = self.configuration.agent.inspector.cache_path
+        if not cache_path:
+            return None
 
-        local_ip = get_dhcp_ip(device_info, method=dhcp_ip_method)
+        device_info, fingerprints = cache.load(cache_path)
+        if not device_info or 'mercury_id' not in device_info:
+            return None
 
-        # TODO: enumerate ipv6 addresses
-        local_ipv6 = None
+        return inspect.restore(device_info, fingerprints)
 
+    @staticmethod
+    def register(backend, device_info, local_ip, local_ipv6):
         while True:
             result = register(
-                self.backend,
+                backend,
                 device_info,
                 local_ip,
                 local_ipv6,
@@ -98,8 +112,83 @@ class Agent(object):
                 continue
 
             log.info('Device has been registered successfully')
+            backend_client.set_inventory_baseline(device_info)
             break
 
+    def revalidate(self, cached, dhcp_ip_method):
+        """ Re-inspect after registering a cached inspection. Only inspectors
+        whose sources have changed are run. If anything has changed, the
+        device is registered again.
+
+        :param cached: The cached device_info which was registered
+        :param dhcp_ip_method: See get_dhcp_ip
+        """
+        log.info('Revalidating cached inspection')
+        device_info = self.inspect(incremental=True)
+
+        changed = sorted(
+            k for k in set(cached) | set(device_info)
+            if k != STATS_KEY and cached.get(k) != device_info.get(k))
+        if not changed:
+            log.info('Cached inspection is current')
+            return
+
+        log.info('Inspection has changed since it was cached (%s), '
+                 're-registering', ', '.join(changed))
+
+        # The zmq socket owned by self.backend cannot be shared with the
+        # main thread
+        backend = BackEndClient(self.rpc_backend_url,
+                                linger=0,
+                                response_timeout=10,
+                                rcv_retry=3)
+        self.register(backend,
+                      device_info,
+                      get_dhcp_ip(device_info, method=dhcp_ip_method),
+                      None)
+
+        if self.log_handler is not None:
+            self.log_handler.set_mercury_id(device_info['mercury_id'])
+
+    def run(self, dhcp_ip_method='simple'):
+        # TODO: Add other mechanisms for enumerating the devices public ip
+        log.debug('Agent: %s, Pong: %s' % (self.agent_bind_address,
+                                           self.pong_bind_address))
+
+        procedures.load_capabilities()
+
+        device_info = self.load_cached_inspection()
+        if device_info:
+            log.info('Using inspection cached during this boot')
+            # global_device_info is updated in place by the revalidation,
+            # keep a copy of what was registered to compare against
+            cached = dict(device_info)
+        else:
+            log.info('Running inspectors')
+            cached = None
+            device_info = self.inspect()
+
+        log.info('Registering device inventory for MercuryID {}'.format(
+            device_info['mercury_id']))
+
+        log.info('Starting pong service')
+        spawn_pong_process(self.pong_bind_address)
+
+        log.info('Registering device')
+
+        local_ip = get_dhcp_ip(device_info, method=dhcp_ip_method)
+
+        # TODO: enumerate ipv6 addresses
+        local_ipv6 = None
+
+        self.register(self.backend, device_info, local_ip, local_ipv6)
+
+        if cached is not None:
+            threading.Thread(target=self.revalidate,
+                             args=(cached, dhcp_ip_method),
+                             name='inspect-revalidate',
+                             daemon=True).start()
+
         # LogHandler
         if self.log_handler is not None:
             log.info('Injecting MercuryID for remote logging')
@@ -114,6 +203,11 @@ class Agent(object):
                 'Caught recoverable exception running async inspector: '
                 '{}'.format(mge))
 
+        inspector_configuration = self.configuration.agent.inspector
+        if inspector_configuration.watch:
+            log.info('Watching for device changes')
+            UDevWatcher(inspector_configuration.watch_debounce).inspect()
+
         log.info('Starting agent rpc service: %s' % self.agent_bind_address)
 
         agent_service = AgentService(self.agent_bind_address,
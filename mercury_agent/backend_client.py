@@ -1,10 +1,22 @@
+import copy
+import logging
+import threading
+
 from mercury_agent.configuration import get_configuration
+from mercury_agent.inspector import delta
 from mercury.common.clients.rpc.backend import BackEndClient
 
+log = logging.getLogger(__name__)
 
 # Private
 __backend_client = None
 
+# The inventory sections the backend is known to hold, updates are computed
+# against these
+__published = {}
+__revision = 0
+__inventory_lock = threading.Lock()
+
 
 def get_backend_client():
     # TODO: Trying this out, 0mq says it is ok
@@ -13,3 +25,94 @@ def get_backend_client():
         __backend_client = BackEndClient(
             get_configuration().agent.remote.backend_url)
     return __backend_client
+
+
+def set_inventory_baseline(device_info):
+    """ Record the inventory held by the backend following a successful
+    registration. Subsequent calls to update_inventory only send changes
+    made since.
+
+    :param device_info: The registered device_info
+    """
+    global __revision
+    with __inventory_lock:
+        __published.clear()
+        __published.update(copy.deepcopy(device_info))
+        __revision = 0
+
+
+def _send_update(mercury_id, sections, update, base_revision):
+    # BackEndClient.update with the revisions as keyword arguments of the
+    # call, they are not part of the inventory update
+    payload = {
+        'endpoint': 'update',
+        'args': [mercury_id, update],
+        'kwargs': {
+            'base_revision': base_revision,
+            'inventory_revision': base_revision + 1
+        }
+    }
+    try:
+        return get_backend_client().transceiver(payload)
+    except Exception:
+        # The update may or may not have been applied
+        for name in sections:
+            __published.pop(name, None)
+        raise
+
+
+def _revision_mismatch(result, base_revision):
+    held = result.get('inventory_revision')
+    return held is not None and held != base_revision + 1
+
+
+def update_inventory(mercury_id, sections):
+    """ Update inventory sections, sending only what has changed since the
+    baseline revision. Sections the backend is not known to hold are sent
+    whole.
+
+    Updates carry the revision they were computed against (base_revision)
+    and the revision they produce (inventory_revision) as keyword arguments
+    of the update call, alongside the update itself. A backend holding a
+    different revision reports the revision it holds, the sections are then
+    resent whole against it.
+
+    :param mercury_id: The device's mercury_id
+    :param sections: dictionary of device_info sections, ie {'raid': [...]}
+    :return: The backend response or None if nothing has changed
+    """
+    global __revision
+    with __inventory_lock:
+        operations = []
+        for name, value in sections.items():
+            if name in __published:
+                operations += delta.diff(__published[name], value, [name])
+            else:
+                operations.append({'op': 'add', 'path': [name],
+                                   'value': value})
+
+        if not operations:
+            log.debug('Inventory is unchanged since revision %s', __revision)
+            return None
+
+        update = delta.to_update(operations, sections)
+        log.debug('Sending %s inventory changes against revision %s: %s',
+                  len(operations), __revision, ', '.join(sorted(update)))
+        result = _send_update(mercury_id, sections, update, __revision)
+
+        if _revision_mismatch(result, __revision):
+            log.warning('Backend holds inventory revision %s, expected %s, '
+                        'resending %s whole', result['inventory_revision'],
+                        __revision, ', '.join(sorted(sections)))
+            __revision = result['inventory_revision']
+            result = _send_update(mercury_id, sections, dict(sections),
+                                  __revision)
+
+        if result.get('error') or _revision_mismatch(result, __revision):
+            for name in sections:
+                __published.pop(name, None)
+        else:
+            __published.update(copy.deepcopy(sections))
+            __revision += 1
+
+        return result
@@ -13,13 +13,50 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import ast
+import importlib
+import importlib.util
+import inspect
 import logging
+import sys
 
 LOG = logging.getLogger(__name__)
 
 runtime_capabilities = {}
 
 
+class LazyEntry(object):
+    """Stands in for a function in a module which has not been imported.
+
+    The module is imported the first time the entry is called.
+    """
+    def __init__(self, module, name, capability_name=None):
+        """
+        :param module: Module the function is defined in.
+        :param name: Name of the function.
+        :param capability_name: When set, the entry registered for this
+            capability by the imported module is called instead of the module
+            attribute.
+        """
+        self.module = module
+        self.__name__ = name
+        self.capability_name = capability_name
+
+    def load(self):
+        module = importlib.import_module(self.module)
+        if self.capability_name:
+            entry = runtime_capabilities[self.capability_name]['entry']
+            if not isinstance(entry, LazyEntry):
+                return entry
+        return getattr(module, self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return '<LazyEntry {}.{}>'.format(self.module, self.__name__)
+
+
 def add_capability(entry, name, description, doc=None, serial=False,
                    num_args=None, kwarg_names=None, no_return=False,
                    dependency_callback=None, timeout=1800,
@@ -77,3 +114,105 @@ def capability(name, description, serial=False, num_args=None,
                        timeout=timeout, task_id_kwargs=task_id_kwargs)
         return entry
     return wrap
+
+
+def _imported_names(tree):
+    """Names a module imports with absolute from-imports.
+
+    :return: Dictionary of local name: (module, name).
+    """
+    names = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and \
+                not node.level:
+            for alias in node.names:
+                names[alias.asname or alias.name] = (node.module, alias.name)
+    return names
+
+
+def _decorator_value(node, module, imported=None):
+    """Evaluate a @capability argument without importing its module.
+
+    Names, such as dependency callbacks, are resolved on first call. Names the
+    module imports are resolved from the module defining them, so checking a
+    dependency does not import the procedure module.
+    """
+    if isinstance(node, ast.Name):
+        if imported and node.id in imported:
+            return LazyEntry(*imported[node.id])
+        return LazyEntry(module, node.id)
+    return ast.literal_eval(node)
+
+
+def describe_capabilities(module):
+    """Read the capabilities defined in a module without importing it.
+
+    :param module: Dotted module name.
+    :return: List of add_capability keyword arguments or None if the module
+        must be imported to be described.
+    """
+    spec = importlib.util.find_spec(module)
+    if not spec or not spec.origin or not spec.origin.endswith('.py'):
+        return None
+
+    with open(spec.origin) as fp:
+        tree = ast.parse(fp.read(), spec.origin)
+
+    signature = inspect.signature(capability)
+    imported = _imported_names(tree)
+    descriptors = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        for decorator in node.decorator_list:
+            if not (isinstance(decorator, ast.Call) and
+                    isinstance(decorator.func, ast.Name) and
+                    decorator.func.id == 'capability'):
+                continue
+            try:
+                bound = signature.bind(
+                    *[_decorator_value(arg, module, imported)
+                      for arg in decorator.args],
+                    **dict((keyword.arg,
+                            _decorator_value(keyword.value, module,
+                                             imported))
+                           for keyword in decorator.keywords))
+            except (TypeError, ValueError):
+                LOG.debug('Cannot describe %s.%s statically', module,
+                          node.name)
+                return None
+            bound.apply_defaults()
+            descriptor = dict(bound.arguments)
+            descriptor['entry'] = LazyEntry(module, node.name,
+                                            capability_name=descriptor['name'])
+            descriptor['doc'] = ast.get_docstring(node, clean=False)
+            descriptors.append(descriptor)
+    return descriptors
+
+
+def add_lazy_capabilities(modules):
+    """Add the capabilities defined in modules without importing them.
+
+    A module is imported when one of its capabilities is first called or a
+    dependency callback defined in the module itself is first checked.
+    Callbacks imported from mercury_agent.procedures.dependencies are checked
+    without importing the module. Its @capability decorators then
+    replace the lazy entries. Modules whose capabilities cannot be described
+    statically are imported immediately.
+
+    :param modules: Dotted module names.
+    """
+    for module in modules:
+        if module in sys.modules:
+            continue
+
+        descriptors = describe_capabilities(module)
+        if descriptors is None:
+            importlib.import_module(module)
+            continue
+
+        for descriptor in descriptors:
+            if descriptor['name'] in runtime_capabilities:
+                continue
+            add_capability(descriptor.pop('entry'), descriptor.pop('name'),
+                           descriptor.pop('description'), **descriptor)
@@ -25,6 +25,31 @@ AGENT_CONFIG_FILE = 'mercury-agent.yaml'
 
 __configuration = {}
 
+# MercuryConfiguration only applies truthy values; 0, false, and empty strings
+# are replaced by the default. Options which can be turned off accept DISABLED
+# instead and are typed once every source has been applied
+DISABLED = 'disabled'
+
+
+def _is_disabled(value):
+    return isinstance(value, str) and value.strip().lower() == DISABLED
+
+
+def _normalize(configuration, name, special_type=None, disabled=None):
+    """ Resolve an option accepting DISABLED
+
+    :param configuration: The scanned configuration
+    :param name: The option name
+    :param special_type: int, float, or bool conversion for other values
+    :param disabled: The value DISABLED is replaced with
+    """
+    value = MercuryConfiguration.get_by_namespace(configuration, name)
+    if _is_disabled(value):
+        value = disabled
+    elif value is not None and special_type:
+        value = MercuryConfiguration.format_type(value, special_type)
+    MercuryConfiguration.set_by_namespace(configuration, name, value)
+
 
 def parse_options():
     configuration = MercuryConfiguration(
@@ -69,6 +94,14 @@ def parse_options():
                              env_variable='HPSSACLI_PATH',
                              default='hpssacli')
 
+    configuration.add_option('agent.hardware.raid.snapshot_ttl',
+                             help_string='Seconds a RAID adapter '
+                                         'configuration is reused between '
+                                         'operations before the controller '
+                                         'is read again. "disabled" reads '
+                                         'the controller every time',
+                             default=30)
+
     configuration.add_option('agent.local_ip',
                              cli_argument='--local-ip',
                              env_variable='MERCURY_AGENT_ADDRESS',
@@ -103,7 +136,56 @@ def parse_options():
                              env_variable='HPASMCLI_PATH',
                              default='hpasmcli')
 
-    return configuration.scan_options()
+    configuration.add_option('agent.inspector.max_workers',
+                             help_string='The number of inspectors and driver '
+                                         'probes which may run concurrently',
+                             default=8,
+                             special_type=int)
+
+    configuration.add_option('agent.inspector.timeout',
+                             help_string='The number of seconds an inspector or '
+                                         'driver probe may run before it is '
+                                         'abandoned and its processes killed. '
+                                         '"disabled" removes the deadline',
+                             default=300)
+
+    configuration.add_option('agent.inspector.timeouts',
+                             help_string='Per inspector or driver deadline '
+                                         'overrides, configuration file only',
+                             default={})
+
+    configuration.add_option('agent.inspector.cache_path',
+                             help_string='Inspection results are cached here '
+                                         'so that an agent restarted within '
+                                         'the same boot can register '
+                                         'immediately. "disabled" turns the '
+                                         'cache off',
+                             env_variable='MERCURY_INSPECTION_CACHE',
+                             default='/run/mercury-agent/inspection.msgpack')
+
+    configuration.add_option('agent.inspector.watch',
+                             help_string='Re-inspect disks and network '
+                                         'interfaces as udev reports them '
+                                         'being added, removed, or changed. '
+                                         '"disabled" turns the watcher off',
+                             default=True)
+
+    configuration.add_option('agent.inspector.watch_debounce',
+                             help_string='Seconds to wait for udev events to '
+                                         'settle before re-inspecting',
+                             default=2.0,
+                             special_type=float)
+
+    master_configuration = configuration.scan_options()
+
+    _normalize(master_configuration, 'agent.hardware.raid.snapshot_ttl', int,
+               disabled=0)
+    _normalize(master_configuration, 'agent.inspector.timeout', int)
+    _normalize(master_configuration, 'agent.inspector.cache_path')
+    _normalize(master_configuration, 'agent.inspector.watch', bool,
+               disabled=False)
+
+    return master_configuration
 
 
 def get_configuration():
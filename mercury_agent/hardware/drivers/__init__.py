@@ -1,5 +1 @@
 from .drivers import *
-
-from .hp_raid import *
-from .megaraid import *
-from .obm import *
@@ -1,3 +1,4 @@
+import importlib
 import logging
 
 log = logging.getLogger(__name__)
@@ -6,6 +7,14 @@ log = logging.getLogger(__name__)
 registered_drivers = list()
 driver_class_cache = dict()
 
+# Driver modules register themselves when imported. They are imported by
+# load_drivers, before the first inspection, rather than with this package
+DRIVER_MODULES = [
+    'mercury_agent.hardware.drivers.hp_raid',
+    'mercury_agent.hardware.drivers.megaraid',
+    'mercury_agent.hardware.drivers.obm'
+]
+
 
 class DriverBase(object):
     """
@@ -36,6 +45,16 @@ class DriverBase(object):
     def inspect(self):
         raise NotImplementedError
 
+    def fingerprint(self):
+        """
+        Implementations may return a value which changes whenever inspect()
+        output may have changed. It must be much cheaper than inspect(), at
+        most a single cheap vendor CLI call, see inspector.fingerprint.
+        None means the driver cannot be fingerprinted
+        :return:
+        """
+        return None
+
 
 class PCIDriverBase(DriverBase):
     @classmethod
@@ -74,6 +93,14 @@ def driver():
     return decorator
 
 
+def load_drivers():
+    """
+    Import every driver module, registering the drivers they define
+    """
+    for module in DRIVER_MODULES:
+        importlib.import_module(module)
+
+
 def get_subsystem_drivers(subsystem):
     drivers = []
     for d in driver_class_cache:
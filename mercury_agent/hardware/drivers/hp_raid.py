@@ -19,7 +19,9 @@ from mercury_agent.configuration import get_configuration
 
 from mercury_agent.hardware import platform_detection
 from mercury_agent.hardware.drivers import driver, PCIDriverBase
-from mercury_agent.hardware.raid.abstraction.api import RAIDActions, RAIDAbstractionException
+from mercury_agent.hardware.raid.abstraction.api import RAIDActions, RAIDAbstractionException, \
+    DEFAULT_SNAPSHOT_TTL, invalidates_snapshots
+from mercury_agent.inspector.hwlib.lspci import as_pci_bus
 
 
 class SmartArrayActions(RAIDActions):
@@ -37,12 +39,13 @@ class SmartArrayActions(RAIDActions):
     }
 
     def __init__(self):
-        super(SmartArrayActions, self).__init__()
-        self.hpssa = HPSSA(hpssa_path=get_configuration().get(
+        raid_configuration = get_configuration().get(
             'agent', {}).get(
             'hardware', {}).get(
-            'raid', {}).get(
-            'hpssacli_path') or 'hpssacli')
+            'raid', {})
+        super(SmartArrayActions, self).__init__(
+            snapshot_ttl=raid_configuration.get('snapshot_ttl', DEFAULT_SNAPSHOT_TTL))
+        self.hpssa = HPSSA(hpssa_path=raid_configuration.get('hpssacli_path') or 'hpssacli')
 
     @staticmethod
     def get_vendor_info(adapter):
@@ -203,6 +206,11 @@ class SmartArrayActions(RAIDActions):
     def assemble_drive(drive):
         return '{port}:{box}:{bay}'.format(**drive['extra'])
 
+    @staticmethod
+    def drive_address(drive):
+        return SmartArrayActions.assemble_drive(drive)
+
+    @invalidates_snapshots
     def create(self, adapter_info, level=None, drives=None, size=None, array=None):
         """
         Implementation of RAIDActions.create
@@ -238,6 +246,22 @@ class SmartArrayActions(RAIDActions):
 
         return result
 
+    @invalidates_snapshots
+    def create_each(self, adapter_info, drives):
+        """
+        Implementation of RAIDActions.create_each, a single arrayr0 create makes an
+        array and logical drive on each drive
+
+        :param adapter_info: transformed adapter_info
+        :param drives: Converted drive target from RAIDActions create_logical_drives
+        :return: [result]
+        """
+        return [self.hpssa.create(self.get_slot(adapter_info),
+                                  selection=','.join([self.assemble_drive(d) for d in drives]),
+                                  raid='0',
+                                  array_type='arrayr0')]
+
+    @invalidates_snapshots
     def delete_logical_drive(self, adapter, array, logical_drive):
         """
         Implementation for RAIDActions.delete_logical_drive
@@ -258,6 +282,7 @@ class SmartArrayActions(RAIDActions):
 
         return self.hpssa.delete_logical_drive(slot, target['extra']['id'])
 
+    @invalidates_snapshots
     def clear_configuration(self, adapter):
         """
         Implementation of RAIDActions.clear_configuration
@@ -267,6 +292,7 @@ class SmartArrayActions(RAIDActions):
         return self.hpssa.delete_all_logical_drives(
             self.get_slot(self.get_adapter_info(adapter)))
 
+    @invalidates_snapshots
     def add_spares(self, adapter, drives, arrays=None):
         """
         Implementation of RAIDActions.add_spares
@@ -315,15 +341,13 @@ class SmartArrayDriver(PCIDriverBase):
 
     @classmethod
     def probe(cls, pci_data):
-        raid_pci_devices = platform_detection.get_raid_controllers(pci_data)
-        if not platform_detection.has_smart_array_gen9(pci_data=raid_pci_devices):
-            return
-
+        pci_bus = as_pci_bus(pci_data)
         owns = list()
-        for device in raid_pci_devices:
-            if cls.check(device):
-                owns.append(device['slot'])
-        return owns
+        for device_id in cls.PCI_DEVICE_IDS:
+            owns += pci_bus.query(
+                class_id=platform_detection.RAID_CONTROLLER_CLASS_ID,
+                device_id=device_id)
+        return [device.slot for device in owns]
 
     @classmethod
     def check(cls, pci_device):
@@ -331,6 +355,7 @@ class SmartArrayDriver(PCIDriverBase):
 
     def inspect(self):
         adapters = []
+        self.handler.invalidate()
         for idx in range(len(self.handler.hpssa.adapters)):
             _a = dict(**self.handler.get_adapter_info(idx))
             _a.update({
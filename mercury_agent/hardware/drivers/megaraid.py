@@ -16,6 +16,8 @@
 # Temporary baseline driver for LSI/PERC MegaRAID SAS adapters
 # Next iteration will harness stor/percCLI which has JSON output capabilities
 
+import functools
+import json
 import logging
 
 from size import Size
@@ -25,12 +27,25 @@ from mercury_agent.configuration import get_configuration
 from mercury_agent.hardware import platform_detection
 from mercury_agent.hardware.drivers import driver, PCIDriverBase
 from mercury_agent.hardware.raid.abstraction.api import RAIDActions, \
-    RAIDAbstractionException
+    RAIDAbstractionException, DEFAULT_SNAPSHOT_TTL, invalidates_snapshots
 from mercury_agent.hardware.raid.interfaces.megaraid.storcli import Storcli
+from mercury_agent.inspector.hwlib.lspci import as_pci_bus
 
 log = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=1024)
+def parse_size(value, force_iec_values=True):
+    """ storcli reports sizes as strings, ie 278.875 GB. Drives of the same
+    model report the same strings, so conversions are cached
+
+    :param value: storcli size string
+    :param force_iec_values: storcli uses IEC units with SI suffixes
+    :return: bytes
+    """
+    return Size(value, force_iec_values=force_iec_values).bytes
+
+
 class MegaRAIDActions(RAIDActions):
     # Drives have many more statuses than we care about
     # This information will be preserved in extra
@@ -60,12 +75,15 @@ class MegaRAIDActions(RAIDActions):
         This class is using the mercury native storcli interface. The interface is very thin.
         As such, vendor_info may need a little more cleanup in comparison to SmartArray
         """
-        super(MegaRAIDActions, self).__init__()
-        self.storcli = Storcli(binary_path=get_configuration().get(
+        raid_configuration = get_configuration().get(
             'agent', {}).get(
             'hardware', {}).get(
-            'raid', {}).get(
-            'storcli_path') or 'storcli')
+            'raid', {})
+        super(MegaRAIDActions, self).__init__(
+            snapshot_ttl=raid_configuration.get('snapshot_ttl',
+                                                DEFAULT_SNAPSHOT_TTL))
+        self.storcli = Storcli(
+            binary_path=raid_configuration.get('storcli_path') or 'storcli')
 
     @staticmethod
     def get_vendor_info(adapter):
@@ -112,7 +130,7 @@ class MegaRAIDActions(RAIDActions):
             if dg_id == disk_group:
                 lds.append({
                     'level': int(vd['TYPE'].strip('RAID')),
-                    'size': Size(vd['Size'], force_iec_values=True).bytes,
+                    'size': parse_size(vd['Size']),
                     'status': self.logical_drive_map.get((vd['State']),
                                                          'UNKNOWN'),
                     'extra': {
@@ -139,7 +157,7 @@ class MegaRAIDActions(RAIDActions):
             disk_group = int(disk_group)
 
         return {
-            'size': Size(pd['Size'], force_iec_values=True).bytes,
+            'size': parse_size(pd['Size']),
             'status': self.drive_status_map.get(pd['State'], 'UNKNOWN'),
             'type': pd['Med'],
             'extra': {
@@ -151,7 +169,7 @@ class MegaRAIDActions(RAIDActions):
                 'self_encrypted_drive':
                     pd['SED'] != 'N',
                 'spun': pd['Sp'],
-                'sector_size': Size(pd['SeSz'].lower()).bytes,
+                'sector_size': parse_size(pd['SeSz'].lower(), False),
                 'vendor_state': pd['State'],
                 'spare_type': self.hotspare_map.get(pd['State'], None)
             }
@@ -184,7 +202,7 @@ class MegaRAIDActions(RAIDActions):
         if free_space_details:
             for fs in free_space_details:
                 if fs['DG'] == disk_group:
-                    return Size(fs['Size'], force_iec_values=True).bytes
+                    return parse_size(fs['Size'])
 
         return 0
 
@@ -293,17 +311,24 @@ class MegaRAIDActions(RAIDActions):
         :param controller:
         :return:
         """
+        # The second controller specific read is necessary because
+        # /call show all does not contain some necessary information.
+        # Such as "UN-CONFIGURED DRIVE LIST"
+        return self.transform_disk_groups(
+            self.storcli.get_disk_group(controller)[0])
+
+    def transform_disk_groups(self, dg_info):
+        """
+
+        :param dg_info: A controller's dall show all response data
+        :return:
+        """
         configuration = {
             'arrays': [],
             'spares': [],
             'unassigned': []
         }
 
-        # The second controller specific read is necessary because
-        # /call show all does not contain some necessary information.
-        # Such as "UN-CONFIGURED DRIVE LIST"
-        dg_info = self.storcli.get_disk_group(controller)[0]
-
         if dg_info.get('TOPOLOGY'):
             # A configuration exists on the adapter
             configuration['arrays'] = self.get_configuration(dg_info)
@@ -329,15 +354,31 @@ class MegaRAIDActions(RAIDActions):
         except IndexError:
             raise RAIDAbstractionException('Controller does not exist')
 
-        adapter_details = {
+        return self.transform_adapter(
+            adapter, self.storcli.get_disk_group(adapter_index)[0])
+
+    def transform_adapter(self, adapter, dg_info):
+        """
+        :param adapter: Controller show all response data
+        :param dg_info: The controller's dall show all response data
+        :return: Adapter details in standard from
+        """
+        return {
             'name': adapter['Basics']['Model'],
             'provider': 'megaraid',
             'vendor_info': self.get_vendor_info(adapter),
-            'configuration': self.transform_configuration(adapter_index)
+            'configuration': self.transform_disk_groups(dg_info)
         }
 
-        return adapter_details
+    def transform_adapters(self):
+        """
+        Every controller is read with two storcli calls, see Storcli.get_inventory
+        :return: Adapter details in standard form, in controller order
+        """
+        return [self.transform_adapter(adapter, dg_info)
+                for adapter, dg_info in self.storcli.get_inventory()]
 
+    @invalidates_snapshots
     def create(self, adapter_info, level, drives=None, size=None, array=None):
         """
 
@@ -369,6 +410,43 @@ class MegaRAIDActions(RAIDActions):
             size=size_mb
         )
 
+    @invalidates_snapshots
+    def create_each(self, adapter_info, drives):
+        """ Creates a raid0 virtual drive on each drive, with one storcli add vd each
+        command per enclosure
+
+        :param adapter_info:
+        :param drives:
+        :return:
+        """
+        controller_id = self.get_controller_id(adapter_info)
+
+        enclosure_drive_map = {}
+        enclosures = []
+        for drive in drives:
+            if drive['extra']['vendor_state'] != 'UGood':
+                raise RAIDAbstractionException(
+                    'Drive index: {}, address:{} is in a failed state, cannot '
+                    'create array'.format(
+                        drive['index'], drive['extra']['address']))
+
+            enclosure, slot = drive['extra']['address'].split(':')
+            if enclosure not in enclosure_drive_map:
+                enclosures.append(enclosure)
+                enclosure_drive_map[enclosure] = [slot]
+            else:
+                enclosure_drive_map[enclosure].append(slot)
+
+        return [
+            self.storcli.add(
+                controller=controller_id,
+                array_type='r0',
+                drives='{}:{}'.format(enclosure,
+                                      ','.join(enclosure_drive_map[enclosure])),
+                each=True
+            ) for enclosure in enclosures]
+
+    @invalidates_snapshots
     def delete_logical_drive(self, adapter, array, logical_drive):
         """
 
@@ -393,6 +471,7 @@ class MegaRAIDActions(RAIDActions):
         return self.storcli.delete(controller=controller_id,
                                    virtual_drive=logical_drive)
 
+    @invalidates_snapshots
     def clear_configuration(self, adapter):
         """
 
@@ -402,6 +481,7 @@ class MegaRAIDActions(RAIDActions):
         return self.storcli.delete(controller=self.get_controller_id(
             self.get_adapter_info(adapter)), virtual_drive='all')
 
+    @invalidates_snapshots
     def add_spares(self, adapter, drives, arrays=None):
         """
 
@@ -439,6 +519,7 @@ class MegaRAIDActions(RAIDActions):
 
         return results
 
+    @invalidates_snapshots
     def erase(self, adapter, drives, method='fast'):
         log.info(
             'Starting hardware erase on adapter: %s, drives: %s, method: %s',
@@ -488,22 +569,23 @@ class MegaRaidSASDriver(PCIDriverBase):
 
     @classmethod
     def probe(cls, pci_data):
-        raid_pci_devices = platform_detection.get_raid_controllers(pci_data)
-        owns = list()
-
-        for device in raid_pci_devices:
-            if cls.check(device):
-                owns.append(device['slot'])
-        return owns
+        return [device.slot for device in as_pci_bus(pci_data).query(
+            class_id=platform_detection.RAID_CONTROLLER_CLASS_ID,
+            driver=cls.name)]
 
     @classmethod
     def check(cls, pci_device):
         return pci_device['driver'] == cls.name
 
     def inspect(self):
-        adapters = []
+        # Inspection runs when the event log changes, always read the
+        # controllers
+        return self.handler.get_all_adapter_info()[:len(self.devices)]
 
-        for idx in range(len(self.devices)):
-            adapters.append(self.handler.get_adapter_info(idx))
-
-        return adapters
+    def fingerprint(self):
+        """ The controller event log sequence numbers advance with every
+        configuration change. This is a single storcli call, inspect() makes
+        two
+        """
+        return json.dumps(self.handler.storcli.get_event_log_info(),
+                          sort_keys=True)
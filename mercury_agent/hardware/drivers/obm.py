@@ -24,6 +24,7 @@ from mercury_agent.hardware.obm.ipmitool import (
 )
 
 from mercury_agent.hardware.obm.racadm import SimpleRAC
+from mercury_agent.inspector.hwlib.lspci import as_pci_bus
 
 
 log = logging.getLogger(__name__)
@@ -58,11 +59,9 @@ class HPILODriver(IPMIDriverBase):
 
     @classmethod
     def probe(cls, context_data):
-        for pci_device in context_data:
-            for my_device_id in cls.PCI_DEVICE_IDS:
-                if pci_device['device_id'] == my_device_id:
-                    return True
-        return False
+        pci_bus = as_pci_bus(context_data)
+        return any(pci_bus.has(device_id=device_id)
+                   for device_id in cls.PCI_DEVICE_IDS)
 
 
 @driver()
@@ -1,9 +1,25 @@
+import json
+import logging
+import re
+import shlex
+import subprocess
+import tempfile
+import threading
+
 from mercury.common.exceptions import MercuryGeneralException
 from mercury.common.helpers import cli
 
+log = logging.getLogger(__name__)
+
 HWEVENT_SEARCH_TERM = 'Hardware event. This is not a software error.'
 JOURNALCTL_COMMAND = 'journalctl -a --output cat --unit=mcelog.service ' \
                      '--no-pager'
+JOURNALCTL_JSON_COMMAND = 'journalctl -a --output json ' \
+                          '--unit=mcelog.service --no-pager'
+
+# mcelog writes each line of an event as a separate journal entry
+CPU_BANK_RE = re.compile(r'^CPU (\d+) BANK (\d+)')
+DIMM_RE = re.compile(r'(SOCKET:\d+ CHANNEL:\S+ DIMM:\S+)')
 
 
 def get_mcelog_journal_stream():
@@ -28,17 +44,142 @@ def query_mcelog_daemon(mcelog_path='mcelog'):
     return result.stdout
 
 
+def _message(entry):
+    message = entry.get('MESSAGE') or ''
+    # journalctl encodes messages which are not valid UTF-8 as byte arrays
+    if isinstance(message, list):
+        message = bytes(message).decode('utf-8', 'replace')
+    return message
+
+
+class MCEEventCounter(object):
+    """
+    Counts the hardware events mcelog has logged to the journal. Only the
+    entries written since the last update are read; the journal cursor of
+    the last entry and the running totals are kept between updates.
+    """
+    def __init__(self, command=JOURNALCTL_JSON_COMMAND):
+        self.command = command
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.cursor = None
+        self.total = 0
+        # str(number) or location: count, str keys for mongo
+        self.banks = {}
+        self.cpus = {}
+        self.dimms = {}
+        # Buckets already counted for the event being read
+        self._event = None
+
+    def buckets(self):
+        return {'bank': dict(self.banks),
+                'cpu': dict(self.cpus),
+                'dimm': dict(self.dimms)}
+
+    @staticmethod
+    def _increment(bucket, key):
+        bucket[key] = bucket.get(key, 0) + 1
+
+    def add_message(self, message):
+        """
+        :param message: MESSAGE of a mcelog journal entry
+        """
+        if HWEVENT_SEARCH_TERM in message:
+            self.total += 1
+            self._event = set()
+            return
+
+        if self._event is None:
+            return
+
+        match = CPU_BANK_RE.match(message)
+        if match and 'cpu' not in self._event:
+            self._event.add('cpu')
+            self._increment(self.cpus, match.group(1))
+            self._increment(self.banks, match.group(2))
+            return
+
+        match = DIMM_RE.search(message)
+        if match and 'dimm' not in self._event:
+            self._event.add('dimm')
+            self._increment(self.dimms, match.group(1))
+
+    def _read(self):
+        """ Read the entries following self.cursor
+
+        :return: False if journalctl failed
+        """
+        command = shlex.split(self.command)
+        if self.cursor:
+            command.append('--after-cursor={}'.format(self.cursor))
+        # stderr goes to a file, a pipe which is only read after stdout
+        # reaches EOF would block journalctl once the pipe buffer is full
+        with tempfile.TemporaryFile() as err:
+            try:
+                p = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                     stderr=err)
+            except OSError as e:
+                log.error('Could not run journalctl: %s', e)
+                return False
+
+            for line in p.stdout:
+                try:
+                    entry = json.loads(line.decode('utf-8', 'replace'))
+                except ValueError:
+                    continue
+                self.add_message(_message(entry))
+                self.cursor = entry.get('__CURSOR', self.cursor)
+            p.stdout.close()
+            p.wait()
+
+            if p.returncode:
+                err.seek(0)
+                log.error('journalctl returned %d: %s', p.returncode,
+                          err.read().decode('utf-8', 'replace').strip())
+                return False
+        return True
+
+    def update(self):
+        """
+        :return: self, updated with the entries logged since the last update
+        :raises MercuryGeneralException: if the journal cannot be read
+        """
+        with self._lock:
+            if self._read():
+                return self
+            if self.cursor:
+                # The cursor may belong to a journal which has been removed
+                log.warning('Could not read the journal after %s, counting '
+                            'all mcelog events again', self.cursor)
+                self.reset()
+                if self._read():
+                    return self
+            self.reset()
+            raise MercuryGeneralException('Error getting mcelog')
+
+
+__counter = None
+__counter_lock = threading.Lock()
+
+
+def get_counter():
+    """
+    :return: A MCEEventCounter shared by the process
+    """
+    global __counter
+    with __counter_lock:
+        if __counter is None:
+            __counter = MCEEventCounter()
+        return __counter
+
+
 def count_logged_events():
     """
-    Searches data stream and returns a count of HWEVENT_SEARCH_TERM
-    :param data:
-    :return:
+    :return: The number of hardware events logged by mcelog
     """
-    count = 0
-    for line in get_mcelog_journal_stream().readlines():
-        if HWEVENT_SEARCH_TERM in line.decode('utf-8'):
-            count += 1
-    return count
+    return get_counter().update().total
 
 
 if __name__ == '__main__':
@@ -1,3 +1,5 @@
+from mercury_agent.inspector.hwlib.lspci import as_pci_bus
+
 RAID_CONTROLLER_CLASS_ID = "0104"
 SMART_ARRAY_DEVICE_ID_9 = "3239"  # Smart Array Gen9 Controllers
 
@@ -26,13 +28,10 @@ def get_product_name(dmi_info):
     return dmi_info.get('product_name')
 
 
-# PCI
+# PCI, pci_data is a PCIBus or device_info['pci']
 def has_smart_array_gen9(pci_data):
-    for device in pci_data:
-        if device['device_id'] == SMART_ARRAY_DEVICE_ID_9:
-            return True
-    return False
+    return as_pci_bus(pci_data).has(device_id=SMART_ARRAY_DEVICE_ID_9)
 
 
 def get_raid_controllers(pci_data):
-    return [d for d in pci_data if d['class_id'] == RAID_CONTROLLER_CLASS_ID]
+    return as_pci_bus(pci_data).query(class_id=RAID_CONTROLLER_CLASS_ID)
@@ -1,10 +1,33 @@
+import functools
+import threading
+import time
+
 from size import PercentString, Size
 
+from mercury_agent.hardware.raid.abstraction.model import Adapter
+
+# Seconds an adapter snapshot is served before the controller is read again
+DEFAULT_SNAPSHOT_TTL = 30
+
 
 class RAIDAbstractionException(Exception):
     pass
 
 
+def invalidates_snapshots(f):
+    """ Decorates RAIDActions methods which change the controller configuration
+    or drive state. Cached adapter snapshots are discarded once the method
+    returns or raises, a failed command may have partially applied
+    """
+    @functools.wraps(f)
+    def wrapped_f(self, *args, **kwargs):
+        try:
+            return f(self, *args, **kwargs)
+        finally:
+            self.invalidate()
+    return wrapped_f
+
+
 class RAIDActions(object):
     """
     Bare bones RAID abstraction layer. Simple support for querying and modifying a RAID controller
@@ -15,38 +38,46 @@ class RAIDActions(object):
 
     # TODO add RAID constraints class object for use in raid_minimums and raid_calculator
 
+    def __init__(self, snapshot_ttl=DEFAULT_SNAPSHOT_TTL):
+        """
+        :param snapshot_ttl: Seconds get_adapter_info results are reused for.
+            0 disables the cache
+        """
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshots = {}
+        self._generation = 0
+        self._snapshot_lock = threading.Lock()
+
+    def invalidate(self):
+        """ Discard all adapter snapshots. Reads which started before this call
+        are not cached when they complete
+        """
+        with self._snapshot_lock:
+            self._generation += 1
+            self._snapshots.clear()
+
     def transform_adapter_info(self, adapter_index):
         raise NotImplementedError
 
-    def _add_indexes(self, configuration):
+    def transform_adapters(self):
         """
-        This method is called to add drive indexes to transformed configuration. This is necessary
-        because drives are now only present within an adapter configuration, but we need still
-        need abstractly map drives physical location. This is achieved by calling instance.sort_drives
-        on a list of aggregate drives, enumerating them, and storing the enumeration as drive.index
+        Drivers whose vendor tools report every adapter at once can override this,
+        all adapters are then read, transformed, and cached together.
 
-        :param configuration: configuration reference of instance.transform_adapter_info output
-        :return: None
+        :return: Adapter details in standard form for each adapter, in index order, or
+            None if adapters must be transformed individually
         """
+        return None
 
-        drives = [pd for array in configuration['arrays'] for pd in array['physical_drives']]
-
-        drives += (configuration['spares'] + configuration['unassigned'])
-        self.sort_drives(drives)
-
-        for idx, drive in enumerate(drives):
-            drive.update({'index': idx})
-
-    def _add_totals(self, adapter_info):
+    @staticmethod
+    def drive_address(drive):
         """
-        Adds drive and size totals to adapter_info
-        :param adapter_info:
-        :return:
+        Drivers override this when the vendor address of a drive is not extra.address
+
+        :param drive: transformed drive
+        :return: The vendor address of the drive, or None
         """
-        all_drives = self.get_all_drives_from_adapter(adapter_info)
-        adapter_info['total_size'] = sum(
-            [drive['size'] for drive in all_drives])
-        adapter_info['total_drives'] = len(all_drives)
+        return drive['extra'].get('address')
 
     def get_adapter_info(self, adapter_index):
         """
@@ -66,14 +97,79 @@ class RAIDActions(object):
         will need to change so that drivers and handlers are registered in PCI order and not import
         order. Talk to Jared R. about implementation details as he is soldiering on.
 
+        A single operation, such as create_logical_drive, reads the adapter many times.
+        The transformed adapter is cached until a mutating method invalidates it or
+        snapshot_ttl expires, so the vendor CLI is only run once per operation.
+
         :param adapter_index: The index of the adapter to populate configuration information
-        :return: A dictionary representing the adapter
+        :return: A dictionary representing the adapter, callers are free to modify it
+
+        """
+        return self.get_adapter(adapter_index).to_dict()
+
+    def get_adapter(self, adapter_index):
+        """
+        Drive indexes, array membership, and totals are computed once per snapshot, see
+        model.Adapter. The model is shared and must not be modified.
+
+        :param adapter_index: The index of the adapter
+        :return: model.Adapter
+        """
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(adapter_index)
+
+        if snapshot and snapshot[0] > time.monotonic():
+            return snapshot[1]
+
+        adapters = self._read_adapters(adapter_index)
+        try:
+            return adapters[adapter_index]
+        except KeyError:
+            raise RAIDAbstractionException(
+                'Adapter {} does not exist'.format(adapter_index))
 
+    def get_all_adapter_info(self):
         """
-        adapter_info = self.transform_adapter_info(adapter_index)
-        self._add_indexes(adapter_info['configuration'])
-        self._add_totals(adapter_info)
-        return adapter_info
+        Reads every adapter with a single round of vendor CLI calls, when the driver
+        supports it, regardless of what is cached.
+
+        :return: A list of adapter dictionaries, in index order
+        """
+        adapters = self._read_adapters()
+        return [adapters[idx].to_dict() for idx in sorted(adapters)]
+
+    def _read_adapters(self, adapter_index=None):
+        """
+        Transforms and caches adapters, all of them if the driver supports it
+
+        :param adapter_index: The adapter to read if the driver does not
+        :return: model.Adapter objects, keyed by index
+        """
+        with self._snapshot_lock:
+            generation = self._generation
+
+        adapters = self.transform_adapters()
+        if adapters is None:
+            if adapter_index is None:
+                raise RAIDAbstractionException(
+                    'The driver cannot read all adapters at once')
+            adapters = {adapter_index: self.transform_adapter_info(adapter_index)}
+        else:
+            adapters = dict(enumerate(adapters))
+
+        adapters = dict(
+            (idx, Adapter.from_dict(adapter_info, self.sort_drives, self.drive_address))
+            for idx, adapter_info in adapters.items())
+
+        if self.snapshot_ttl > 0:
+            expires = time.monotonic() + self.snapshot_ttl
+            with self._snapshot_lock:
+                # The configuration changed while we were reading it
+                if generation == self._generation:
+                    for idx, adapter in adapters.items():
+                        self._snapshots[idx] = (expires, adapter)
+
+        return adapters
 
     def create(self, adapter_info, level, drives=None, size=None, array=None):
         """
@@ -210,6 +306,37 @@ class RAIDActions(object):
                                                                converted_size,
                                                                percent_string)
 
+    @invalidates_snapshots
+    def create_logical_drives(self, adapter, drives='unassigned'):
+        """
+        Creates a single drive RAID 0 logical drive on each selected drive, for instance to
+        expose every drive to the OS. The adapter is read once, and drivers which support it
+        create all of the logical drives with as few controller commands as possible
+
+        :param adapter:
+        :type adapter: int
+        :param drives: drive selection, see create_logical_drive. Defaults to all unassigned
+            drives
+        :return: A list of driver results
+        """
+        adapter_info = self.get_adapter_info(adapter)
+        target_drives = self.get_drives_from_selection(adapter, drives)
+        if not target_drives:
+            return []
+        return self.create_each(adapter_info, target_drives)
+
+    def create_each(self, adapter_info, drives):
+        """
+        This method should only be called from the base classes create_logical_drives method.
+        Drivers which can create many single drive logical drives with one command should
+        override it, by default create is called for each drive
+
+        :param adapter_info: Transformed adapter data
+        :param drives: Transformed drives, all unassigned and OK
+        :return: A list of driver results
+        """
+        return [self.create(adapter_info, '0', drives=[drive]) for drive in drives]
+
     def delete_logical_drive(self, adapter, array, logical_drive):
         raise NotImplementedError
 
@@ -250,21 +377,10 @@ class RAIDActions(object):
         :return type: list
         """
 
-        return self.get_all_drives_from_adapter(
-            self.get_adapter_info(adapter_index))
+        return [drive.to_dict() for drive in self.get_adapter(adapter_index).drives]
 
     def get_unassigned(self, adapter_index):
-        drives = self.get_all_drives(adapter_index)
-
-        pruned = []
-        for drive in drives:
-            if 'member_of' in drive:
-                continue
-            if 'target' in drive:
-                continue
-            pruned.append(drive)
-
-        return pruned
+        return [drive.to_dict() for drive in self.get_adapter(adapter_index).get_available()]
 
     @staticmethod
     def sort_drives(drives):
@@ -319,31 +435,28 @@ class RAIDActions(object):
             return drive_selector
 
         if drive_selector.lower() == 'all':
-            return [drive['index'] for drive in self.get_all_drives(adapter_index)]
+            return [drive.index for drive in self.get_adapter(adapter_index).drives]
 
         if drive_selector.lower() == 'unassigned':
-            return [drive['index'] for drive in self.get_unassigned(adapter_index)]
+            return [drive.index for drive in self.get_adapter(adapter_index).get_available()]
 
         return sorted(self.get_selection_from_pattern(drive_selector))
 
     def fetch_selection(self, adapter_index, selection):
-        # Build an index of unassigned drives for O(1) matching
-        unassigned_drives = {
-            d['index']: d for d in self.get_unassigned(adapter_index)
-            }
+        adapter = self.get_adapter(adapter_index)
 
         selected_drives = []
 
         for drive in selection:
-            ud = unassigned_drives.get(drive)
-            if not ud:
+            ud = adapter.get_drive(drive)
+            if not ud or ud.assigned:
                 raise RAIDAbstractionException('Drive {} is not available'.format(drive))
 
-            if not ud['status'] == 'OK':
+            if not ud.status == 'OK':
                 raise RAIDAbstractionException(
                     'Attempting to initialize a failed drive : {} {}'.format(
-                        drive, ud['status']))
-            selected_drives.append(ud)
+                        drive, ud.status))
+            selected_drives.append(ud.to_dict())
         return selected_drives
 
     def get_drives_from_selection(self, adapter_index, drive_selector):
@@ -0,0 +1,254 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Compact adapter model for the RAID abstraction.
+
+Drivers transform vendor output into the dictionary schema documented in
+RAIDActions.get_adapter_info. RAIDActions builds an Adapter from that once per
+snapshot, drive indexes, array membership, and totals included, and answers
+selections from it. Models are shared between callers and must not be
+modified, to_dict returns the dictionary schema on demand.
+"""
+
+
+class PhysicalDrive(object):
+    __slots__ = ('size', 'status', 'type', 'extra', 'index', 'address',
+                 'member_of', 'spare', 'target')
+
+    def __init__(self, size, status, drive_type, extra, address=None,
+                 member_of=None, spare=False, target=None):
+        """
+        :param size: bytes
+        :param status: OK, Failed, ...
+        :param drive_type: vendor media type
+        :param extra: vendor details
+        :param address: vendor address, see RAIDActions.drive_address
+        :param member_of: index of the array the drive belongs to
+        :param spare: the drive is a hot spare
+        :param target: array(s) a spare is dedicated to, vendor format
+        """
+        self.size = size
+        self.status = status
+        self.type = drive_type
+        self.extra = extra
+        self.index = None
+        self.address = address
+        self.member_of = member_of
+        self.spare = spare
+        self.target = target
+
+    @classmethod
+    def from_dict(cls, drive, address=None, member_of=None):
+        return cls(drive['size'], drive['status'], drive['type'],
+                   drive['extra'], address=address, member_of=member_of,
+                   spare='target' in drive, target=drive.get('target'))
+
+    @property
+    def assigned(self):
+        """ Array members and spares cannot be selected """
+        return self.member_of is not None or self.spare
+
+    def to_dict(self):
+        drive = {
+            'size': self.size,
+            'status': self.status,
+            'type': self.type,
+            'extra': dict(self.extra),
+            'index': self.index
+        }
+        if self.member_of is not None:
+            drive['member_of'] = self.member_of
+        if self.spare:
+            drive['target'] = isinstance(self.target, list) and \
+                list(self.target) or self.target
+        return drive
+
+
+class LogicalDrive(object):
+    __slots__ = ('level', 'size', 'status', 'extra')
+
+    def __init__(self, level, size, status, extra):
+        self.level = level
+        self.size = size
+        self.status = status
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, logical_drive):
+        return cls(logical_drive['level'], logical_drive['size'],
+                   logical_drive['status'], logical_drive['extra'])
+
+    def to_dict(self):
+        return {
+            'level': self.level,
+            'size': self.size,
+            'status': self.status,
+            'extra': dict(self.extra)
+        }
+
+
+class Array(object):
+    __slots__ = ('logical_drives', 'physical_drives', 'free_space', 'extra')
+
+    def __init__(self, logical_drives, physical_drives, free_space, extra):
+        self.logical_drives = logical_drives
+        self.physical_drives = physical_drives
+        self.free_space = free_space
+        self.extra = extra
+
+    def to_dict(self):
+        return {
+            'logical_drives': [ld.to_dict() for ld in self.logical_drives],
+            'physical_drives': [pd.to_dict() for pd in self.physical_drives],
+            'free_space': self.free_space,
+            'extra': dict(self.extra)
+        }
+
+
+class Adapter(object):
+    __slots__ = ('details', 'arrays', 'spares', 'unassigned', 'drives',
+                 'total_size', '_by_index', '_by_address', '_by_status',
+                 '_available')
+
+    def __init__(self, details, arrays, spares, unassigned, drives):
+        """
+        :param details: name, provider, vendor_info, and anything else the
+            driver reports outside of the configuration
+        :param arrays: Array list
+        :param spares: PhysicalDrive list, in vendor order
+        :param unassigned: PhysicalDrive list, in vendor order
+        :param drives: every PhysicalDrive in index order
+        """
+        self.details = details
+        self.arrays = arrays
+        self.spares = spares
+        self.unassigned = unassigned
+        self.drives = drives
+        self.total_size = 0
+
+        self._by_index = {}
+        self._by_address = {}
+        self._by_status = {}
+        self._available = []
+
+        for idx, drive in enumerate(drives):
+            drive.index = idx
+            self.total_size += drive.size
+            self._by_index[idx] = drive
+            if drive.address is not None:
+                self._by_address[drive.address] = drive
+            self._by_status.setdefault(drive.status, []).append(drive)
+            if not drive.assigned:
+                self._available.append(drive)
+
+    @classmethod
+    def from_dict(cls, adapter_info, sort_drives, address):
+        """
+        :param adapter_info: RAIDActions.transform_adapter_info output
+        :param sort_drives: RAIDActions.sort_drives, orders drive dictionaries
+            by physical location
+        :param address: RAIDActions.drive_address
+        :return: Adapter
+        """
+        configuration = adapter_info['configuration']
+        models = {}
+
+        def physical_drive(drive, member_of=None):
+            pd = PhysicalDrive.from_dict(drive, address(drive), member_of)
+            models[id(drive)] = pd
+            return pd
+
+        arrays = [
+            Array([LogicalDrive.from_dict(ld)
+                   for ld in array['logical_drives']],
+                  [physical_drive(pd, idx)
+                   for pd in array['physical_drives']],
+                  array['free_space'],
+                  array.get('extra', {}))
+            for idx, array in enumerate(configuration['arrays'])]
+        spares = [physical_drive(pd) for pd in configuration['spares']]
+        unassigned = [physical_drive(pd)
+                      for pd in configuration['unassigned']]
+
+        # Drivers sort dictionaries, sort once and carry the models along
+        drives = [pd for array in configuration['arrays']
+                  for pd in array['physical_drives']]
+        drives += configuration['spares'] + configuration['unassigned']
+        sort_drives(drives)
+
+        details = dict((key, value) for key, value in adapter_info.items()
+                       if key != 'configuration')
+
+        return cls(details, arrays, spares, unassigned,
+                   [models[id(drive)] for drive in drives])
+
+    @property
+    def name(self):
+        return self.details.get('name')
+
+    @property
+    def provider(self):
+        return self.details.get('provider')
+
+    @property
+    def vendor_info(self):
+        return self.details.get('vendor_info')
+
+    @property
+    def total_drives(self):
+        return len(self.drives)
+
+    def get_drive(self, index):
+        """
+        :param index: drive index
+        :return: PhysicalDrive or None
+        """
+        return self._by_index.get(index)
+
+    def get_drive_by_address(self, address):
+        """
+        :param address: vendor address, see RAIDActions.drive_address
+        :return: PhysicalDrive or None
+        """
+        return self._by_address.get(address)
+
+    def get_drives_by_status(self, status):
+        """
+        :param status: OK, Failed, ...
+        :return: PhysicalDrive list in index order
+        """
+        return list(self._by_status.get(status, []))
+
+    def get_available(self):
+        """
+        :return: drives which are neither array members nor spares, in index
+            order
+        """
+        return list(self._available)
+
+    def to_dict(self):
+        adapter = dict(self.details)
+        if isinstance(adapter.get('vendor_info'), dict):
+            adapter['vendor_info'] = dict(adapter['vendor_info'])
+        adapter.update({
+            'configuration': {
+                'arrays': [array.to_dict() for array in self.arrays],
+                'spares': [pd.to_dict() for pd in self.spares],
+                'unassigned': [pd.to_dict() for pd in self.unassigned]
+            },
+            'total_size': self.total_size,
+            'total_drives': self.total_drives
+        })
+        return adapter
@@ -83,6 +83,19 @@ class Storcli(object):
 
         return [c['Response Data'] for c in controllers]
 
+    def get_event_log_info(self, controller='all'):
+        """ Event log sequence numbers (newest, oldest, clear, shutdown, reboot)
+        :param controller: one or all controllers
+        :return: List of event log info objects
+        """
+        output = self.run_json('/c{} show eventloginfo'.format(controller))
+        try:
+            controllers = output['Controllers']
+        except KeyError:
+            raise StorcliException('Output is missing Controllers segment')
+
+        return [c.get('Response Data') for c in controllers]
+
     @staticmethod
     def check_command_status(data):
         if data['Command Status']['Status'] != 'Success':
@@ -110,6 +123,40 @@ class Storcli(object):
 
         return controller_list
 
+    def get_inventory(self):
+        """ Controller and disk group details for every controller. Each is read
+        with a single /call invocation, rather than once per controller
+
+        :return: (controller, disk group) pairs in controller order. The disk group
+            object is the same as get_disk_group(controller)[0]
+        :return type: list
+        """
+        controllers = self.controllers
+        output = self.run_json('/call/dall show all')
+
+        try:
+            controller_list = output['Controllers']
+        except KeyError:
+            raise StorcliException('Output is missing Controllers segment')
+
+        disk_groups = {}
+        for controller in controller_list:
+            self.check_command_status(controller)
+            disk_groups[controller['Command Status']['Controller']] = \
+                controller['Response Data']['Response Data']
+
+        inventory = []
+        for controller in controllers:
+            controller_id = controller['Basics']['Controller']
+            try:
+                inventory.append((controller, disk_groups[controller_id]))
+            except KeyError:
+                raise StorcliException(
+                    'Disk groups are missing for controller {}'.format(
+                        controller_id))
+
+        return inventory
+
     def delete(self, controller, virtual_drive='all'):
         """ Delete one or all virtual drives on a controller
         :param controller: Controller ID
@@ -120,7 +167,8 @@ class Storcli(object):
 
     def add(self, controller, array_type, drives, size=None, pdperarray=None, pdcache=None,
             dimmerswitch=None, io_mode='direct', write_policy='wb', read_policy='ra',
-            cachevd=False, stripe_size=None, spares=None, cached_bad_bbu=False, after_vd=None):
+            cachevd=False, stripe_size=None, spares=None, cached_bad_bbu=False, after_vd=None,
+            each=False):
         """ Add a virtual drive
 
         :param controller: Controller ID
@@ -145,13 +193,18 @@ value is automatically chosen.(0 to 16)
         :param spares: Numer drives allocated as hot spares
         :param cached_bad_bbu: Enable write caches even when the bbu is missing or discharged
         :param after_vd: Specify an existing VD to add this new vd behind
+        :param each: Create a virtual drive on each of the drives, r0 only
         :return: AttributeString of command output
         """
 
-        command = '/c{controller} add vd type={array_type}{size}drives={drives}  ' \
+        if each and array_type not in ('r0', 'raid0'):
+            raise StorcliException('Only raid0 virtual drives can be created on each drive')
+
+        command = '/c{controller} add vd {each}type={array_type}{size}drives={drives}  ' \
                   '{write_policy} {read_policy} {io_mode} {stripe_size}{spares}' \
                   '{cache_bad_bbu}{after_vd}{pdperarray}'.format(
                     **{'controller': controller,
+                       'each': each and 'each ' or '',
                        'array_type': array_type,
                        'drives': drives,
                        'size': size and ' size={} '.format(size) or ' ',
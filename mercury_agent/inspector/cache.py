@@ -0,0 +1,138 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Boot scoped inspection cache
+
+The result of the last inspection is persisted so that an agent restarted
+within the same boot (crash, upgrade, etc) can register immediately rather
+than waiting on a full inspection. The cache is keyed by the kernel boot_id
+and the agent version; a cache written during a different boot or by a
+different agent version is ignored. The default location is under /run, a
+tmpfs which does not survive a reboot.
+"""
+
+import logging
+import os
+import tempfile
+
+import msgpack
+
+from mercury_agent.inspector import fingerprint
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = '/run/mercury-agent/inspection.msgpack'
+
+
+def agent_version():
+    """
+    :return: The installed mercury-agent version or None if the agent is
+        running from a source tree
+    """
+    import pkg_resources
+
+    try:
+        return pkg_resources.get_distribution('mercury-agent').version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+def _key():
+    boot_id = fingerprint.boot_id()
+    version = agent_version()
+    if not (boot_id and version):
+        return None
+    return {'boot_id': boot_id, 'version': version}
+
+
+def save(device_info, fingerprints, path=DEFAULT_CACHE_PATH):
+    """ Persist an inspection. The file is replaced atomically so that a
+    crash while writing cannot leave a truncated cache behind. Callers
+    saving the live global_device_info should use inspect.save_cache, which
+    holds the inspection lock while the inspection is serialized
+
+    :param device_info: The inspection result
+    :param fingerprints: inspector fingerprints taken during the inspection
+    :param path: The cache file
+    :return: True if the cache was written
+    """
+    key = _key()
+    if not key:
+        log.debug('boot_id or agent version is unknown, not caching')
+        return False
+
+    key['device_info'] = device_info
+    key['fingerprints'] = fingerprints
+
+    try:
+        packed = msgpack.packb(key)
+    except Exception as e:
+        log.error('Could not serialize inspection for caching: %s', e)
+        return False
+
+    directory = os.path.dirname(path)
+    temp_path = None
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Every writer gets its own temporary file, the last rename wins
+        fd, temp_path = tempfile.mkstemp(
+            dir=directory, prefix='.{}.'.format(os.path.basename(path)))
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(packed)
+        os.rename(temp_path, path)
+    except OSError as e:
+        log.error('Could not write inspection cache %s: %s', path, e)
+        if temp_path:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+        return False
+
+    log.debug('Cached inspection in %s', path)
+    return True
+
+
+def load(path=DEFAULT_CACHE_PATH):
+    """ Load a cached inspection written during this boot by this version
+    of the agent
+
+    :param path: The cache file
+    :return: (device_info, fingerprints) or (None, None)
+    """
+    key = _key()
+    if not key:
+        return None, None
+
+    try:
+        with open(path, 'rb') as fp:
+            cached = msgpack.unpackb(fp.read(), encoding='utf-8')
+    except (IOError, OSError):
+        return None, None
+    except Exception as e:
+        log.warning('Inspection cache %s is corrupt: %s', path, e)
+        return None, None
+
+    if not isinstance(cached, dict):
+        log.warning('Inspection cache %s is corrupt', path)
+        return None, None
+
+    for k, v in key.items():
+        if cached.get(k) != v:
+            log.info('Inspection cache %s is stale, %s has changed', path, k)
+            return None, None
+
+    return cached.get('device_info'), cached.get('fingerprints') or {}
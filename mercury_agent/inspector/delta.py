@@ -0,0 +1,180 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Structural diff for device_info
+
+diff() produces JSON patch (RFC 6902) style operations. List elements are
+matched by an identity key (interface devname, PCI slot, drive index, etc)
+so that a drive changing state produces a single operation rather than a
+replacement of the entire drive list.
+
+The backend update endpoint applies updates with a mongo $set, which cannot
+insert into or remove from a list. to_update() folds operations into dotted
+$set paths, replacing the enclosing list or dictionary whenever an element
+is added or removed.
+"""
+
+IDENTITY_KEYS = ('devname', 'slot', 'index')
+
+
+def _op(op, path, value=None):
+    operation = {'op': op, 'path': list(path)}
+    if op != 'remove':
+        operation['value'] = value
+    return operation
+
+
+def identity_key(elements):
+    """ Finds a key which uniquely identifies every element of a list
+
+    :param elements: list
+    :return: The first key of IDENTITY_KEYS which is present, hashable, and
+        unique in every element, or None
+    """
+    if not elements or not all(isinstance(e, dict) for e in elements):
+        return None
+
+    for key in IDENTITY_KEYS:
+        try:
+            values = set(e[key] for e in elements)
+        except (KeyError, TypeError):
+            continue
+        if len(values) == len(elements):
+            return key
+    return None
+
+
+def _diff_dict(old, new, path):
+    ops = []
+    for key in old:
+        if key not in new:
+            ops.append(_op('remove', path + [key]))
+    for key, value in new.items():
+        if key not in old:
+            ops.append(_op('add', path + [key], value))
+        else:
+            ops += diff(old[key], value, path + [key])
+    return ops
+
+
+def _diff_list(old, new, path):
+    key = identity_key(old)
+    if key is None or key != identity_key(new):
+        if len(old) != len(new):
+            return [_op('replace', path, new)]
+        ops = []
+        for idx, (o, n) in enumerate(zip(old, new)):
+            ops += diff(o, n, path + [idx])
+        return ops
+
+    old_ids = [e[key] for e in old]
+    new_ids = [e[key] for e in new]
+    new_set = set(new_ids)
+    old_set = set(old_ids)
+
+    # Elements present in both lists must not have been reordered
+    if [i for i in old_ids if i in new_set] != \
+            [i for i in new_ids if i in old_set]:
+        return [_op('replace', path, new)]
+
+    ops = []
+    # Operations are applied in order, remove from the end so indexes of
+    # pending removals do not shift
+    for idx in reversed(range(len(old_ids))):
+        if old_ids[idx] not in new_set:
+            ops.append(_op('remove', path + [idx]))
+    for idx, identity in enumerate(new_ids):
+        if identity not in old_set:
+            ops.append(_op('add', path + [idx], new[idx]))
+
+    by_id = dict(zip(old_ids, old))
+    for idx, element in enumerate(new):
+        if element[key] in by_id:
+            ops += diff(by_id[element[key]], element, path + [idx])
+    return ops
+
+
+def diff(old, new, path=None):
+    """ Compute the operations which transform old into new
+
+    :param old: previous value
+    :param new: current value
+    :param path: path of old and new within the document
+    :return: list of operations, {'op': add|remove|replace, 'path': [...],
+        'value': ...}
+    """
+    path = list(path or [])
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        return _diff_dict(old, new, path)
+
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        return _diff_list(list(old), list(new), path)
+
+    if type(old) != type(new) or old != new:
+        return [_op('replace', path, new)]
+
+    return []
+
+
+def _lookup(document, path):
+    for segment in path:
+        document = document[segment]
+    return document
+
+
+def _settable(path):
+    """ Mongo field names may not contain '.' or start with '$'. Returns the
+    longest prefix of path which can be expressed as a dotted field
+    """
+    for idx, segment in enumerate(path):
+        if isinstance(segment, str) and (
+                not segment or '.' in segment or segment.startswith('$')):
+            return path[:idx]
+    return path
+
+
+def to_update(operations, document):
+    """ Fold operations into a dictionary suitable for the backend update
+    endpoint
+
+    :param operations: operations produced by diff()
+    :param document: The document the operations were computed against, after
+        the change
+    :return: dict of dotted paths to values
+    """
+    targets = []
+    for operation in operations:
+        path = operation['path']
+        if operation['op'] == 'remove' or (
+                operation['op'] == 'add' and isinstance(path[-1], int)):
+            # $set cannot remove fields or insert list elements
+            path = path[:-1]
+        path = _settable(path)
+        if not path:
+            raise ValueError('Cannot express an update of the document root')
+        targets.append(tuple(path))
+
+    update = {}
+    # Parents sort before their descendants; a path which is already covered
+    # by a parent must not be set again
+    for path in sorted(set(targets), key=len):
+        if any(path[:length] in update for length in range(1, len(path))):
+            continue
+        update[path] = _lookup(document, path)
+
+    return {'.'.join(str(s) for s in path): value
+            for path, value in update.items()}
@@ -0,0 +1,124 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Cheap change detection sources for incremental inspection
+
+An inspector fingerprint is a callable returning a string which changes
+whenever the inspector's output may have changed. Fingerprints must be much
+cheaper than the inspector itself; they should never fork. A fingerprint of
+None means the inspector cannot be fingerprinted and is always run.
+
+Driver fingerprints (DriverBase.fingerprint) are the one exception. Some
+controllers only expose their state through a vendor CLI, so a driver may
+make a single cheap CLI call when that replaces several calls in inspect(),
+ie the MegaRAID event log sequence numbers.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+UEVENT_SEQNUM_PATH = '/sys/kernel/uevent_seqnum'
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as fp:
+            return fp.read()
+    except (IOError, OSError):
+        return b''
+
+
+def digest(*parts):
+    """ Reduce fingerprint components to a single value
+
+    :param parts: str or bytes objects
+    :return: hex digest or None, if any part is None
+    """
+    h = hashlib.sha1()
+    for part in parts:
+        if part is None:
+            return None
+        if not isinstance(part, bytes):
+            part = str(part).encode('utf-8')
+        h.update(part)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def boot_id():
+    """ Changes only when the system reboots """
+    return _read(BOOT_ID_PATH).strip().decode('utf-8')
+
+
+def uevent_seqnum():
+    """ The kernel uevent sequence number, incremented for every device add,
+    remove, or change event (hotplug, partition table changes, etc)
+    """
+    return _read(UEVENT_SEQNUM_PATH).strip().decode('utf-8')
+
+
+def contents(*patterns):
+    """ The contents of every file matching the glob patterns """
+    data = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            data.append(path.encode('utf-8'))
+            data.append(_read(path))
+    return b'\0'.join(data)
+
+
+def listing(path):
+    """ Directory entries, detects devices being added or removed """
+    try:
+        return ' '.join(sorted(os.listdir(path)))
+    except OSError:
+        return ''
+
+
+def mtimes(*patterns):
+    """ Modification times of every path matching the glob patterns """
+    stamps = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            try:
+                stamps.append('{}:{}'.format(path, os.stat(path).st_mtime_ns))
+            except OSError:
+                continue
+    return ' '.join(stamps)
+
+
+def take(name, f):
+    """ Call an inspector's fingerprint function, if it has one
+
+    :param name: inspector name, for logging
+    :param f: The exposed inspector
+    :return: fingerprint or None
+    """
+    fingerprint = getattr(f, 'fingerprint', None)
+    if not fingerprint:
+        return None
+
+    # noinspection PyBroadException
+    try:
+        return fingerprint()
+    except Exception as e:
+        log.warning('Fingerprint for %s failed: %s', name, e)
+        return None
@@ -12,9 +12,45 @@
 #    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
+"""
+biosdevname --policy physical names for every interface in one pass.
 
+Embedded devices are located with SMBIOS type 41 (onboard devices extended
+information) records and slot devices with type 9 (system slots) records,
+read from the tables exported by the kernel in /sys/firmware/dmi/tables:
+
+    em<instance>            embedded ports
+    p<slot>p<port>          slot ports, numbered from 1 in PCI address order
+    <physical name>_<vf>    SR-IOV virtual functions
+
+When the tables are not available, or predate SMBIOS 2.6 (which added the
+slot bus addresses), biosdevname is run for each interface.
+"""
+
+import errno
+import logging
+import os
+import re
 import shlex
+import struct
 import subprocess
+import threading
+
+log = logging.getLogger(__name__)
+
+SYSFS_DMI_TABLES = '/sys/firmware/dmi/tables'
+SYSFS_NET = '/sys/class/net'
+
+SMBIOS_SYSTEM_SLOTS = 9
+SMBIOS_ONBOARD_DEVICES = 41
+SMBIOS_END_OF_TABLE = 127
+
+_HEADER = struct.Struct('<BBH')
+# segment group, bus, device/function
+_SLOT_LOCATION = struct.Struct('<xxxxxxxxxHxxHBB')
+_ONBOARD_LOCATION = struct.Struct('<xxxxxxBHBB')
+
+_PCI_ADDRESS = re.compile(r'^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$')
 
 
 def get_name(interface):
@@ -37,4 +73,279 @@ def get_name(interface):
         else:
             raise Exception('Problem running biosdevname: %d' % p.returncode)
 
-    return out.strip()
+    return out.decode('utf-8').strip()
+
+
+def parse_entry_point(data):
+    """
+    :param data: contents of smbios_entry_point
+    :return: (major, minor) SMBIOS version or None
+    """
+    if data.startswith(b'_SM3_') and len(data) >= 9:
+        return data[7], data[8]
+    if data.startswith(b'_SM_') and len(data) >= 8:
+        return data[6], data[7]
+    return None
+
+
+def iter_structures(table):
+    """
+    :param table: contents of the DMI structure table
+    :return: generator of (type, formatted area) tuples, the strings which
+        follow each structure are skipped
+    """
+    offset = 0
+    end = len(table)
+    while offset + _HEADER.size <= end:
+        structure_type, length, _ = _HEADER.unpack_from(table, offset)
+        if length < _HEADER.size or offset + length > end:
+            log.debug('Truncated SMBIOS structure at %d', offset)
+            return
+        yield structure_type, table[offset:offset + length]
+        if structure_type == SMBIOS_END_OF_TABLE:
+            return
+        # The string set is terminated by a double null
+        strings_end = table.find(b'\0\0', offset + length)
+        if strings_end < 0:
+            return
+        offset = strings_end + 2
+
+
+def _pci_address(segment, bus, devfn):
+    if segment == 0xffff or bus == 0xff or devfn == 0xff:
+        return None
+    return '%04x:%02x:%02x.%x' % (segment, bus, devfn >> 3, devfn & 7)
+
+
+class PCILocations(object):
+    def __init__(self, embedded=None, slots=None):
+        """
+        :param embedded: dictionary of PCI address: SMBIOS device instance
+        :param slots: dictionary of PCI address: slot number
+        """
+        self.embedded = embedded or {}
+        self.slots = slots or {}
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        :param table: contents of the DMI structure table
+        """
+        embedded = {}
+        slots = {}
+        for structure_type, data in iter_structures(table):
+            if structure_type == SMBIOS_SYSTEM_SLOTS and \
+                    len(data) >= _SLOT_LOCATION.size:
+                slot, segment, bus, devfn = _SLOT_LOCATION.unpack_from(data)
+                address = _pci_address(segment, bus, devfn)
+                if address and slot:
+                    slots[address] = slot
+            elif structure_type == SMBIOS_ONBOARD_DEVICES and \
+                    len(data) >= _ONBOARD_LOCATION.size:
+                instance, segment, bus, devfn = \
+                    _ONBOARD_LOCATION.unpack_from(data)
+                address = _pci_address(segment, bus, devfn)
+                if address:
+                    embedded[address] = instance
+        return cls(embedded, slots)
+
+    @classmethod
+    def from_sysfs(cls, path=SYSFS_DMI_TABLES):
+        """
+        :param path: directory holding smbios_entry_point and DMI
+        :return: PCILocations or None if the tables are missing or predate
+            SMBIOS 2.6
+        :raises OSError: when the tables cannot be read, they are only
+            readable by root
+        """
+        try:
+            with open(os.path.join(path, 'smbios_entry_point'), 'rb') as fp:
+                version = parse_entry_point(fp.read())
+            if not version or version < (2, 6):
+                log.debug('SMBIOS %s does not provide slot addresses', version)
+                return None
+            with open(os.path.join(path, 'DMI'), 'rb') as fp:
+                return cls.from_table(fp.read())
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+
+    def locate(self, chain):
+        """
+        :param chain: PCI addresses from the root bus to the device
+        :return: ('em', instance), ('p', slot), or None
+        """
+        instance = self.embedded.get(chain[-1])
+        if instance is not None:
+            return 'em', instance
+        # Slot records usually address the root port above the device
+        for address in reversed(chain):
+            slot = self.slots.get(address)
+            if slot is not None:
+                return 'p', slot
+        return None
+
+
+__pci_locations = None
+__pci_locations_lock = threading.Lock()
+
+
+def get_pci_locations():
+    """
+    SMBIOS tables do not change while the system is running
+    :return: A PCILocations instance shared by the process or None
+    """
+    global __pci_locations
+    with __pci_locations_lock:
+        if __pci_locations is None:
+            __pci_locations = PCILocations.from_sysfs() or False
+        return __pci_locations or None
+
+
+def in_virtual_machine(cpuinfo='/proc/cpuinfo'):
+    """ biosdevname does not name interfaces under a hypervisor """
+    try:
+        with open(cpuinfo) as fp:
+            for line in fp:
+                if line.startswith('flags'):
+                    return 'hypervisor' in line.split()
+    except IOError:
+        pass
+    return False
+
+
+def _pci_chain(path):
+    """
+    :param path: resolved sysfs device path
+    :return: the PCI addresses in path or None when the device is not a PCI
+        function
+    """
+    chain = [part for part in path.split(os.sep) if _PCI_ADDRESS.match(part)]
+    if not chain or chain[-1] != os.path.basename(path):
+        return None
+    return chain
+
+
+def _read_int(path, default=0):
+    try:
+        with open(path) as fp:
+            return int(fp.read().strip(), 0)
+    except (IOError, ValueError):
+        return default
+
+
+def _follow(path):
+    """ Resolve one symbolic link. sysfs links are relative and nothing under
+    /sys/devices is a link, so the target is normalized rather than resolved
+    component by component
+    """
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return path
+    return os.path.normpath(os.path.join(os.path.dirname(path), target))
+
+
+def _virtual_functions(physfn):
+    """
+    :param physfn: physical function device path
+    :return: dictionary of VF PCI address: VF index
+    """
+    functions = {}
+    for name in os.listdir(physfn):
+        if name.startswith('virtfn'):
+            functions[os.path.basename(
+                os.readlink(os.path.join(physfn, name)))] = int(name[6:])
+    return functions
+
+
+def resolve_names(locations, interfaces=None, path=SYSFS_NET):
+    """
+    Name every PCI network interface under path, slot ports are numbered
+    relative to the other interfaces in the same slot
+
+    :param locations: PCILocations
+    :param interfaces: interfaces to return, all by default
+    :param path: sysfs net class directory
+    :return: dictionary of interface: biosdevname, interfaces which cannot
+        be located are omitted
+    """
+    # (kind, number): [(address, dev_port, interface, device path), ...]
+    functions = {}
+    # interface: (physical function path, VF address)
+    virtual = {}
+    for interface in os.listdir(path):
+        device = _follow(os.path.join(
+            _follow(os.path.join(path, interface)), 'device'))
+        chain = _pci_chain(device)
+        if not chain:
+            continue
+
+        physfn = os.path.join(device, 'physfn')
+        if os.path.islink(physfn):
+            virtual[interface] = (_follow(physfn), chain[-1])
+            continue
+
+        location = locations.locate(chain)
+        if location is None:
+            continue
+        dev_port = _read_int(os.path.join(path, interface, 'dev_port'))
+        functions.setdefault(location, []).append(
+            (chain[-1], dev_port, interface, device))
+
+    names = {}
+    # device path: the interface of its first port
+    devices = {}
+    for (kind, number), ports in functions.items():
+        ports.sort()
+        for index, (_, dev_port, interface, device) in enumerate(ports, 1):
+            devices.setdefault(device, interface)
+            if kind == 'em':
+                names[interface] = 'em%d' % (number + dev_port)
+            else:
+                names[interface] = 'p%dp%d' % (number, index)
+
+    # physical function path: virtual functions
+    indexes = {}
+    for interface, (physfn, address) in virtual.items():
+        parent = names.get(devices.get(physfn))
+        if not parent:
+            continue
+        if physfn not in indexes:
+            indexes[physfn] = _virtual_functions(physfn)
+        index = indexes[physfn].get(address)
+        if index is not None:
+            names[interface] = '%s_%d' % (parent, index)
+
+    if interfaces is not None:
+        names = dict((interface, names[interface])
+                     for interface in interfaces if interface in names)
+    return names
+
+
+def get_names(interfaces=None):
+    """
+    Resolve biosdevname names for many interfaces at once
+
+    :param interfaces: interface names, all interfaces by default
+    :return: dictionary of interface: biosdevname, interfaces without a name
+        are omitted
+    :raises OSError: when SMBIOS cannot be read as a regular user
+    """
+    if in_virtual_machine():
+        return {}
+
+    locations = get_pci_locations()
+    if locations is not None:
+        return resolve_names(locations, interfaces, SYSFS_NET)
+
+    log.debug('SMBIOS tables are unavailable, running biosdevname')
+    if interfaces is None:
+        interfaces = os.listdir(SYSFS_NET)
+    names = {}
+    for interface in interfaces:
+        name = get_name(interface)
+        if name:
+            names[interface] = name
+    return names
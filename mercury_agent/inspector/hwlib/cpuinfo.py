@@ -13,7 +13,83 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import array
+import errno
+import logging
 import os
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+SYSFS_CPU_PATH = '/sys/devices/system/cpu'
+SYSFS_NODE_PATH = '/sys/devices/system/node'
+
+# In the order CPUFrequencySampler stores them
+CPUFREQ_ATTRIBUTES = ('scaling_cur_freq', 'scaling_min_freq',
+                      'scaling_max_freq')
+
+_INTEGER_ATTRIBUTES = ('processor', 'physical_id', 'core_id', 'cpu_cores')
+
+# Attributes repeated, verbatim, for every logical processor
+_INTERNED_ATTRIBUTES = ('flags', 'bugs', 'model_name', 'vendor_id',
+                        'cache_size', 'microcode', 'address_sizes')
+
+# Every package normally reports the same flags, they share one set
+_flag_sets = {}
+
+# /proc/cpuinfo key: normalized key
+_keys = {}
+
+
+def intern_flags(flags):
+    """
+    :param flags: /proc/cpuinfo flags string
+    :return: frozenset of interned flag names, shared by identical strings
+    """
+    flag_set = _flag_sets.get(flags)
+    if flag_set is None:
+        flag_set = _flag_sets.setdefault(
+            flags, frozenset(sys.intern(flag) for flag in flags.split()))
+    return flag_set
+
+
+def parse_attribute(line):
+    """ Parse a /proc/cpuinfo line
+
+    :return: (key, value), key is lower case with spaces replaced by
+        underscores
+    """
+    k, v = line.split(':', 1)
+    fixed_key = _keys.get(k)
+    if fixed_key is None:
+        fixed_key = _keys.setdefault(
+            k, sys.intern(k.strip().replace(' ', '_').lower()))
+    stripped_value = v.strip()
+
+    if fixed_key in _INTEGER_ATTRIBUTES:
+        stripped_value = int(stripped_value)
+    elif fixed_key in _INTERNED_ATTRIBUTES:
+        stripped_value = sys.intern(stripped_value)
+
+    return fixed_key, stripped_value
+
+
+def parse_cpu_list(cpu_list):
+    """ Parse a sysfs cpu list, ie 0-3,8,10-11
+
+    :return: list of ints
+    """
+    cpus = []
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
 
 
 def build_index(l, key):
@@ -64,26 +140,27 @@ class CPUInfo(object):
             for attribute in core.splitlines():
                 if not attribute:
                     continue
-                k, v = attribute.split(':')
-                fixed_key = k.strip().replace(' ', '_').lower()
-                stripped_value = v.strip()
-
-                if fixed_key in ['processor', 'physical_id', 'core_id', 'cpu_cores']:
-                    stripped_value = int(stripped_value)
-
-                core_dict[fixed_key] = stripped_value
+                k, v = parse_attribute(attribute)
+                core_dict[k] = v
 
             self.core_dicts.append(core_dict)
 
         self.core_dicts.sort(key=lambda d: d['processor'])
+        self._physical_index = None
+        self._logical_processor_index = None
 
     @property
     def physical_index(self):
-        return build_index(self.core_dicts, 'physical_id')
+        if self._physical_index is None:
+            self._physical_index = build_index(self.core_dicts, 'physical_id')
+        return self._physical_index
 
     @property
     def logical_processor_index(self):
-        return build_index(self.core_dicts, 'processor')
+        if self._logical_processor_index is None:
+            self._logical_processor_index = build_index(self.core_dicts,
+                                                        'processor')
+        return self._logical_processor_index
 
     @property
     def processor_ids(self):
@@ -113,16 +190,21 @@ class CPUInfo(object):
     @property
     def core_zero_index(self):
         physical_index = self.physical_index
-        for physical_id in physical_index:
-            physical_index[physical_id] = physical_index[physical_id][0]
-        return physical_index
+        return dict((physical_id, physical_index[physical_id][0])
+                    for physical_id in physical_index)
 
     @staticmethod
-    def get_speed_info(core_dict):
+    def get_speed_info(core_dict, cpufreq=None):
+        """
+        :param core_dict: A processor from /proc/cpuinfo
+        :param cpufreq: The get_cpufreq_info dictionary of the processor, when
+            it has already been sampled
+        """
         speed_info = dict()
         processor_id = int(core_dict['processor'])
         speed_info['model_name'] = core_dict['model_name']
-        cpufreq = get_cpufreq_info(processor_id)
+        if cpufreq is None:
+            cpufreq = get_cpufreq_info(processor_id)
         cpufreq_enabled = bool(cpufreq) or False
 
         speed_info['bogomips'] = float(core_dict['bogomips'])
@@ -152,3 +234,441 @@ class CPUInfo(object):
     @property
     def one_core(self):
         return self.core_dicts and self.core_dicts[0] or dict()
+
+
+def _read(name, dir_fd=None):
+    fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def _read_int(name, default=None, dir_fd=None):
+    try:
+        return int(_read(name, dir_fd))
+    except (OSError, ValueError):
+        return default
+
+
+def _read_cpu_list(name, dir_fd=None):
+    try:
+        return parse_cpu_list(_read(name, dir_fd).decode())
+    except (OSError, ValueError):
+        return []
+
+
+class LogicalCPU(object):
+    __slots__ = ('processor', 'package_id', 'die_id', 'core_id', 'node',
+                 'thread_siblings')
+
+    def __init__(self, processor, package_id, die_id, core_id, node,
+                 thread_siblings):
+        self.processor = processor
+        self.package_id = package_id
+        self.die_id = die_id
+        self.core_id = core_id
+        self.node = node
+        self.thread_siblings = thread_siblings
+
+
+class CPUPackage(object):
+    __slots__ = ('package_id', 'cpus', 'cores', 'dies', 'nodes', 'info',
+                 'flags')
+
+    def __init__(self, package_id):
+        self.package_id = package_id
+        # LogicalCPU objects, by processor
+        self.cpus = []
+        # (die_id, core_id): [LogicalCPU, ...], SMT siblings
+        self.cores = {}
+        self.dies = set()
+        self.nodes = set()
+        # /proc/cpuinfo attributes of the first processor in the package
+        self.info = {}
+        self.flags = frozenset()
+
+    @property
+    def representative(self):
+        return self.cpus[0]
+
+    @property
+    def core_count(self):
+        return len(self.cores)
+
+    @property
+    def thread_count(self):
+        return len(self.cpus)
+
+
+class CPUTopology(object):
+    """
+    Logical processors grouped by package, die, core, and NUMA node using
+    /sys/devices/system/cpu/cpu*/topology. Model information is read from
+    /proc/cpuinfo for the first processor of each package only; reading
+    stops once every package has been described.
+    """
+    def __init__(self, sysfs_path=SYSFS_CPU_PATH, node_path=SYSFS_NODE_PATH,
+                 cpuinfo_path='/proc/cpuinfo'):
+        self.sysfs_path = sysfs_path
+        self.cpus = {}
+        self.packages = {}
+        self.nodes = {}
+
+        node_index = self._read_nodes(node_path)
+
+        for entry in os.listdir(sysfs_path):
+            if not entry.startswith('cpu') or not entry[3:].isdigit():
+                continue
+            processor = int(entry[3:])
+            try:
+                dir_fd = os.open(os.path.join(sysfs_path, entry, 'topology'),
+                                 os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                # offline
+                continue
+            try:
+                cpu = LogicalCPU(
+                    processor,
+                    _read_int('physical_package_id', dir_fd=dir_fd),
+                    _read_int('die_id', 0, dir_fd=dir_fd),
+                    _read_int('core_id', dir_fd=dir_fd),
+                    node_index.get(processor),
+                    _read_cpu_list('thread_siblings_list', dir_fd=dir_fd))
+            finally:
+                os.close(dir_fd)
+            if cpu.package_id is None:
+                continue
+            self.cpus[processor] = cpu
+
+        for processor in sorted(self.cpus):
+            cpu = self.cpus[processor]
+            package = self.packages.get(cpu.package_id)
+            if package is None:
+                package = self.packages[cpu.package_id] = CPUPackage(
+                    cpu.package_id)
+            package.cpus.append(cpu)
+            package.cores.setdefault((cpu.die_id, cpu.core_id), []).append(
+                cpu)
+            package.dies.add(cpu.die_id)
+            if cpu.node is not None:
+                package.nodes.add(cpu.node)
+                self.nodes.setdefault(cpu.node, []).append(cpu)
+
+        self._read_cpuinfo(cpuinfo_path)
+
+    @staticmethod
+    def available(sysfs_path=SYSFS_CPU_PATH):
+        return os.path.exists(
+            os.path.join(sysfs_path, 'cpu0', 'topology',
+                         'physical_package_id'))
+
+    @staticmethod
+    def _read_nodes(node_path):
+        """
+        :return: dictionary of processor: NUMA node
+        """
+        index = {}
+        try:
+            entries = os.listdir(node_path)
+        except OSError:
+            return index
+
+        for entry in entries:
+            if not entry.startswith('node') or not entry[4:].isdigit():
+                continue
+            node = int(entry[4:])
+            for processor in _read_cpu_list(
+                    os.path.join(node_path, entry, 'cpulist')):
+                index[processor] = node
+        return index
+
+    def _read_cpuinfo(self, cpuinfo_path):
+        wanted = dict((package.representative.processor, package)
+                      for package in self.packages.values())
+        if not wanted:
+            return
+
+        with open(cpuinfo_path) as fp:
+            package = None
+            for line in fp:
+                if not line.strip():
+                    if package:
+                        del wanted[package.representative.processor]
+                        if not wanted:
+                            break
+                    package = None
+                    continue
+
+                if package is None:
+                    if not line.startswith('processor'):
+                        continue
+                    package = wanted.get(parse_attribute(line)[1])
+                    if package is None:
+                        # Skip the rest of this processor's block
+                        package = False
+                    else:
+                        package.info['processor'] = \
+                            package.representative.processor
+                    continue
+
+                if package is False:
+                    continue
+
+                k, v = parse_attribute(line)
+                if k == 'flags':
+                    package.flags = intern_flags(v)
+                else:
+                    package.info[k] = v
+
+    def get_package(self, package_id):
+        return self.packages.get(package_id)
+
+    def get_siblings(self, processor):
+        """
+        :return: The processors sharing processor's core, including processor
+        """
+        cpu = self.cpus.get(processor)
+        return cpu and cpu.thread_siblings or []
+
+    @property
+    def physical_processor_count(self):
+        return len(self.packages)
+
+    @property
+    def logical_core_count(self):
+        return len(self.cpus)
+
+    @property
+    def total_physical_core_count(self):
+        return sum(package.core_count for package in self.packages.values())
+
+
+def _open_file_limit(count):
+    """
+    :return: (soft, hard, needed), needed is the soft limit required to open
+        count more descriptors
+    """
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    in_use = len(os.listdir('/proc/self/fd'))
+    return soft, hard, in_use + count + 64
+
+
+def raise_open_file_limit(count):
+    """ Raise the soft open file limit, up to the hard limit, so that count
+    more descriptors can be opened. CPUFrequencySampler holds three
+    descriptors per processor and does not change the limit itself; callers
+    sampling large systems raise it explicitly
+
+    :param count: The number of descriptors which will be opened
+    :return: The soft limit
+    """
+    import resource
+
+    soft, hard, needed = _open_file_limit(count)
+    if soft == resource.RLIM_INFINITY or needed <= soft:
+        return soft
+    limit = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+    log.info('Raising the open file limit from %d to %d', soft, limit)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    return limit
+
+
+def _check_open_file_limit(count):
+    import resource
+
+    soft, _, needed = _open_file_limit(count)
+    if soft != resource.RLIM_INFINITY and needed > soft:
+        raise OSError(
+            errno.EMFILE,
+            '{} descriptors are needed to sample cpufreq but the open file '
+            'limit is {}, see raise_open_file_limit'.format(count, soft))
+
+
+class CPUFrequencySampler(object):
+    """
+    Current, minimum, and maximum scaling frequencies, in kHz, of every
+    logical processor, or of a subset of them. The cpufreq attributes are
+    opened once and re-read with os.pread on each refresh; values are kept in
+    an array of three entries per processor, in CPUFREQ_ATTRIBUTES order.
+    """
+    CURRENT, MINIMUM, MAXIMUM = range(3)
+
+    def __init__(self, topology=None, processors=None):
+        """
+        :param topology: CPUTopology, read from sysfs by default
+        :param processors: The logical processors to sample, all of them by
+            default
+        :raises OSError: EMFILE if the open file limit is too low to hold a
+            descriptor for every attribute, see raise_open_file_limit
+        """
+        self.topology = topology or CPUTopology()
+        # Processors with a cpufreq policy, in the order they are stored
+        self.processors = []
+        self._fds = []
+
+        if processors is None:
+            processors = self.topology.cpus
+        # The processors asked for, including those without cpufreq
+        self.requested = sorted(processors)
+        candidates = self.requested
+        _check_open_file_limit(len(candidates) * len(CPUFREQ_ATTRIBUTES))
+        for processor in candidates:
+            fds = self._open(processor)
+            if fds:
+                self.processors.append(processor)
+                self._fds.extend(fds)
+
+        self.values = array.array('l', [0]) * len(self._fds)
+        self._positions = dict(
+            (processor, idx) for idx, processor in enumerate(self.processors))
+
+        # package_id: [position, ...] and package_id: [[position, ...], ...]
+        # with one list of SMT siblings per core
+        self._package_positions = {}
+        self._core_positions = {}
+        for package_id, package in self.topology.packages.items():
+            self._package_positions[package_id] = [
+                self._positions[cpu.processor] for cpu in package.cpus
+                if cpu.processor in self._positions]
+            cores = []
+            for key in sorted(package.cores):
+                siblings = [self._positions[cpu.processor]
+                            for cpu in package.cores[key]
+                            if cpu.processor in self._positions]
+                if siblings:
+                    cores.append(siblings)
+            self._core_positions[package_id] = cores
+
+        if self._fds:
+            self.refresh()
+
+    def _open(self, processor):
+        """
+        :return: A descriptor for each of CPUFREQ_ATTRIBUTES or None if the
+            processor has no cpufreq policy
+        """
+        path = os.path.join(self.topology.sysfs_path,
+                            'cpu{}'.format(processor), 'cpufreq')
+        fds = []
+        try:
+            for attribute in CPUFREQ_ATTRIBUTES:
+                fds.append(os.open(os.path.join(path, attribute),
+                                   os.O_RDONLY))
+        except OSError as e:
+            if fds:
+                log.warning('cpufreq is incomplete for cpu%d: %s',
+                            processor, e)
+            for fd in fds:
+                os.close(fd)
+            return None
+        return fds
+
+    @property
+    def enabled(self):
+        return bool(self._fds)
+
+    def refresh(self):
+        """ Re-read every attribute
+
+        :return: The values array
+        """
+        values = self.values
+        pread = os.pread
+        for idx, fd in enumerate(self._fds):
+            try:
+                values[idx] = int(pread(fd, 32, 0))
+            except (OSError, ValueError):
+                # The processor was taken offline
+                values[idx] = 0
+        return values
+
+    def close(self):
+        fds, self._fds = self._fds, []
+        for fd in fds:
+            os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_frequencies(self, processor):
+        """
+        :return: dictionary with cur, min, and max, the format of
+            get_cpufreq_info, or an empty dictionary
+        """
+        idx = self._positions.get(processor)
+        if idx is None:
+            return dict()
+        offset = idx * len(CPUFREQ_ATTRIBUTES)
+        return {
+            'cur': self.values[offset + self.CURRENT],
+            'min': self.values[offset + self.MINIMUM],
+            'max': self.values[offset + self.MAXIMUM]
+        }
+
+    def package_vectors(self, attribute=CURRENT):
+        """
+        :param attribute: CURRENT, MINIMUM, or MAXIMUM
+        :return: dictionary of package_id: array of the attribute for each
+            logical processor in the package, ordered by processor
+        """
+        values = self.values
+        width = len(CPUFREQ_ATTRIBUTES)
+        return dict(
+            (package_id, array.array(
+                'l', [values[idx * width + attribute] for idx in positions]))
+            for package_id, positions in self._package_positions.items())
+
+    def core_vectors(self, attribute=CURRENT):
+        """
+        :param attribute: CURRENT, MINIMUM, or MAXIMUM
+        :return: dictionary of package_id: array of the attribute for each
+            core, ordered by die and core id. SMT siblings share a clock; the
+            highest value among them is used.
+        """
+        values = self.values
+        width = len(CPUFREQ_ATTRIBUTES)
+        return dict(
+            (package_id, array.array(
+                'l', [max(values[idx * width + attribute] for idx in siblings)
+                      for siblings in cores]))
+            for package_id, cores in self._core_positions.items())
+
+
+__frequency_sampler = None
+__frequency_sampler_lock = threading.Lock()
+
+
+def sample_frequencies(processors, topology=None):
+    """
+    Read cpufreq through a sampler shared by the process; the attributes stay
+    open between calls and are reopened when the processors change
+    :param processors: logical processor numbers
+    :param topology: CPUTopology, read from sysfs by default
+    :return: dictionary of processor: get_cpufreq_info dictionary, empty for
+        processors without cpufreq, or None when the descriptors cannot be
+        held open
+    """
+    global __frequency_sampler
+    processors = sorted(processors)
+    with __frequency_sampler_lock:
+        sampler = __frequency_sampler
+        if sampler is not None and sampler.requested == processors:
+            sampler.refresh()
+        else:
+            if sampler is not None:
+                sampler.close()
+                __frequency_sampler = None
+            try:
+                sampler = CPUFrequencySampler(topology, processors)
+            except OSError as e:
+                log.warning('cpufreq will be read without a sampler: %s', e)
+                return None
+            __frequency_sampler = sampler
+        return dict((processor, sampler.get_frequencies(processor))
+                    for processor in processors)
@@ -17,6 +17,10 @@ import shlex
 import six
 import subprocess
 
+from collections.abc import MutableSequence
+
+from mercury_agent.inspector.hwlib import pci_sysfs
+
 # Class codes used by lspci.
 ETHERNET_CONTROLLER = '0200'
 NETWORK_CONTROLLER = '0280'
@@ -122,8 +126,56 @@ def parse_nnvmmk():
     return pcibus
 
 
-class PCIDevice(dict):
-    """Represents information about a PCI Device as returned by `lspci`."""
+def get_pci_devices():
+    """
+    Enumerates PCI devices from sysfs, falling back to lspci -nnvmmk when
+    sysfs is not mounted
+    :return: a list of dicts, see parse_nnvmmk
+    """
+    if pci_sysfs.available():
+        return pci_sysfs.enumerate_devices()
+    return parse_nnvmmk()
+
+
+PCI_FIELDS = (
+    'slot',
+    'class_id',
+    'vendor_id',
+    'device_id',
+    'class_name',
+    'vendor_name',
+    'device_name',
+    'svendor_name',
+    'svendor_id',
+    'sdevice_name',
+    'sdevice_id',
+    'revision',
+    'progif',
+    'driver'
+)
+
+_PCI_FIELD_SET = frozenset(PCI_FIELDS)
+
+# Fields which read as None when they are not set
+_PCI_OPTIONAL_FIELDS = frozenset((
+    'svendor_name',
+    'svendor_id',
+    'sdevice_name',
+    'sdevice_id',
+    'revision',
+    'progif',
+    'driver'
+))
+
+
+class PCIDevice(object):
+    """Represents information about a PCI Device as returned by `lspci`.
+
+    Fields are readable as attributes or, like the records returned by
+    get_pci_devices, as keys.
+    """
+    __slots__ = PCI_FIELDS
+
     def __init__(self,
                  slot=None,
                  class_id=None,
@@ -143,7 +195,6 @@ class PCIDevice(dict):
         if None in [slot, class_id, vendor_id, device_id]:
             raise LSPCIError(
                 'slot, class_id, vendor_id, and device_id are required.')
-        super(PCIDevice, self).__init__()
         self.slot = slot
         self.class_id = class_id
         self.vendor_id = vendor_id
@@ -160,40 +211,172 @@ class PCIDevice(dict):
         self.driver = driver
 
     def __getattr__(self, key):
-        try:
-            return self[key]
-        except (KeyError, AttributeError):
+        # Only reached for names which are not set
+        if key in _PCI_OPTIONAL_FIELDS:
             return None
+        raise AttributeError(
+            '{!r} object has no attribute {!r}'.format(
+                type(self).__name__, key))
+
+    def __getitem__(self, key):
+        if key not in _PCI_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _PCI_FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _PCI_FIELD_SET
+
+    def __eq__(self, other):
+        if isinstance(other, PCIDevice):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
 
-    def __setattr__(self, key, value):
-        self[key] = value
+    def __repr__(self):
+        return 'PCIDevice({})'.format(', '.join(
+            '{}={!r}'.format(k, getattr(self, k)) for k in PCI_FIELDS
+            if getattr(self, k) is not None))
 
+    def get(self, key, default=None):
+        if key not in _PCI_FIELD_SET:
+            return default
+        return getattr(self, key)
 
-class PCIBus(list):
-    def __init__(self, sudo=False):
-        super(PCIBus, self).__init__()
-        for it in parse_nnvmmk():
-            self.append(PCIDevice(**it))
+    def keys(self):
+        return list(PCI_FIELDS)
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in PCI_FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class PCIBus(MutableSequence):
+    """ The PCI devices of a host with indexes on the fields drivers and
+    platform detection query by. Indexes are built on the first query and
+    rebuilt after devices are added or removed; devices must not be modified
+    in place.
+    """
+    __slots__ = ('_devices', '_indexes')
+
+    INDEXED_FIELDS = ('slot', 'class_id', 'vendor_id', 'device_id', 'driver')
+
+    def __init__(self, devices=None, sudo=False):
+        """
+        :param devices: PCIDevice objects or records in the format returned by
+            get_pci_devices, ie device_info['pci']. The bus is enumerated when
+            None
+        :param sudo: Unused
+        """
+        if devices is None:
+            devices = get_pci_devices()
+        self._devices = [d if isinstance(d, PCIDevice) else PCIDevice(**d)
+                         for d in devices]
+        self._indexes = None
+
+    def __getitem__(self, index):
+        return self._devices[index]
+
+    def __setitem__(self, index, device):
+        self._devices[index] = device
+        self._indexes = None
+
+    def __delitem__(self, index):
+        del self._devices[index]
+        self._indexes = None
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'PCIBus({!r})'.format(self._devices)
+
+    def insert(self, index, device):
+        self._devices.insert(index, device)
+        self._indexes = None
+
+    def _index(self):
+        indexes = self._indexes
+        if indexes is None:
+            indexes = dict((field, {}) for field in self.INDEXED_FIELDS)
+            for device in self._devices:
+                for field in self.INDEXED_FIELDS:
+                    indexes[field].setdefault(
+                        getattr(device, field), []).append(device)
+            self._indexes = indexes
+        return indexes
+
+    def query(self, **criteria):
+        """ Find devices matching every criterion
+
+        query(class_id=RAID_CONTROLLER, driver='megaraid_sas')
+
+        :param criteria: values of INDEXED_FIELDS
+        :return: list of PCIDevice, in bus order
+        """
+        unknown = set(criteria) - set(self.INDEXED_FIELDS)
+        if unknown:
+            raise ValueError('PCIBus is not indexed by {}'.format(
+                ', '.join(sorted(unknown))))
+
+        indexes = self._index()
+        matches = None
+        for field, value in criteria.items():
+            devices = indexes[field].get(value, [])
+            if matches is None:
+                matches = devices
+            else:
+                keep = set(id(d) for d in devices)
+                matches = [d for d in matches if id(d) in keep]
+            if not matches:
+                return []
+
+        if matches is None:
+            return list(self._devices)
+        return list(matches)
+
+    def has(self, **criteria):
+        return bool(self.query(**criteria))
+
+    def get_device(self, slot):
+        devices = self._index()['slot'].get(slot)
+        return devices[0] if devices else None
 
     def get_devices_by_class(self, class_id):
-        sub_li = list()
-        for device in self:
-            if device.get('class_id') == class_id:
-                sub_li.append(device)
-        return sub_li
+        return self.query(class_id=class_id)
 
     def has_device_class(self, class_id):
-        for device in self:
-            if device.get('class_id') == class_id:
-                return True
-        return False
+        return class_id in self._index()['class_id']
 
     def get_devices_by_vendor(self, vendor_id):
-        sub_li = list()
-        for device in self:
-            if device.get('vendor_id') == vendor_id:
-                sub_li.append(device)
-        return sub_li
+        return self.query(vendor_id=vendor_id)
+
+    def get_devices_by_device_id(self, device_id):
+        return self.query(device_id=device_id)
+
+    def get_devices_by_driver(self, driver):
+        return self.query(driver=driver)
 
     def get_fibre_channel_devices(self):
         return self.get_devices_by_class(FIBRE_CHANNEL)
@@ -218,3 +401,13 @@ class PCIBus(list):
 
     def has_raid_bus_controller(self):
         return self.has_device_class(RAID_CONTROLLER)
+
+
+def as_pci_bus(pci_data):
+    """
+    :param pci_data: A PCIBus or a list of records, ie device_info['pci']
+    :return: PCIBus
+    """
+    if isinstance(pci_data, PCIBus):
+        return pci_data
+    return PCIBus(pci_data)
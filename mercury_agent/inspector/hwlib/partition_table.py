@@ -0,0 +1,294 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Reads GPT and MBR partition tables without parted.
+
+read_device_info returns what press's PartedInterface.device_info reports,
+built from sysfs and the first 34 sectors of the disk. Anything parted would
+need to look at more closely (damaged or backup-only GPT headers, labels
+other than gpt and msdos, filesystems written to the whole disk) is not
+recognized, and None is returned so that the caller can fall back to parted.
+"""
+
+import logging
+import os
+import struct
+import zlib
+
+from mercury_agent.inspector.hwlib.sysfs import SysFSSnapshot
+
+log = logging.getLogger(__name__)
+
+SYSFS_BLOCK = '/sys/class/block'
+
+# Protective MBR, primary GPT header, and 128 entries of 128 bytes
+LABEL_SECTORS = 34
+
+MBR_SIGNATURE = b'\x55\xaa'
+MBR_PROTECTIVE = 0xee
+MBR_EXTENDED = (0x05, 0x0f, 0x85)
+MBR_BOOTABLE = 0x80
+
+GPT_SIGNATURE = b'EFI PART'
+
+# Limits the extended boot record chain, a loop would never end
+MAX_LOGICAL_PARTITIONS = 128
+
+_MBR_ENTRY = struct.Struct('<B3sB3sII')
+_GPT_HEADER = struct.Struct('<8sIIIIQQQQ16sQIII')
+_GPT_ENTRY = struct.Struct('<16s16sQQQ')
+
+_DEVICE_ATTRIBUTES = ('size', 'device/vendor', 'device/model',
+                      'queue/logical_block_size',
+                      'queue/physical_block_size')
+
+# Kernel name prefix: (model, parted transport). A model of None is read
+# from sysfs
+_TRANSPORTS = (
+    ('nvme', (None, 'nvme')),
+    ('sd', (None, 'scsi')),
+    ('vd', ('Virtio Block Device', 'virtblk')),
+    ('xvd', ('Xen Virtual Block Device', 'xvd')),
+    ('md', ('Linux Software RAID Array', 'md')),
+    ('loop', ('Loopback device', 'loopback'))
+)
+
+
+def parse_mbr(sector):
+    """
+    :param sector: the first sector of the disk
+    :return: list of the four primary entries as (bootable, type, start LBA,
+        sectors) tuples or None if the sector does not hold a partition table
+    """
+    if len(sector) < 512 or sector[510:512] != MBR_SIGNATURE:
+        return None
+    entries = []
+    for index in range(4):
+        boot, _, partition_type, _, start, sectors = _MBR_ENTRY.unpack_from(
+            sector, 446 + index * _MBR_ENTRY.size)
+        if boot not in (0, MBR_BOOTABLE):
+            return None
+        entries.append((boot == MBR_BOOTABLE, partition_type, start, sectors))
+    return entries
+
+
+def parse_gpt_header(sector):
+    """
+    :param sector: LBA 1
+    :return: dictionary or None if the header is missing or damaged
+    """
+    if not sector.startswith(GPT_SIGNATURE) or len(sector) < _GPT_HEADER.size:
+        return None
+    (_, revision, header_size, crc, _, current_lba, backup_lba, first_lba,
+     last_lba, disk_guid, entries_lba, entries, entry_size,
+     entries_crc) = _GPT_HEADER.unpack_from(sector)
+    if header_size < _GPT_HEADER.size or header_size > len(sector):
+        return None
+    header = bytearray(sector[:header_size])
+    header[16:20] = b'\0\0\0\0'
+    if zlib.crc32(bytes(header)) != crc or current_lba != 1 or \
+            entry_size < _GPT_ENTRY.size:
+        return None
+    return {
+        'revision': revision,
+        'backup_lba': backup_lba,
+        'first_lba': first_lba,
+        'last_lba': last_lba,
+        'entries_lba': entries_lba,
+        'entries': entries,
+        'entry_size': entry_size,
+        'entries_crc': entries_crc
+    }
+
+
+def _partition(number, start_lba, sectors, sector_size, **extra):
+    """ A partition in the format of PartedInterface.partitions, in bytes """
+    start = start_lba * sector_size
+    size = sectors * sector_size
+    partition = {'number': number, 'start': start, 'end': start + size - 1,
+                 'size': size}
+    partition.update(extra)
+    return partition
+
+
+def parse_gpt_entries(data, header, sector_size):
+    """
+    :param data: the partition entry array
+    :param header: parse_gpt_header result
+    :return: list of partitions or None if the array is damaged
+    """
+    length = header['entries'] * header['entry_size']
+    if len(data) < length or zlib.crc32(data[:length]) != \
+            header['entries_crc']:
+        return None
+    partitions = []
+    for index in range(header['entries']):
+        type_guid, _, first, last, _ = _GPT_ENTRY.unpack_from(
+            data, index * header['entry_size'])
+        if type_guid == b'\0' * 16:
+            continue
+        partitions.append(_partition(index + 1, first, last - first + 1,
+                                     sector_size))
+    return partitions
+
+
+def _read(fd, offset, length):
+    data = os.pread(fd, length, offset)
+    if len(data) < length:
+        raise OSError('Short read at offset {}'.format(offset))
+    return data
+
+
+def _logical_partitions(fd, extended_lba, sector_size):
+    """ Follow the extended boot record chain
+
+    :return: list of logical partitions or None if the chain is damaged
+    """
+    partitions = []
+    ebr_lba = extended_lba
+    while len(partitions) < MAX_LOGICAL_PARTITIONS:
+        entries = parse_mbr(_read(fd, ebr_lba * sector_size, sector_size))
+        if entries is None:
+            return None
+        _, partition_type, start, sectors = entries[0]
+        if partition_type:
+            partitions.append(_partition(
+                5 + len(partitions), ebr_lba + start, sectors, sector_size,
+                type='logical'))
+        _, next_type, next_start, _ = entries[1]
+        if next_type not in MBR_EXTENDED or not next_start:
+            return partitions
+        ebr_lba = extended_lba + next_start
+    return None
+
+
+def read_partition_table(fd, sector_size):
+    """
+    :param fd: descriptor of the whole disk, opened for reading
+    :param sector_size: logical sector size
+    :return: dictionary of partition_table, disk_flags, and partitions, or
+        None if the label is not recognized
+    """
+    data = _read(fd, 0, LABEL_SECTORS * sector_size)
+    entries = parse_mbr(data[:sector_size])
+    if entries is None:
+        if data.count(0) == len(data):
+            return {'partition_table': 'unknown', 'disk_flags': '',
+                    'partitions': []}
+        return None
+
+    protective = [entry for entry in entries if entry[1] == MBR_PROTECTIVE]
+    if protective:
+        header = parse_gpt_header(data[sector_size:2 * sector_size])
+        if header is None:
+            log.debug('Damaged or missing primary GPT header')
+            return None
+        offset = header['entries_lba'] * sector_size
+        length = header['entries'] * header['entry_size']
+        if offset + length <= len(data):
+            array = data[offset:offset + length]
+        else:
+            array = _read(fd, offset, length)
+        partitions = parse_gpt_entries(array, header, sector_size)
+        if partitions is None:
+            log.debug('Damaged GPT partition entry array')
+            return None
+        return {'partition_table': 'gpt',
+                'disk_flags': protective[0][0] and 'pmbr_boot' or '',
+                'partitions': partitions}
+
+    if not any(entry[1] for entry in entries):
+        # A boot sector without partitions, possibly a filesystem
+        return None
+
+    partitions = []
+    for index, (_, partition_type, start, sectors) in enumerate(entries):
+        if not partition_type:
+            continue
+        if partition_type in MBR_EXTENDED:
+            partitions.append(_partition(index + 1, start, sectors,
+                                         sector_size, type='extended'))
+            logical = _logical_partitions(fd, start, sector_size)
+            if logical is None:
+                log.debug('Damaged extended partition chain')
+                return None
+            partitions.extend(logical)
+        else:
+            partitions.append(_partition(index + 1, start, sectors,
+                                         sector_size, type='primary'))
+    partitions.sort(key=lambda p: p['number'])
+    return {'partition_table': 'msdos', 'disk_flags': '',
+            'partitions': partitions}
+
+
+def parted_model(name, attributes):
+    """
+    :param name: kernel name, ie sda
+    :param attributes: block device sysfs attributes
+    :return: the model as parted prints it, ie ATA INTEL SSDSC2BB48 (scsi),
+        or None for unsupported device types
+    """
+    for prefix, (model, transport) in _TRANSPORTS:
+        if name.startswith(prefix):
+            break
+    else:
+        return None
+    if model is None:
+        model = ' '.join(value for value in (attributes.get('device/vendor'),
+                                             attributes.get('device/model'))
+                         if value)
+        if not model:
+            return None
+    return '{} ({})'.format(model, transport)
+
+
+def read_device_info(devname, sysfs=SYSFS_BLOCK):
+    """
+    :param devname: device node, ie /dev/sda
+    :param sysfs: sysfs block class directory
+    :return: dictionary matching PartedInterface.device_info, or None if
+        parted is needed
+    :raises OSError: if the disk cannot be read
+    """
+    name = os.path.basename(devname)
+    attributes = SysFSSnapshot(os.path.join(sysfs, name), _DEVICE_ATTRIBUTES)
+    model = parted_model(name, attributes)
+    try:
+        # sysfs reports the size in 512 byte sectors regardless of the
+        # logical sector size
+        size = int(attributes['size']) * 512
+        logical = int(attributes['queue/logical_block_size'])
+        physical = int(attributes['queue/physical_block_size'])
+    except ValueError:
+        return None
+    if model is None or not size:
+        return None
+
+    fd = os.open(devname, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        table = read_partition_table(fd, logical)
+    finally:
+        os.close(fd)
+    if table is None:
+        return None
+
+    return {
+        'model': model,
+        'device': devname,
+        'size': size,
+        'sector_size': {'logical': logical, 'physical': physical},
+        'partition_table': table['partition_table'],
+        'disk_flags': table['disk_flags']
+    }
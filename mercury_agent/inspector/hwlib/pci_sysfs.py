@@ -0,0 +1,155 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Enumerates PCI devices from /sys/bus/pci/devices. Produces the same records as
+lspci.parse_nnvmmk without running lspci.
+"""
+
+import logging
+import os
+
+from mercury_agent.inspector.hwlib import pciids
+
+log = logging.getLogger(__name__)
+
+SYSFS_PCI_DEVICES = '/sys/bus/pci/devices'
+
+
+def _read_id(dir_fd, name):
+    """ Read a sysfs hex attribute, ie 0x8086
+
+    :param dir_fd: descriptor of the device directory
+    :param name: attribute name
+    :return: int or None if the attribute is missing or malformed
+    """
+    try:
+        fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+    except OSError:
+        return None
+    try:
+        return int(os.read(fd, 64), 16)
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.close(fd)
+
+
+def _name(name, unknown):
+    return name if name is not None else unknown
+
+
+def read_device(path, address, ids):
+    """
+    :param path: sysfs device directory
+    :param address: PCI address, ie 0000:00:1f.2
+    :param ids: pciids.PCIIds
+    :return: dictionary in the format returned by lspci.parse_nnvmmk or None
+        if the device has disappeared
+    """
+    try:
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return None
+    try:
+        return _read_device(dir_fd, address, ids)
+    finally:
+        os.close(dir_fd)
+
+
+def _read_device(dir_fd, address, ids):
+    pci_class = _read_id(dir_fd, 'class')
+    vendor = _read_id(dir_fd, 'vendor')
+    device = _read_id(dir_fd, 'device')
+    if None in (pci_class, vendor, device):
+        return None
+
+    class_id = '{:04x}'.format(pci_class >> 8)
+    vendor_id = '{:04x}'.format(vendor)
+    device_id = '{:04x}'.format(device)
+
+    record = {
+        'slot': address,
+        'class_id': class_id,
+        'class_name': _name(ids.class_name(class_id), pciids.UNKNOWN_CLASS),
+        'vendor_id': vendor_id,
+        'vendor_name': _name(ids.vendor_name(vendor_id),
+                             pciids.UNKNOWN_VENDOR),
+        'device_id': device_id,
+        'device_name': _name(ids.device_name(vendor_id, device_id),
+                             pciids.UNKNOWN_DEVICE)
+    }
+
+    # lspci omits the subsystem, revision, and programming interface when
+    # they are zero
+    svendor = _read_id(dir_fd, 'subsystem_vendor')
+    sdevice = _read_id(dir_fd, 'subsystem_device')
+    if svendor and svendor != 0xffff and sdevice is not None:
+        svendor_id = '{:04x}'.format(svendor)
+        sdevice_id = '{:04x}'.format(sdevice)
+        record['svendor_id'] = svendor_id
+        record['svendor_name'] = _name(ids.vendor_name(svendor_id),
+                                       pciids.UNKNOWN_VENDOR)
+        record['sdevice_id'] = sdevice_id
+        record['sdevice_name'] = _name(
+            ids.subsystem_name(vendor_id, device_id, svendor_id, sdevice_id),
+            pciids.UNKNOWN_DEVICE)
+
+    revision = _read_id(dir_fd, 'revision')
+    if revision:
+        record['revision'] = '{:02x}'.format(revision)
+
+    if pci_class & 0xff:
+        record['progif'] = '{:02x}'.format(pci_class & 0xff)
+
+    try:
+        record['driver'] = os.path.basename(
+            os.readlink('driver', dir_fd=dir_fd))
+    except OSError:
+        pass
+
+    return record
+
+
+def available(path=SYSFS_PCI_DEVICES):
+    return os.path.isdir(path)
+
+
+def enumerate_devices(path=SYSFS_PCI_DEVICES, ids=None):
+    """
+    Read every PCI function from sysfs
+
+    :param path: sysfs PCI devices directory
+    :param ids: pciids.PCIIds, the shared instance is used by default
+    :return: list of dicts, sorted by slot, in the format returned by
+        lspci.parse_nnvmmk
+    """
+    ids = ids or pciids.get_pci_ids()
+    addresses = sorted(os.listdir(path))
+
+    # Like lspci, only show the domain when there is more than one
+    show_domain = any(not address.startswith('0000:')
+                      for address in addresses)
+
+    devices = []
+    for address in addresses:
+        record = read_device(os.path.join(path, address),
+                             address if show_domain else address[5:],
+                             ids)
+        if record is None:
+            log.debug('%s disappeared during enumeration', address)
+            continue
+        devices.append(record)
+
+    return devices
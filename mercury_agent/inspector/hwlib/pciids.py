@@ -0,0 +1,183 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Vendor, device, and class name lookups in the pci.ids database.
+
+The database is memory mapped rather than parsed. The extents of the vendor
+and class blocks are indexed once; devices and subsystems are found by
+searching within their vendor's block.
+"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+
+log = logging.getLogger(__name__)
+
+PCI_IDS_PATHS = [
+    '/usr/share/hwdata/pci.ids',
+    '/usr/share/misc/pci.ids',
+    '/usr/share/pci.ids'
+]
+
+# Names lspci uses when an id is not in the database
+UNKNOWN_VENDOR = 'Vendor'
+UNKNOWN_DEVICE = 'Device'
+UNKNOWN_CLASS = 'Class'
+
+_TOP_LEVEL = re.compile(br'^(?:([0-9a-f]{4})|C ([0-9a-f]{2}))  ', re.M)
+
+
+def find_pci_ids():
+    for path in PCI_IDS_PATHS:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class PCIIds(object):
+    def __init__(self, path=None):
+        """
+        :param path: pci.ids location, the first of PCI_IDS_PATHS which exists
+            is used by default
+        """
+        self.path = path or find_pci_ids()
+        self.vendors = {}
+        self.classes = {}
+        self.data = b''
+
+        if not self.path:
+            log.warning('pci.ids was not found, PCI devices will not be named')
+            return
+
+        try:
+            with open(self.path, 'rb') as fp:
+                self.data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError) as e:
+            # ValueError: the file is empty
+            log.warning('Could not map %s: %s', self.path, e)
+            return
+
+        # Each vendor or class block ends where the next one begins
+        previous = None
+        for match in _TOP_LEVEL.finditer(self.data):
+            if previous is not None:
+                previous[1] = match.start()
+            vendor, pci_class = match.groups()
+            index = self.vendors if vendor else self.classes
+            previous = index.setdefault(vendor or pci_class,
+                                        [match.start(), len(self.data)])
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
+        self.vendors = {}
+        self.classes = {}
+
+    def _line(self, start):
+        """ The name on the line at start """
+        end = self.data.find(b'\n', start)
+        if end == -1:
+            end = len(self.data)
+        return self.data[start:end].split(b'  ', 1)[1].decode(
+            'utf-8', 'replace').strip()
+
+    def _entry_end(self, start, end):
+        """ Offset of the next device (or subclass) line after the line at
+        start, or end
+        """
+        offset = self.data.find(b'\n\t', start, end)
+        while offset != -1:
+            if self.data[offset + 2:offset + 3] != b'\t':
+                return offset + 1
+            offset = self.data.find(b'\n\t', offset + 2, end)
+        return end
+
+    def _find(self, prefix, start, end):
+        """ Offset of the line beginning with prefix between start and end,
+        or -1
+        """
+        offset = self.data.find(b'\n' + prefix, start, end)
+        return offset + 1 if offset != -1 else -1
+
+    def _device(self, index, parent_id, child_id):
+        """
+        :return: (offset of the child line or -1, end of the parent block)
+        """
+        block = index.get(parent_id.lower().encode())
+        if block is None:
+            return -1, -1
+        start, end = block
+        return self._find(b'\t' + child_id.lower().encode() + b'  ',
+                          start, end), end
+
+    def vendor_name(self, vendor_id):
+        """
+        :param vendor_id: hex string, ie '8086'
+        :return: The vendor name or None
+        """
+        block = self.vendors.get(vendor_id.lower().encode())
+        if block is None:
+            return None
+        return self._line(block[0])
+
+    def device_name(self, vendor_id, device_id):
+        offset, _ = self._device(self.vendors, vendor_id, device_id)
+        if offset == -1:
+            return None
+        return self._line(offset)
+
+    def subsystem_name(self, vendor_id, device_id, svendor_id, sdevice_id):
+        device, vendor_end = self._device(self.vendors, vendor_id, device_id)
+        if device == -1:
+            return None
+        key = '\t\t{} {}  '.format(svendor_id, sdevice_id).lower().encode()
+        offset = self._find(key, device,
+                            self._entry_end(device, vendor_end))
+        if offset == -1:
+            return None
+        return self._line(offset)
+
+    def class_name(self, class_id):
+        """
+        :param class_id: class and subclass, ie '0200'
+        :return: The subclass name, the class name if the subclass is not
+            known, or None
+        """
+        offset, _ = self._device(self.classes, class_id[:2], class_id[2:4])
+        if offset != -1:
+            return self._line(offset)
+        block = self.classes.get(class_id[:2].lower().encode())
+        if block is None:
+            return None
+        return self._line(block[0])
+
+
+__pci_ids = None
+__pci_ids_lock = threading.Lock()
+
+
+def get_pci_ids():
+    """
+    :return: A PCIIds instance shared by the process
+    """
+    global __pci_ids
+    with __pci_ids_lock:
+        if __pci_ids is None:
+            __pci_ids = PCIIds()
+        return __pci_ids
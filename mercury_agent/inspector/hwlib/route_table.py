@@ -0,0 +1,193 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Longest prefix match over the routes inventory.
+
+Routes are those produced by the routes inspector (see
+rtnetlink.NetlinkSnapshot.route_table and IPRoute2.table). Each table and
+address family has a binary trie keyed on the destination prefix; a lookup
+walks at most one node per bit of the address.
+"""
+
+import logging
+import socket
+
+log = logging.getLogger(__name__)
+
+MAIN_TABLE = 'main'
+
+# The tables consulted by the default policy rules, in order
+LOOKUP_TABLES = ('local', MAIN_TABLE, 'default')
+
+# Route types which stop a lookup without a usable route
+UNREACHABLE_TYPES = ('blackhole', 'unreachable', 'prohibit')
+
+_BITS = {socket.AF_INET: 32, socket.AF_INET6: 128}
+
+# Trie node slots
+_ZERO, _ONE, _ROUTES = range(3)
+
+
+def address_family(address):
+    return ':' in address and socket.AF_INET6 or socket.AF_INET
+
+
+def address_to_int(address):
+    """
+    :param address: IPv4 or IPv6 address, an IPv6 zone (%eth0) is ignored
+    :return: (family, integer)
+    """
+    family = address_family(address)
+    packed = socket.inet_pton(family, address.split('%', 1)[0])
+    return family, int.from_bytes(packed, 'big')
+
+
+def route_family(route):
+    """ The destination does not identify the family of a default route, use
+    the gateway or source address
+    """
+    for key in ('destination', 'via', 'src'):
+        value = route.get(key)
+        if value and value != 'default':
+            return address_family(value)
+    for nexthop in route.get('nexthops') or []:
+        if nexthop.get('via'):
+            return address_family(nexthop['via'])
+    return socket.AF_INET
+
+
+def route_next_hop(route):
+    """ Multipath (ECMP) routes only carry dev and via in their next hops,
+    the first next hop which is not dead is used
+
+    :param route: routes inventory entry
+    :return: (dev, via), (None, None) if every next hop is dead
+    """
+    if route.get('dev') or not route.get('nexthops'):
+        return route.get('dev'), route.get('via')
+    for nexthop in route['nexthops']:
+        if not nexthop.get('dead'):
+            return nexthop.get('dev'), nexthop.get('via')
+    return None, None
+
+
+def route_metric(route):
+    try:
+        return int(route.get('metric', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RouteTable(object):
+    def __init__(self, routes=()):
+        """
+        :param routes: routes inventory entries
+        """
+        # (table, family): root node
+        self.tries = {}
+        self.count = 0
+        for route in routes:
+            self.add(route)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, route):
+        """
+        :param route: routes inventory entry. Entries without a table are in
+            the main table
+        """
+        destination = route.get('destination')
+        # The kernel skips routes whose next hops are all dead
+        if not destination or route.get('dead'):
+            return
+        if route.get('nexthops') and route_next_hop(route) == (None, None):
+            return
+
+        family = route_family(route)
+        if destination == 'default':
+            prefix, length = 0, 0
+        else:
+            address, _, length = destination.partition('/')
+            try:
+                family, prefix = address_to_int(address)
+            except (OSError, ValueError):
+                log.debug('Ignoring route with an invalid destination: %s',
+                          destination)
+                return
+            length = int(length) if length else _BITS[family]
+
+        bits = _BITS[family]
+        key = (route.get('table', MAIN_TABLE), family)
+        node = self.tries.get(key)
+        if node is None:
+            node = self.tries[key] = [None, None, None]
+
+        for depth in range(length):
+            bit = (prefix >> (bits - 1 - depth)) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+            node = child
+
+        if node[_ROUTES] is None:
+            node[_ROUTES] = []
+        node[_ROUTES].append(route)
+        # The lowest metric is preferred
+        node[_ROUTES].sort(key=route_metric)
+        self.count += 1
+
+    @staticmethod
+    def _match(node, value, bits):
+        """ The routes of the longest prefix matching value """
+        best = node[_ROUTES]
+        shift = bits - 1
+        while shift >= 0:
+            node = node[(value >> shift) & 1]
+            if node is None:
+                break
+            if node[_ROUTES]:
+                best = node[_ROUTES]
+            shift -= 1
+        return best
+
+    def lookup_table(self, address, table=MAIN_TABLE):
+        """
+        :param address: IPv4 or IPv6 address
+        :param table: table name or id, as it appears in the inventory
+        :return: The preferred route to address in table or None
+        """
+        family, value = address_to_int(address)
+        node = self.tries.get((table, family))
+        if node is None:
+            return None
+        routes = self._match(node, value, _BITS[family])
+        return routes and routes[0] or None
+
+    def lookup(self, address, tables=LOOKUP_TABLES):
+        """ Resolve address as the default routing policy would
+
+        :param address: IPv4 or IPv6 address
+        :param tables: tables to consult in order
+        :return: The route used to reach address or None. Blackhole,
+            unreachable, and prohibit routes are returned; callers should
+            check the route type
+        """
+        for table in tables:
+            route = self.lookup_table(address, table)
+            if route is None or route.get('type') == 'throw':
+                continue
+            return route
+        return None
@@ -0,0 +1,603 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Links, addresses, and routes from a single rtnetlink conversation.
+
+One NETLINK_ROUTE socket dumps every link, every IPv4 and IPv6 address, and
+the routes of every table. The resulting NetlinkSnapshot presents them in the
+formats netifaces and `ip route show` produce, so the interfaces and routes
+inspectors can share one dump instead of calling netifaces per interface and
+forking ip.
+"""
+
+import errno
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+NETLINK_ROUTE = 0
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_DUMP = 0x300
+NLM_F_DUMP_INTR = 0x10
+
+# NLA_F_NESTED and NLA_F_NET_BYTEORDER share the attribute type field
+NLA_TYPE_MASK = 0x3fff
+
+# A dump interrupted by a concurrent change is requested again
+DUMP_ATTEMPTS = 5
+
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+
+IFLA_ADDRESS = 1
+IFLA_BROADCAST = 2
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_LINK = 5
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFA_BROADCAST = 4
+IFA_FLAGS = 8
+
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_PREFSRC = 7
+RTA_MULTIPATH = 9
+RTA_TABLE = 15
+RTA_PREF = 20
+
+RT_TABLE_MAIN = 254
+
+RTN_UNICAST = 1
+
+RTPROT_BOOT = 3
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_POINTOPOINT = 0x10
+
+RTNH_F_DEAD = 0x1
+RTNH_F_PERVASIVE = 0x2
+RTNH_F_ONLINK = 0x4
+RTNH_F_OFFLOAD = 0x8
+RTNH_F_LINKDOWN = 0x10
+RTM_F_NOTIFY = 0x100
+
+# netifaces.AF_LINK on linux
+AF_LINK = 17
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_RTATTR = struct.Struct('=HH')
+_IFINFOMSG = struct.Struct('=BxHiII')
+_IFADDRMSG = struct.Struct('=BBBBI')
+_RTMSG = struct.Struct('=BBBBBBBBI')
+_RTNEXTHOP = struct.Struct('=HBBi')
+_U32 = struct.Struct('=I')
+
+# Names `ip route` uses
+ROUTE_TYPES = {
+    2: 'local', 3: 'broadcast', 4: 'anycast', 5: 'multicast', 6: 'blackhole',
+    7: 'unreachable', 8: 'prohibit', 9: 'throw', 10: 'nat'
+}
+ROUTE_PROTOCOLS = {
+    1: 'redirect', 2: 'kernel', 3: 'boot', 4: 'static', 8: 'gated', 9: 'ra',
+    10: 'mrt', 11: 'zebra', 12: 'bird', 13: 'dnrouted', 14: 'xorp',
+    15: 'ntk', 16: 'dhcp', 42: 'babel', 186: 'bgp', 187: 'isis',
+    188: 'ospf', 189: 'rip', 192: 'eigrp'
+}
+ROUTE_SCOPES = {0: 'global', 200: 'site', 253: 'link', 254: 'host',
+                255: 'nowhere'}
+ROUTE_TABLES = {253: 'default', 254: 'main', 255: 'local'}
+ROUTE_PREFERENCES = {0: 'medium', 1: 'high', 3: 'low'}
+ROUTE_FLAGS = (('dead', RTNH_F_DEAD), ('onlink', RTNH_F_ONLINK),
+               ('pervasive', RTNH_F_PERVASIVE), ('offload', RTNH_F_OFFLOAD),
+               ('notify', RTM_F_NOTIFY), ('linkdown', RTNH_F_LINKDOWN))
+OPERSTATES = ('unknown', 'notpresent', 'down', 'lowerlayerdown', 'testing',
+              'dormant', 'up')
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def parse_attributes(data, offset, end):
+    """
+    :return: dictionary of attribute type: payload (memoryview or bytes).
+        NLA_F_NESTED and NLA_F_NET_BYTEORDER are masked off the type
+    """
+    attributes = {}
+    unpack_from = _RTATTR.unpack_from
+    while offset + 4 <= end:
+        length, rta_type = unpack_from(data, offset)
+        if length < 4:
+            break
+        attributes[rta_type & NLA_TYPE_MASK] = \
+            data[offset + 4:offset + length]
+        offset += (length + 3) & ~3
+    return attributes
+
+
+def parse_messages(data):
+    """ Split a netlink buffer into messages
+
+    :return: generator of (type, flags, sequence, payload)
+    """
+    offset = 0
+    unpack_from = _NLMSGHDR.unpack_from
+    while offset + 16 <= len(data):
+        length, msg_type, flags, seq, _ = unpack_from(data, offset)
+        if length < 16:
+            break
+        yield msg_type, flags, seq, data[offset + 16:offset + length]
+        offset += (length + 3) & ~3
+
+
+def _string(value):
+    return bytes(value).split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+
+def _u32(value):
+    return _U32.unpack(value)[0]
+
+
+def _mac(value):
+    return ':'.join('{:02x}'.format(b) for b in bytearray(value))
+
+
+def _ip(family, value):
+    return socket.inet_ntop(family, value)
+
+
+def parse_link(payload):
+    family, link_type, index, flags, _ = _IFINFOMSG.unpack_from(payload)
+    attributes = parse_attributes(payload, _IFINFOMSG.size, len(payload))
+    link = {
+        'index': index,
+        'type': link_type,
+        'flags': flags,
+        'name': _string(attributes.get(IFLA_IFNAME, b''))
+    }
+    if IFLA_ADDRESS in attributes:
+        link['address'] = _mac(attributes[IFLA_ADDRESS])
+    if IFLA_BROADCAST in attributes:
+        link['broadcast'] = _mac(attributes[IFLA_BROADCAST])
+    if IFLA_MTU in attributes:
+        link['mtu'] = _u32(attributes[IFLA_MTU])
+    if IFLA_MASTER in attributes:
+        link['master'] = _u32(attributes[IFLA_MASTER])
+    if IFLA_LINK in attributes:
+        link['link'] = _u32(attributes[IFLA_LINK])
+    if IFLA_OPERSTATE in attributes:
+        state = bytearray(attributes[IFLA_OPERSTATE])[0]
+        link['operstate'] = state < len(OPERSTATES) and \
+            OPERSTATES[state] or str(state)
+    return link
+
+
+def parse_address(payload):
+    family, prefixlen, flags, scope, index = _IFADDRMSG.unpack_from(payload)
+    attributes = parse_attributes(payload, _IFADDRMSG.size, len(payload))
+    address = {
+        'family': family,
+        'prefixlen': prefixlen,
+        'flags': flags,
+        'scope': scope,
+        'index': index
+    }
+    if IFA_FLAGS in attributes:
+        address['flags'] = _u32(attributes[IFA_FLAGS])
+    for key, attribute in (('address', IFA_ADDRESS), ('local', IFA_LOCAL),
+                           ('broadcast', IFA_BROADCAST)):
+        if attribute in attributes:
+            address[key] = _ip(family, attributes[attribute])
+    if IFA_LABEL in attributes:
+        address['label'] = _string(attributes[IFA_LABEL])
+    return address
+
+
+def _parse_nexthops(family, data):
+    nexthops = []
+    offset = 0
+    while offset + _RTNEXTHOP.size <= len(data):
+        length, flags, hops, index = _RTNEXTHOP.unpack_from(data, offset)
+        if length < _RTNEXTHOP.size:
+            break
+        nexthop = {'oif': index, 'flags': flags, 'weight': hops + 1}
+        attributes = parse_attributes(data, offset + _RTNEXTHOP.size,
+                                      offset + length)
+        if RTA_GATEWAY in attributes:
+            nexthop['gateway'] = _ip(family, attributes[RTA_GATEWAY])
+        nexthops.append(nexthop)
+        offset += _align(length)
+    return nexthops
+
+
+# rtmsg attributes holding an address or a u32
+_ROUTE_ADDRESSES = {RTA_DST: 'dst', RTA_GATEWAY: 'gateway',
+                    RTA_PREFSRC: 'prefsrc'}
+_ROUTE_U32 = {RTA_TABLE: 'table', RTA_OIF: 'oif', RTA_PRIORITY: 'priority'}
+
+
+def parse_route(payload):
+    # Routes dominate a dump; attributes are decoded in place rather than
+    # through parse_attributes
+    (family, dst_len, src_len, tos, table, protocol, scope, route_type,
+     flags) = _RTMSG.unpack_from(payload)
+    route = {
+        'family': family,
+        'dst_len': dst_len,
+        'tos': tos,
+        'table': table,
+        'protocol': protocol,
+        'scope': scope,
+        'type': route_type,
+        'flags': flags
+    }
+
+    unpack_attribute = _RTATTR.unpack_from
+    unpack_u32 = _U32.unpack_from
+    inet_ntop = socket.inet_ntop
+    offset = _RTMSG.size
+    end = len(payload)
+    while offset + 4 <= end:
+        length, rta_type = unpack_attribute(payload, offset)
+        if length < 4:
+            break
+        rta_type &= NLA_TYPE_MASK
+        key = _ROUTE_ADDRESSES.get(rta_type)
+        if key:
+            route[key] = inet_ntop(family,
+                                   payload[offset + 4:offset + length])
+        else:
+            key = _ROUTE_U32.get(rta_type)
+            if key:
+                route[key] = unpack_u32(payload, offset + 4)[0]
+            elif rta_type == RTA_PREF:
+                route['pref'] = payload[offset + 4]
+            elif rta_type == RTA_MULTIPATH:
+                route['nexthops'] = _parse_nexthops(
+                    family, payload[offset + 4:offset + length])
+        offset += (length + 3) & ~3
+    return route
+
+
+_PARSERS = {
+    RTM_NEWLINK: ('links', parse_link),
+    RTM_NEWADDR: ('addresses', parse_address),
+    RTM_NEWROUTE: ('routes', parse_route)
+}
+
+
+def _prefix_netmask(family, prefixlen):
+    bits = 32 if family == socket.AF_INET else 128
+    mask = ((1 << bits) - 1) ^ ((1 << (bits - prefixlen)) - 1)
+    return socket.inet_ntop(family, mask.to_bytes(bits // 8, 'big'))
+
+
+class NetlinkSnapshot(object):
+    def __init__(self, links=None, addresses=None, routes=None):
+        """
+        :param links: parse_link dictionaries
+        :param addresses: parse_address dictionaries
+        :param routes: parse_route dictionaries
+        """
+        self.links = dict((link['index'], link) for link in links or [])
+        self.addresses = addresses or []
+        self.routes = routes or []
+        self.taken = time.monotonic()
+        self._names = dict((link['name'], link) for link in
+                           self.links.values())
+        self._addresses_by_index = {}
+        for address in self.addresses:
+            self._addresses_by_index.setdefault(address['index'], []).append(
+                address)
+        self._gateways = None
+
+    @classmethod
+    def from_messages(cls, buffers):
+        """
+        :param buffers: netlink buffers, as received from the kernel or
+            captured in a fixture
+        """
+        parsed = {'links': [], 'addresses': [], 'routes': []}
+        for data in buffers:
+            for msg_type, _, _, payload in parse_messages(data):
+                if msg_type in _PARSERS:
+                    key, parser = _PARSERS[msg_type]
+                    parsed[key].append(parser(payload))
+        return cls(**parsed)
+
+    def get_link(self, name):
+        return self._names.get(name)
+
+    def link_name(self, index):
+        link = self.links.get(index)
+        return link and link['name'] or None
+
+    def list_interfaces(self, exclude_loopback=True):
+        """ The equivalent of network_interfaces.list_interfaces """
+        return [self.links[index]['name'] for index in sorted(self.links)
+                if not (exclude_loopback and self.links[index]['name'] == 'lo')]
+
+    def ifaddresses(self, name):
+        """
+        :return: addresses of name in the format of netifaces.ifaddresses
+        """
+        link = self._names.get(name)
+        if not link:
+            return {}
+
+        # Like getifaddrs, the broadcast address of a point to point link is
+        # its peer
+        broadcast = link['flags'] & (IFF_LOOPBACK | IFF_POINTOPOINT) and \
+            'peer' or 'broadcast'
+
+        result = {}
+        if link.get('address'):
+            link_address = {'addr': link['address']}
+            if link.get('broadcast'):
+                link_address[broadcast] = link['broadcast']
+            result[AF_LINK] = [link_address]
+
+        for address in self._addresses_by_index.get(link['index'], []):
+            family = address['family']
+            netmask = _prefix_netmask(family, address['prefixlen'])
+            if family == socket.AF_INET:
+                local = address.get('local', address.get('address'))
+                entry = {'addr': local, 'netmask': netmask}
+                if broadcast == 'peer':
+                    entry['peer'] = address.get('address', local)
+                elif address.get('address', local) != local:
+                    entry['peer'] = address['address']
+                elif 'broadcast' in address or 'local' in address:
+                    # Without a broadcast address, getifaddrs reports the
+                    # address itself
+                    entry['broadcast'] = address.get('broadcast',
+                                                     address.get('address'))
+            elif family == socket.AF_INET6:
+                addr = address.get('address', address.get('local'))
+                if addr.startswith('fe80:'):
+                    addr = '{}%{}'.format(addr, name)
+                entry = {'addr': addr, 'netmask': '{}/{}'.format(
+                    netmask, address['prefixlen'])}
+            else:
+                continue
+            result.setdefault(family, []).append(entry)
+
+        return result
+
+    def gateways(self):
+        """
+        :return: main table default gateways in the format of
+            netifaces.gateways
+        """
+        if self._gateways is not None:
+            return self._gateways
+
+        gateways = {'default': {}}
+        defaults = {}
+        for route in self.routes:
+            if route['table'] != RT_TABLE_MAIN or route['dst_len'] or \
+                    route['type'] != RTN_UNICAST or 'gateway' not in route:
+                continue
+            interface = self.link_name(route.get('oif'))
+            if not interface:
+                continue
+            family = route['family']
+            gateways.setdefault(family, []).append(
+                (route['gateway'], interface))
+            priority = route.get('priority', 0)
+            if family not in defaults or priority < defaults[family][0]:
+                defaults[family] = (priority, (route['gateway'], interface))
+
+        for family, (_, default) in defaults.items():
+            gateways['default'][family] = default
+            # Only the preferred default route is flagged
+            gateways[family] = [gateway + (gateway == default,)
+                                for gateway in gateways[family]]
+
+        self._gateways = gateways
+        return gateways
+
+    def _describe_route(self, route):
+        """ A route in the format of IPRoute2.table """
+        family = route['family']
+        host_len = 32 if family == socket.AF_INET else 128
+        if route['dst_len'] == 0:
+            destination = 'default'
+        elif route['dst_len'] == host_len:
+            destination = route['dst']
+        else:
+            destination = '{}/{}'.format(route['dst'], route['dst_len'])
+
+        entry = {'destination': destination}
+        if route['type'] != RTN_UNICAST:
+            entry['type'] = ROUTE_TYPES.get(route['type'], str(route['type']))
+        if route['table'] != RT_TABLE_MAIN:
+            entry['table'] = ROUTE_TABLES.get(route['table'],
+                                              str(route['table']))
+        if 'gateway' in route:
+            entry['via'] = route['gateway']
+        if 'oif' in route:
+            entry['dev'] = self.link_name(route['oif']) or \
+                'if{}'.format(route['oif'])
+        if route['protocol'] != RTPROT_BOOT:
+            entry['proto'] = ROUTE_PROTOCOLS.get(route['protocol'],
+                                                 str(route['protocol']))
+        if route['scope']:
+            entry['scope'] = ROUTE_SCOPES.get(route['scope'],
+                                              str(route['scope']))
+        if 'prefsrc' in route:
+            entry['src'] = route['prefsrc']
+        if 'priority' in route:
+            entry['metric'] = str(route['priority'])
+        for name, flag in ROUTE_FLAGS:
+            if route['flags'] & flag:
+                entry[name] = True
+        if 'pref' in route:
+            entry['pref'] = ROUTE_PREFERENCES.get(route['pref'],
+                                                  str(route['pref']))
+        if 'nexthops' in route:
+            nexthops = []
+            for nexthop in route['nexthops']:
+                _nexthop = {'dev': self.link_name(nexthop['oif']),
+                            'weight': str(nexthop['weight'])}
+                if 'gateway' in nexthop:
+                    _nexthop['via'] = nexthop['gateway']
+                for name, flag in ROUTE_FLAGS:
+                    if nexthop['flags'] & flag:
+                        _nexthop[name] = True
+                nexthops.append(_nexthop)
+            entry['nexthops'] = nexthops
+        return entry
+
+    def route_table(self, family=socket.AF_INET, table=RT_TABLE_MAIN):
+        """
+        :param family: socket.AF_INET or AF_INET6, None for both
+        :param table: table id, None for every table
+        :return: routes in the format of IPRoute2.table. Routes outside of
+            the main table include the table name or id
+        """
+        return [self._describe_route(route) for route in self.routes
+                if (family is None or route['family'] == family) and
+                (table is None or route['table'] == table)]
+
+
+class NetlinkSocket(object):
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                    NETLINK_ROUTE)
+        self.socket.bind((0, 0))
+        self.seq = 0
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def dump(self, msg_type, header):
+        """ Request a dump and collect the replies. A dump which raced a
+        link, address, or route change is flagged NLM_F_DUMP_INTR by the
+        kernel and may be inconsistent, it is requested again
+
+        :param msg_type: RTM_GETLINK, RTM_GETADDR, or RTM_GETROUTE
+        :param header: packed ifinfomsg, ifaddrmsg, or rtmsg
+        :return: list of received buffers, NLMSG_DONE included
+        :raises OSError: EINTR if every attempt was interrupted
+        """
+        for _ in range(DUMP_ATTEMPTS):
+            buffers, interrupted = self._dump(msg_type, header)
+            if not interrupted:
+                return buffers
+            log.debug('netlink dump %d was interrupted, retrying', msg_type)
+        raise OSError(errno.EINTR,
+                      'netlink dump {} was interrupted {} times'.format(
+                          msg_type, DUMP_ATTEMPTS))
+
+    def _dump(self, msg_type, header):
+        """
+        :return: (buffers, interrupted)
+        """
+        self.seq += 1
+        self.socket.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(header),
+                                        msg_type, NLM_F_REQUEST | NLM_F_DUMP,
+                                        self.seq, 0) + header)
+        buffers = []
+        interrupted = False
+        while True:
+            data = self.socket.recv(1 << 16)
+            buffers.append(data)
+            for reply_type, flags, seq, payload in parse_messages(data):
+                if seq != self.seq:
+                    continue
+                if flags & NLM_F_DUMP_INTR:
+                    interrupted = True
+                if reply_type == NLMSG_DONE:
+                    return buffers, interrupted
+                if reply_type == NLMSG_ERROR:
+                    error = -struct.unpack_from('=i', payload)[0]
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                    return buffers, interrupted
+
+
+# Requests for every link, every address, and the routes of every table
+DUMP_REQUESTS = (
+    (RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)),
+    (RTM_GETADDR, _IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)),
+    (RTM_GETROUTE, _RTMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0, 0, 0, 0, 0))
+)
+
+
+def dump_buffers():
+    """
+    :return: the raw replies to DUMP_REQUESTS, see NetlinkSnapshot.from_messages
+    """
+    buffers = []
+    with NetlinkSocket() as nl:
+        # The kernel runs one dump per socket at a time
+        for msg_type, header in DUMP_REQUESTS:
+            buffers.extend(nl.dump(msg_type, header))
+    return buffers
+
+
+def dump():
+    """
+    :return: A new NetlinkSnapshot
+    """
+    return NetlinkSnapshot.from_messages(dump_buffers())
+
+
+__snapshot = None
+__snapshot_lock = threading.Lock()
+
+
+def get_snapshot(max_age=1.0):
+    """ A snapshot shared by callers within max_age seconds of each other,
+    such as the interfaces and routes inspectors of a single inspection
+
+    :param max_age: seconds
+    :return: NetlinkSnapshot
+    """
+    global __snapshot
+    with __snapshot_lock:
+        if __snapshot is None or \
+                time.monotonic() - __snapshot.taken > max_age:
+            __snapshot = dump()
+        return __snapshot
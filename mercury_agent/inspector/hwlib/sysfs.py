@@ -13,9 +13,15 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import errno
 import logging
 import os
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 log = logging.getLogger(__name__)
 
 
@@ -43,17 +49,124 @@ def append_sys(path):
     return os.path.join('/sys', path.lstrip('/'))
 
 
+def _read_attribute(name, dir_fd):
+    """
+    :return: The stripped attribute value, '' if it cannot be read, or None
+        if name is a directory
+    """
+    try:
+        fd = os.open(name, os.O_RDONLY, dir_fd=dir_fd)
+    except OSError as e:
+        log.debug('Problem reading sysfs file %s [%s]' % (name, e))
+        return ''
+    try:
+        # sysfs attributes are at most a page and are returned in one read
+        return os.read(fd, 4096).decode('utf-8', 'replace').strip()
+    except OSError as e:
+        if e.errno == errno.EISDIR:
+            return None
+        log.debug('Problem reading sysfs file %s [%s]' % (name, e))
+        return ''
+    finally:
+        os.close(fd)
+
+
+class SysFSSnapshot(Mapping):
+    """
+    Immutable name: value mapping of the attributes of one sysfs directory.
+    The directory is opened once and every attribute is read relative to it.
+    """
+    def __init__(self, path, names=None):
+        """
+        :param path: absolute sysfs directory
+        :param names: attributes to read. All files in the directory are read
+            by default. Requested attributes which are missing or unreadable
+            are '', as with parse_cookie
+        """
+        self.path = path
+        self._attributes = {}
+        self._read(names)
+
+    def _read(self, names):
+        try:
+            dir_fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError as e:
+            log.debug('Problem opening sysfs directory %s [%s]' %
+                      (self.path, e))
+            self._attributes.update((name, '') for name in names or ())
+            return
+
+        try:
+            if names is None:
+                names = os.listdir(dir_fd)
+                skip_directories = True
+            else:
+                skip_directories = False
+
+            for name in names:
+                value = _read_attribute(name, dir_fd)
+                if value is None:
+                    if skip_directories:
+                        continue
+                    value = ''
+                self._attributes[name] = value
+        finally:
+            os.close(dir_fd)
+
+    def refresh(self, *names):
+        """ Re-read selected attributes
+
+        :param names: attributes to re-read, all attributes in the snapshot
+            by default
+        :return: A new SysFSSnapshot
+        """
+        snapshot = SysFSSnapshot.__new__(SysFSSnapshot)
+        snapshot.path = self.path
+        snapshot._attributes = dict(self._attributes)
+        snapshot._read(names or list(self._attributes))
+        return snapshot
+
+    def __getitem__(self, name):
+        return self._attributes[name]
+
+    def __iter__(self):
+        return iter(self._attributes)
+
+    def __len__(self):
+        return len(self._attributes)
+
+    def __repr__(self):
+        return 'SysFSSnapshot({!r}, {!r})'.format(self.path, self._attributes)
+
+
 class SysFSBase(object):
+    # Attributes read by snapshot() by default, None for every file
+    attributes = None
+
     def __init__(self):
         self.base_path = ''
 
+    @property
+    def path(self):
+        return append_sys(self.base_path)
+
     def get_cookie(self, name):
-        path = os.path.join(append_sys(self.base_path), name)
-        return parse_cookie(path)
+        return parse_cookie(os.path.join(self.path, name))
+
+    def snapshot(self, names=None):
+        """
+        Read several attributes at once
+
+        :param names: attributes to read, self.attributes by default
+        :return: SysFSSnapshot
+        """
+        return SysFSSnapshot(self.path, names or self.attributes)
 
 
 class NetClass(SysFSBase):
     class_path = 'class/net'
+    attributes = ('address', 'carrier', 'dev_port', 'dev_id', 'duplex',
+                  'speed', 'ifindex')
 
     def __init__(self, devname):
         super(NetClass, self).__init__()
@@ -110,12 +223,9 @@ class DMI(SysFSBase):
         self.__build_attributes()
 
     def __build_attributes(self):
-        ld = os.listdir(append_sys(self.base_path))
-        for f in ld:
-            sys_path = os.path.join(self.base_path, f)
-            if os.path.isfile(append_sys(sys_path)):
-                self.elements.append(f)
-                self.__setattr__(f, self.get_cookie(f))
+        for f, value in self.snapshot().items():
+            self.elements.append(f)
+            self.__setattr__(f, value)
 
     def __getattr__(self, item):
         """\
@@ -133,3 +243,20 @@ class DMI(SysFSBase):
             _d[element] = getattr(self, element)
         return _d
 
+
+class BlockQueue(SysFSBase):
+    class_path = 'block'
+    attributes = ('rotational', 'logical_block_size', 'physical_block_size',
+                  'hw_sector_size', 'scheduler', 'nr_requests')
+
+    def __init__(self, devname):
+        """
+        :param devname: kernel name, ie sda or nvme0n1
+        """
+        super(BlockQueue, self).__init__()
+        self.devname = devname
+        self.base_path = os.path.join(self.class_path, self.devname, 'queue')
+
+    @property
+    def rotational(self):
+        return convert_bool(self.get_cookie('rotational'))
@@ -22,10 +22,17 @@ pyudev can be kind of silly, but I certainly don't feel like wrapping my own.
 """
 import logging
 import os
+import threading
+
 import pyudev
 
+from mercury_agent.inspector import fingerprint
+
 log = logging.getLogger(__name__)
 
+# Present while udevd has events queued
+UDEV_QUEUE_PATH = '/run/udev/queue'
+
 
 class UDevHelper(object):
     def __init__(self):
@@ -44,50 +51,58 @@ class UDevHelper(object):
     def get_disks(self):
         return self.context.list_devices(subsystem='block', DEVTYPE='disk')
 
-    def find_partitions(self, device):
+    @staticmethod
+    def find_partitions(device):
         """
         matches partitions belonging to a device.
         """
-
-        devices = self.get_partitions()
-        return devices.match_parent(pyudev.Device.from_device_file(self.context, device))
+        snapshot = get_snapshot()
+        disk = snapshot.get_device_by_name(device)
+        if disk is None:
+            return []
+        return snapshot.get_partitions(disk.sys_name)
 
     def get_device_by_name(self, devname):
+        udisk = get_snapshot().get_device_by_name(devname)
+        if udisk is not None:
+            return udisk
         try:
             udisk = pyudev.Device.from_device_file(self.context, devname)
         except OSError:
             return None
         return udisk
 
-    def discover_valid_storage_devices(self, fc_enabled=True, loop_enabled=False):
+    @staticmethod
+    def is_valid_storage_device(disk, fc_enabled=True, loop_enabled=False):
         """
-        Kind of ugly, but gets the job done. It strips devices we don't
-        care about, such as cd roms, device mapper block devices, loop, and fibre channel.
-
+        Filters devices we don't care about, such as cd roms, device mapper
+        block devices, loop, and fibre channel.
         """
+        if not fc_enabled and 'fc' in disk.get('ID_BUS', ''):
+            return False
 
-        disks = self.get_disks()
-        pruned = list()
+        if not loop_enabled and disk.get('MAJOR') == '7':
+            return False
 
-        for disk in disks:
-            if not fc_enabled and 'fc' in disk.get('ID_BUS', ''):
-                continue
+        if disk.get('ID_TYPE') == 'cd':
+            return False
 
-            if not loop_enabled and disk.get('MAJOR') == '7':
-                continue
+        if disk.get('MAJOR') == '254':  # Device Mapper (LVM)
+            return False
 
-            if disk.get('ID_TYPE') == 'cd':
-                continue
+        if os.path.split(disk.get('DEVPATH', ''))[-1].startswith('ram'):
+            return False
 
-            if disk.get('MAJOR') == '254':  # Device Mapper (LVM)
-                continue
-
-            if os.path.split(disk.get('DEVPATH', ''))[-1].startswith('ram'):
-                continue
+        return True
 
-            pruned.append(disk)
+    @staticmethod
+    def discover_valid_storage_devices(fc_enabled=True, loop_enabled=False):
+        """
+        Kind of ugly, but gets the job done. It strips devices we don't
+        care about, such as cd roms, device mapper block devices, loop, and fibre channel.
 
-        return pruned
+        """
+        return get_snapshot().get_storage_devices(fc_enabled, loop_enabled)
 
     def yield_mapped_devices(self):
         disks = self.get_disks()
@@ -106,21 +121,10 @@ class UDevHelper(object):
             if device.get('UDISKS_PARTITION_NUMBER') == str(partition_id):
                 return str(device['DEVNAME'])
 
-    def get_network_devices(self):
+    @staticmethod
+    def get_network_devices():
         """ Returns a list of all network(ethernet/type 1] devices found on the system. """
-
-        result = []
-
-        for candidate in self.context.list_devices(subsystem='net'):
-            try:
-                if candidate.attributes.asint('type') == 1:
-                    result.append(candidate)
-            except KeyError:
-                pass
-
-        # let's go ahead and return it sorted..
-        result.sort(key=lambda dev: dev.sys_name)
-        return result
+        return get_snapshot().get_network_devices()
 
     @staticmethod
     def monitor_for_volume(monitor, lv_name):
@@ -128,3 +132,135 @@ class UDevHelper(object):
         for action, device in monitor:
             if device.get('DM_LV_NAME') == lv_name:
                 return device
+
+
+def _pci_slot(device):
+    parent = device.find_parent('pci')
+    return parent and parent.get('PCI_SLOT_NAME')
+
+
+class UDevSnapshot(object):
+    """
+    Block and net devices enumerated once and indexed. The udev properties of
+    every block device are loaded while indexing, so they reflect the udev
+    database at the time the snapshot was taken.
+    """
+    def __init__(self, context, seqnum=None):
+        """
+        :param context: pyudev.Context
+        :param seqnum: kernel uevent sequence number read before enumerating,
+            None if the snapshot should not be reused
+        """
+        self.seqnum = seqnum
+        # sys_name: device
+        self.block = {}
+        self.net = {}
+        # DEVNAME: device
+        self.devnames = {}
+        # MAJOR:MINOR: device
+        self.devnums = {}
+        # PCI_SLOT_NAME: [device, ...]
+        self.pci_slots = {}
+        # disk sys_name: [partition, ...]
+        self.partitions = {}
+        self.disks = []
+        self._network_devices = None
+
+        for device in context.list_devices(subsystem='block'):
+            self.block[device.sys_name] = device
+            devname = device.get('DEVNAME')
+            if devname:
+                self.devnames[devname] = device
+            if device.get('MAJOR'):
+                self.devnums['{}:{}'.format(device['MAJOR'],
+                                            device.get('MINOR'))] = device
+            if device.device_type == 'disk':
+                self.disks.append(device)
+            elif device.device_type == 'partition':
+                self.partitions.setdefault(
+                    device.parent.sys_name, []).append(device)
+            self._index_pci_slot(device)
+
+        for device in context.list_devices(subsystem='net'):
+            self.net[device.sys_name] = device
+            self._index_pci_slot(device)
+
+    def _index_pci_slot(self, device):
+        slot = _pci_slot(device)
+        if slot:
+            self.pci_slots.setdefault(slot, []).append(device)
+
+    def get_device_by_name(self, devname):
+        """
+        :param devname: device node or a link to one, ie /dev/disk/by-id/...
+        :return: block device or None
+        """
+        device = self.devnames.get(devname)
+        if device is not None:
+            return device
+        try:
+            st = os.stat(devname)
+        except OSError:
+            return None
+        return self.devnums.get('{}:{}'.format(os.major(st.st_rdev),
+                                               os.minor(st.st_rdev)))
+
+    def get_partitions(self, disk):
+        """
+        :param disk: disk sys_name, ie sda
+        :return: list of partitions
+        """
+        return list(self.partitions.get(disk, []))
+
+    def get_pci_devices(self, slot):
+        """
+        :param slot: PCI slot name, ie 0000:03:00.0
+        :return: block and net devices below the PCI device
+        """
+        return list(self.pci_slots.get(slot, []))
+
+    def get_storage_devices(self, fc_enabled=True, loop_enabled=False):
+        """ See UDevHelper.is_valid_storage_device """
+        return [disk for disk in self.disks
+                if UDevHelper.is_valid_storage_device(disk, fc_enabled,
+                                                      loop_enabled)]
+
+    def get_network_devices(self):
+        """ Ethernet (type 1) devices, sorted by name """
+        if self._network_devices is None:
+            result = []
+            for name in sorted(self.net):
+                try:
+                    if self.net[name].attributes.asint('type') == 1:
+                        result.append(self.net[name])
+                except KeyError:
+                    pass
+            self._network_devices = result
+        return list(self._network_devices)
+
+
+__context = None
+__snapshot = None
+__snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    The snapshot is shared by the process and taken again whenever the kernel
+    has emitted a uevent since it was taken. Snapshots taken while udevd is
+    still processing events are not reused.
+
+    :return: UDevSnapshot
+    """
+    global __context, __snapshot
+    seqnum = fingerprint.uevent_seqnum() or None
+    with __snapshot_lock:
+        if __snapshot is None or seqnum is None or \
+                __snapshot.seqnum != seqnum:
+            if __context is None:
+                __context = pyudev.Context()
+            if os.path.exists(UDEV_QUEUE_PATH):
+                log.debug('udev events are queued, snapshot will be retaken')
+                seqnum = None
+            __snapshot = UDevSnapshot(__context, seqnum)
+        return __snapshot
@@ -14,11 +14,17 @@
 #    limitations under the License.
 
 import logging
+import threading
 
+from mercury_agent.inspector import cache, fingerprint, instrumentation
+from mercury_agent.inspector.hwlib.lspci import PCIBus
 from mercury_agent.inspector.inspectors import inspectors, late_inspectors
-from mercury_agent.hardware.drivers import registered_drivers, set_driver_cache
+from mercury_agent.inspector.scheduler import InspectionScheduler
+from mercury_agent.hardware.drivers import (
+    driver_class_cache, load_drivers, registered_drivers, set_driver_cache)
 from mercury.common.mercury_id import generate_mercury_id
-from mercury.common.exceptions import fancy_traceback_short, parse_exception
+from mercury.common.exceptions import (
+    MercuryUserError, fancy_traceback_short, parse_exception)
 
 log = logging.getLogger(__name__)
 
@@ -27,57 +33,321 @@ log = logging.getLogger(__name__)
 
 global_device_info = {}
 
+# Fingerprints taken before each inspector last ran successfully
 
-def _collect():
-    _c = dict()
-    for inspector, f in inspectors:
-        _c[inspector] = f()
-    return _c
+global_fingerprints = {}
 
+PROBE_PREFIX = 'probe:'
 
-def inspect():
+# Inspections update the globals above and must not overlap
+
+_inspect_lock = threading.Lock()
+
+
+class _InspectionRun(object):
+    """ State shared by the tasks of a single inspect() call """
+    def __init__(self, incremental=False):
+        self.incremental = incremental
+        self.reused = []
+        self.fingerprints = {}
+        self._pci_bus = None
+        self._pci_bus_lock = threading.Lock()
+
+    def reuse(self, name, current, requires=()):
+        """ Inspectors are reused when their fingerprint is unchanged and
+        everything they read from device_info was reused as well
+        """
+        if not self.incremental or current is None:
+            return False
+        if global_fingerprints.get(name) != current:
+            return False
+        if name not in global_device_info:
+            return False
+        if not set(requires) <= set(self.reused):
+            return False
+        log.debug('%s is unchanged, reusing previous inspection', name)
+        self.reused.append(name)
+        return True
+
+    def pci_bus(self, pci_data):
+        """ Driver probes share a single indexed PCIBus """
+        with self._pci_bus_lock:
+            if self._pci_bus is None:
+                self._pci_bus = PCIBus(pci_data or [])
+            return self._pci_bus
+
+    def store(self, name, current, result):
+        # A failed run invalidates the previous fingerprint
+        self.fingerprints[name] = current if result is not None else None
+
+    def early(self, name, f):
+        def run_early(collected):
+            current = fingerprint.take(name, f)
+            if self.reuse(name, current):
+                return global_device_info[name]
+            with instrumentation.measure('inspectors', name):
+                result = f()
+            self.store(name, current, result)
+            return result
+        return run_early
+
+    def late(self, name, f):
+        requires = _late_early_requirements(f)
+
+        def run_late(collected):
+            current = fingerprint.take(name, f)
+            if self.reuse(name, current, requires):
+                return global_device_info[name]
+            with instrumentation.measure('late_inspectors', name):
+                result = f(collected)
+            self.store(name, current, result)
+            return result
+        return run_late
+
+    def probe(self, driver):
+        def run_probe(collected):
+            if self.incremental and driver['name'] in driver_class_cache:
+                # set_driver_cache will not replace an initialized driver, so
+                # there is nothing to gain from probing again
+                return
+            _wants = driver['class'].wants
+
+            # noinspection PyBroadException
+            try:
+                if _wants == 'pci':
+                    context = self.pci_bus(collected.get('pci'))
+                else:
+                    context = _wants and collected[_wants] or collected
+                with instrumentation.measure('probes', driver['name']):
+                    devices = driver['class'].probe(context)
+            except Exception:
+                # probe is implemented in each driver and is not wrapped
+                # handle probe errors gracefully and soldier on
+                log.error(fancy_traceback_short(
+                    parse_exception(),
+                    preamble='Probe function failed for driver {}'.format(
+                        driver['name']
+                    )))
+                return
+            if devices:
+                set_driver_cache(driver, devices)
+        return run_probe
+
+
+def _probe_requirements(driver):
+    _wants = driver['class'].wants
+    if _wants:
+        return [_wants]
+    return [name for name, _ in inspectors]
+
+
+def _late_early_requirements(f):
+    requires = getattr(f, 'requires', None)
+    if requires is None:
+        return [name for name, _ in inspectors]
+    return list(requires)
+
+
+def _late_requirements(f):
+    subsystems = getattr(f, 'subsystems', None)
+    probes = [PROBE_PREFIX + driver['name'] for driver in registered_drivers
+              if subsystems is None or driver['driver_type'] in subsystems]
+
+    return _late_early_requirements(f) + probes
+
+
+def _select(tasks, only=None, subsystems=None):
+    """ Reduce the task list to the named inspectors, the probes for the
+    named driver subsystems, and everything they require
+
+    :param tasks: list of (name, target, requires, provides) tuples
+    :param only: inspector names
+    :param subsystems: driver types, ie ['raid']
+    :return: The selected tasks
+    """
+    known = set(name for name, _ in inspectors + late_inspectors)
+    unknown = set(only or []) - known
+    if unknown:
+        raise MercuryUserError('Unknown inspectors: {}'.format(
+            ', '.join(sorted(unknown))))
+
+    selected = set(only or [])
+    for driver in registered_drivers:
+        if driver['driver_type'] in (subsystems or []):
+            selected.add(PROBE_PREFIX + driver['name'])
+
+    requirements = dict((task[0], task[2]) for task in tasks)
+    stack = list(selected)
+    while stack:
+        for name in requirements.get(stack.pop(), []):
+            if name not in selected:
+                selected.add(name)
+                stack.append(name)
+
+    return [task for task in tasks if task[0] in selected]
+
+
+def _build_scheduler(run, max_workers=None, timeout=None, timeouts=None,
+                     only=None, subsystems=None):
+    """
+    :param run: _InspectionRun
+    :param max_workers: Size of the inspection thread pool
+    :param timeout: Default deadline, in seconds, for each task
+    :param timeouts: Per inspector or driver (probe) deadline overrides
+    :param only: Only schedule these inspectors and their requirements
+    :param subsystems: Only schedule probes for these driver types (and those
+        required by the selected inspectors)
+    :return: InspectionScheduler
+    """
+    load_drivers()
+
+    timeouts = timeouts or {}
+    tasks = []
+
+    for name, f in inspectors:
+        tasks.append((name, run.early(name, f), [], name))
+
+    for driver in registered_drivers:
+        tasks.append((PROBE_PREFIX + driver['name'], run.probe(driver),
+                      _probe_requirements(driver), None))
+
+    for name, f in late_inspectors:
+        tasks.append((name, run.late(name, f), _late_requirements(f), name))
+
+    if only is not None or subsystems is not None:
+        tasks = _select(tasks, only, subsystems)
+
+    scheduler = InspectionScheduler(max_workers)
+    for name, target, requires, provides in tasks:
+        timeout_key = name[len(PROBE_PREFIX):] \
+            if name.startswith(PROBE_PREFIX) else name
+        scheduler.add_task(name, target, requires=requires,
+                           provides=provides,
+                           timeout=timeouts.get(timeout_key, timeout))
+
+    return scheduler
+
+
+def inspect(max_workers=None, timeout=None, timeouts=None, incremental=False,
+            only=None, subsystems=None):
     """
     Runs inspectors and associates collection with a mercury_id
+
+    Inspectors, driver probes, and late inspectors are run concurrently.
+    Late inspectors start as soon as the early keys and driver subsystems
+    they declare are available.
+
+    An inspector or probe which does not complete before its deadline has
+    its child processes killed and its key is set to None. Timed out tasks
+    are listed in the stats under 'timed_out'.
+
+    When incremental is True, inspectors whose fingerprint has not changed
+    since their last successful run are not run again. Their previous
+    global_device_info section is used instead and they are listed in the
+    stats under 'reused'.
+
+    Timing for every inspector, probe, and driver is stored under
+    instrumentation.STATS_KEY
+
+    :param max_workers: Size of the inspection thread pool
+    :param timeout: Default deadline, in seconds, for each inspector and probe
+    :param timeouts: dictionary of deadline overrides keyed by inspector name
+        or driver name
+    :param incremental: Only run inspectors whose fingerprints have changed
+    :param only: list of inspector names. When specified, only these
+        inspectors, the early inspectors and driver probes they require are
+        run. Other sections of global_device_info are left untouched
+    :param subsystems: list of driver types whose probes should be run, ie
+        ['raid']
     :return:
     """
-    collected = _collect()
-    dmi = collected.get('dmi') or {}
-    interfaces = collected.get('interfaces') or {}
+    with _inspect_lock:
+        return _inspect(max_workers, timeout, timeouts, incremental, only,
+                        subsystems)
 
-    collected['mercury_id'] = generate_mercury_id(dmi, interfaces)
 
-    # populate_drivers
+def _inspect(max_workers, timeout, timeouts, incremental, only, subsystems):
+    run = _InspectionRun(incremental)
+    scheduler = _build_scheduler(run, max_workers, timeout, timeouts, only,
+                                 subsystems)
+
+    instrumentation.begin()
+    try:
+        collected = scheduler.run()
+    finally:
+        stats = instrumentation.end()
+
+    stats['timed_out'] = scheduler.timed_out
+    stats['reused'] = run.reused
+
+    for name, current in list(run.fingerprints.items()):
+        if current is None or name in scheduler.timed_out:
+            global_fingerprints.pop(name, None)
+        else:
+            global_fingerprints[name] = current
+    for name in scheduler.timed_out:
+        global_fingerprints.pop(name, None)
+
+    # A selective inspection may not have collected the identifying sections
+    dmi = collected.get('dmi', global_device_info.get('dmi')) or {}
+    interfaces = collected.get(
+        'interfaces', global_device_info.get('interfaces')) or {}
+
+    collected['mercury_id'] = generate_mercury_id(dmi, interfaces)
+    collected[instrumentation.STATS_KEY] = stats
 
-    for driver in registered_drivers:
-        _wants = driver['class'].wants
-
-        # noinspection PyBroadException
-        try:
-            devices = driver['class'].probe(
-                _wants and collected[_wants] or collected)
-        except Exception:
-            # probe is implemented in each driver and is not wrapped
-            # handle probe errors gracefully and soldier on
-            log.error(fancy_traceback_short(
-                parse_exception(),
-                preamble='Probe function failed for driver {}'.format(
-                    driver['name']
-                )))
-            continue
-        if devices:
-            set_driver_cache(driver, devices)
-
-    # TODO: Sort RAID drivers based on devices
-
-    for inspector, f in late_inspectors:
-        collected[inspector] = f(collected)
-
-    global global_device_info
     global_device_info.update(**collected)
 
     return global_device_info
 
 
+def restore(device_info, fingerprints):
+    """ Seed global_device_info and global_fingerprints from a previous
+    inspection, such as one loaded from the inspection cache. A subsequent
+    incremental inspection will only run inspectors whose sources have
+    changed since.
+
+    :param device_info: A previous inspect() result
+    :param fingerprints: The fingerprints taken during that inspection
+    :return: global_device_info
+    """
+    with _inspect_lock:
+        global_device_info.clear()
+        global_device_info.update(device_info)
+        global_fingerprints.clear()
+        global_fingerprints.update(fingerprints or {})
+    return global_device_info
+
+
+def save_cache(path):
+    """ Persist global_device_info and global_fingerprints to the inspection
+    cache. The lock is held while they are serialized so that a concurrent
+    inspection or merge cannot change them mid write
+
+    :param path: The cache file
+    :return: True if the cache was written
+    """
+    with _inspect_lock:
+        return cache.save(global_device_info, global_fingerprints, path)
+
+
+def merge(update):
+    """ Apply a partial update to global_device_info without racing a
+    running inspection
+
+    :param update: callable accepting global_device_info and returning a
+        dictionary of the sections to replace
+    :return: The replaced sections
+    """
+    with _inspect_lock:
+        sections = update(global_device_info)
+        global_device_info.update(sections)
+        for name in sections:
+            # The sections no longer reflect a fingerprinted inspection
+            global_fingerprints.pop(name, None)
+    return sections
+
+
 if __name__ == '__main__':
     from pprint import pprint
     pprint(inspect())
@@ -1,10 +1,11 @@
-import pkg_resources
-
 from mercury_agent.inspector.inspectors import expose
 
 
 @expose('agent_info')
 def agent_inspector():
+    # pkg_resources takes longer to import than the rest of the agent
+    import pkg_resources
+
     _info = {
         'agent_version':
         pkg_resources.get_distribution('mercury-agent').version,
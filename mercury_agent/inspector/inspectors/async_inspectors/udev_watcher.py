@@ -0,0 +1,273 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Keeps the os_storage and interfaces inventory current by listening for udev
+events. Events are debounced, a burst of events (a disk and its partitions
+appearing, a partition table being rewritten) results in a single
+re-inspection of each affected device once the burst settles.
+
+Carrier changes are not udev events; link state is refreshed whenever the
+interface is re-inspected and during regular inspections.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from mercury.common.exceptions import fancy_traceback_short, parse_exception
+
+from mercury_agent import backend_client
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.hwlib import rtnetlink
+from mercury_agent.inspector.hwlib.udev import UDevHelper
+from mercury_agent.inspector.inspectors.interfaces import inspect_interface
+from mercury_agent.inspector.inspectors.os_storage import \
+    inspect_storage_device
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 2.0
+
+# A continuous stream of events is flushed after this many debounce periods
+MAX_DELAY_FACTOR = 5
+
+POLL_INTERVAL = 1.0
+
+
+def _is_ethernet(device):
+    try:
+        return device.attributes.asint('type') == 1
+    except (KeyError, ValueError):
+        return False
+
+
+def _splice(entries, changes, key):
+    """ Replace, remove, or append entries
+
+    :param entries: The current section
+    :param changes: dictionary of key: entry, None removes the entry
+    :param key: callable returning the key of an entry
+    :return: new section
+    """
+    result = []
+    seen = set()
+    for entry in entries:
+        k = key(entry)
+        if k in changes:
+            seen.add(k)
+            if changes[k] is not None:
+                result.append(changes[k])
+        else:
+            result.append(entry)
+
+    for k, entry in changes.items():
+        if k not in seen and entry is not None:
+            result.append(entry)
+    return result
+
+
+def _storage_key(entry):
+    return entry.get('udev', {}).get('DEVNAME')
+
+
+def _interface_key(entry):
+    return entry.get('devname')
+
+
+class UDevWatcher(object):
+    def __init__(self, debounce=DEFAULT_DEBOUNCE, monitor=None):
+        """
+        :param debounce: Seconds to wait for events to settle
+        :param monitor: pyudev.Monitor
+        """
+        self.debounce = debounce
+        self.monitor = monitor or UDevHelper().get_monitor()
+        self.monitor.filter_by('block')
+        self.monitor.filter_by('net')
+        self.thread = None
+        self._stop = threading.Event()
+
+    def inspect(self):
+        """ Start watching, does not block """
+        self.thread = threading.Thread(target=self.watch,
+                                       name='udev-watcher',
+                                       daemon=True)
+        self.thread.start()
+
+    def cleanup(self):
+        self._stop.set()
+
+    @staticmethod
+    def event_keys(device):
+        """
+        :param device: pyudev.Device received from the monitor
+        :return: list of ((subsystem, name), (action, device)), empty if the
+            event is not interesting
+        """
+        if device.subsystem == 'block':
+            if device.device_type == 'partition':
+                # Partition events change the parent disk's partition table
+                disk = device.find_parent('block', 'disk')
+                if disk is None:
+                    return []
+                return [(('block', disk.sys_name), ('change', disk))]
+            if device.device_type == 'disk':
+                return [(('block', device.sys_name), (device.action, device))]
+            return []
+
+        if device.subsystem == 'net':
+            events = [(('net', device.sys_name), (device.action, device))]
+            if device.action == 'move':
+                # A renamed interface is inventoried under its new name only
+                old_name = device.get('INTERFACE_OLD')
+                if not old_name and device.get('DEVPATH_OLD'):
+                    old_name = os.path.basename(device.get('DEVPATH_OLD'))
+                if old_name and old_name != device.sys_name:
+                    events.append((('net', old_name), ('remove', device)))
+            return events
+
+        return []
+
+    def watch(self):
+        # noinspection PyBroadException
+        try:
+            self.monitor.start()
+        except Exception:
+            log.error(fancy_traceback_short(
+                parse_exception(),
+                preamble='Could not start the udev monitor, device changes '
+                         'will not be inventoried'))
+            return
+
+        pending = {}
+        first = last = None
+
+        while not self._stop.is_set():
+            if pending:
+                now = time.monotonic()
+                flush_at = min(last + self.debounce,
+                               first + self.debounce * MAX_DELAY_FACTOR)
+                if now >= flush_at:
+                    events, pending = pending, {}
+                    self.process(events)
+                    continue
+                timeout = flush_at - now
+            else:
+                timeout = POLL_INTERVAL
+
+            # The watcher must outlive a failed poll or a malformed event
+            # noinspection PyBroadException
+            try:
+                device = self.monitor.poll(timeout=timeout)
+                if device is None:
+                    continue
+                events = self.event_keys(device)
+            except Exception:
+                log.error(fancy_traceback_short(
+                    parse_exception(),
+                    preamble='Failed to receive udev event'))
+                self._stop.wait(POLL_INTERVAL)
+                continue
+
+            if not events:
+                continue
+
+            log.debug('udev event: %s %s', device.action, device.sys_path)
+            last = time.monotonic()
+            if not pending:
+                first = last
+            pending.update(events)
+
+    @staticmethod
+    def inspect_device(subsystem, name, action, device, network):
+        """
+        :return: (section, key, entry), entry is None if the device has been
+            removed or is not inventoried
+        """
+        removed = action == 'remove'
+        if subsystem == 'block':
+            entry = None
+            if not removed and UDevHelper.is_valid_storage_device(device):
+                entry = inspect_storage_device(device)
+            return 'os_storage', device.get('DEVNAME'), entry
+
+        entry = None
+        if not removed and _is_ethernet(device):
+            entry = inspect_interface(name, [device], network)
+        return 'interfaces', name, entry
+
+    def process(self, events):
+        """ Re-inspect affected devices, merge them into global_device_info,
+        and push the changes to the backend. Errors are logged, they never
+        stop the watcher
+
+        :param events: dictionary of (subsystem, name): (action, device)
+        """
+        # noinspection PyBroadException
+        try:
+            self._process(events)
+        except Exception:
+            log.error(fancy_traceback_short(
+                parse_exception(),
+                preamble='Failed to process udev events for {}'.format(
+                    ', '.join(sorted(name for _, name in events)))))
+
+    def _process(self, events):
+        changes = {'os_storage': {}, 'interfaces': {}}
+        network = None
+
+        for (subsystem, name), (action, device) in events.items():
+            if subsystem == 'net' and network is None:
+                network = rtnetlink.dump()
+            # noinspection PyBroadException
+            try:
+                section, key, entry = self.inspect_device(
+                    subsystem, name, action, device, network)
+            except Exception:
+                log.error(fancy_traceback_short(
+                    parse_exception(),
+                    preamble='Failed to inspect {}'.format(name)))
+                continue
+            if key:
+                changes[section][key] = entry
+
+        def update(device_info):
+            sections = {}
+            if changes['os_storage']:
+                sections['os_storage'] = _splice(
+                    device_info.get('os_storage') or [],
+                    changes['os_storage'], _storage_key)
+            if changes['interfaces']:
+                sections['interfaces'] = _splice(
+                    device_info.get('interfaces') or [],
+                    changes['interfaces'], _interface_key)
+            return sections
+
+        sections = inspect.merge(update)
+        mercury_id = inspect.global_device_info.get('mercury_id')
+        if not sections or not mercury_id:
+            return
+
+        log.info('Devices changed: %s', ', '.join(
+            sorted(name for _, name in events)))
+        # noinspection PyBroadException
+        try:
+            backend_client.update_inventory(mercury_id, sections)
+        except Exception:
+            log.error(fancy_traceback_short(
+                parse_exception(),
+                preamble='Failed to update inventory'))
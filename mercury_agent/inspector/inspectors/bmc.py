@@ -2,6 +2,7 @@ import logging
 
 
 from mercury_agent.hardware.drivers import get_subsystem_drivers
+from mercury_agent.inspector import instrumentation
 from mercury_agent.inspector.inspectors import expose_late
 
 
@@ -9,7 +10,7 @@ log = logging.getLogger(__name__)
 
 
 # noinspection PyUnusedLocal
-@expose_late('bmc')
+@expose_late('bmc', requires=[], subsystems=['bmc'])
 def bmc_inspector(device_info):
 
     drivers = get_subsystem_drivers('bmc')
@@ -23,4 +24,5 @@ def bmc_inspector(device_info):
 
     log.info('Running BMC inspector: {}'.format(driver.name))
 
-    return driver.inspect()
+    with instrumentation.measure('drivers', driver.name):
+        return driver.inspect()
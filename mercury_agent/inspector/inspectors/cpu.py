@@ -14,11 +14,44 @@
 #    limitations under the License.
 
 from mercury_agent.inspector.inspectors import inspector
-from mercury_agent.inspector.hwlib.cpuinfo import CPUInfo
+from mercury_agent.inspector.hwlib.cpuinfo import (
+    CPUInfo,
+    CPUTopology,
+    sample_frequencies
+)
 
 
-@inspector.expose('cpu')
-def cpu_inspector():
+def _topology_inspector():
+    _cpu = []
+    topology = CPUTopology()
+    # One processor per package is reported
+    frequencies = sample_frequencies(
+        [int(package.info['processor'])
+         for package in topology.packages.values()], topology) or {}
+
+    for _id in sorted(topology.packages):
+        package = topology.packages[_id]
+        processor = package.info
+        _proc_dict = dict()
+        _proc_dict['physical_id'] = _id
+        _proc_dict['cores'] = package.core_count
+        _proc_dict['threads'] = package.thread_count
+        _proc_dict['dies'] = len(package.dies)
+        _proc_dict['numa_nodes'] = sorted(package.nodes)
+        _proc_dict['model_name'] = processor['model_name']
+        _proc_dict['cache_size'] = processor['cache_size']
+        _proc_dict['cache_alignment'] = int(processor['cache_alignment'])
+        _proc_dict['flags'] = sorted(package.flags)
+        # speed
+        _proc_dict['frequency'] = CPUInfo.get_speed_info(
+            processor, frequencies.get(int(processor['processor'])))
+
+        _cpu.append(_proc_dict)
+
+    return _cpu
+
+
+def _cpuinfo_inspector():
     _cpu = []
     cpu_info = CPUInfo()
 
@@ -42,6 +75,14 @@ def cpu_inspector():
     return _cpu
 
 
+@inspector.expose('cpu')
+def cpu_inspector():
+    # /proc/cpuinfo alone is used where sysfs has no cpu topology
+    if CPUTopology.available():
+        return _topology_inspector()
+    return _cpuinfo_inspector()
+
+
 if __name__ == '__main__':
     from pprint import pprint
 
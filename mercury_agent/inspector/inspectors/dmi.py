@@ -14,10 +14,16 @@
 #    limitations under the License.
 
 from . import inspector
+from mercury_agent.inspector import fingerprint
 from mercury_agent.inspector.hwlib.sysfs import DMI
 
 
-@inspector.expose('dmi')
+def dmi_fingerprint():
+    # DMI tables do not change without a reboot
+    return fingerprint.digest(fingerprint.boot_id())
+
+
+@inspector.expose('dmi', fingerprint=dmi_fingerprint)
 def dmi_inspector():
     dmi = DMI()
     return dmi.dump()
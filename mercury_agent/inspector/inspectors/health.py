@@ -39,11 +39,13 @@ def _qc_hp(_oem_details, log_error):
 
 
 # noinspection PyTypeChecker
-@expose_late('system_health')
+@expose_late('system_health', requires=['dmi'], subsystems=[])
 def system_health_inspector(device_info):
     agent_configuration = get_configuration().agent
+    mce_events = mcelog.get_counter().update()
     _health = {
-        'corrected_hardware_event_count': mcelog.count_logged_events(),
+        'corrected_hardware_event_count': mce_events.total,
+        'corrected_hardware_events': mce_events.buckets(),
         'system_uptime': cli.run('uptime -s', ignore_error=True).strip(),
         'has_errors': False,
         'errors': []
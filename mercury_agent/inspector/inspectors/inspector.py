@@ -45,22 +45,32 @@ def run_inspector(name, f, *args, **kwargs):
         return None
 
 
-def expose(name):
+def expose(name, fingerprint=None):
+    """Runtime inspectors
+    :param fingerprint: optional callback returning a value which changes whenever the
+        inspector output may have changed. See mercury_agent.inspector.fingerprint
+    """
     def wrap(f):
         def wrapped_f(*args, **kwargs):
             return run_inspector(name, f, *args, **kwargs)
         log.debug('Adding runtime inspector %s (%s)' % (f.__name__, name))
         wrapped_f.__name__ = f.__name__
         wrapped_f.__doc__ = f.__doc__
+        wrapped_f.fingerprint = fingerprint
         inspectors.append((name, wrapped_f))
         return wrapped_f
     return wrap
 
 
-def expose_late(name, run_if=None):
+def expose_late(name, run_if=None, requires=None, subsystems=None, fingerprint=None):
     """Hardware dependent inspectors, such as those dependent on OEM/ODM utilities
     :param run_if: callback funtion that takes device_info as an argument. This is optional,
         run_if can always be added by other means
+    :param requires: early inspector keys read from device_info. When None, the inspector
+        waits for every early inspector
+    :param subsystems: driver subsystems (driver_type) which must be probed before the
+        inspector runs. When None, the inspector waits for every driver probe
+    :param fingerprint: optional callback, see expose
     """
     def wrap(f):
         def wrapped_f(early_device_info):
@@ -73,6 +83,9 @@ def expose_late(name, run_if=None):
         wrapped_f.__doc__ = f.__doc__
         if run_if:
             wrapped_f.run_if = run_if
+        wrapped_f.requires = requires
+        wrapped_f.subsystems = subsystems
+        wrapped_f.fingerprint = fingerprint
         late_inspectors.append((name, wrapped_f))
         return wrapped_f
     return wrap
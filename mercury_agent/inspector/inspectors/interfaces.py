@@ -14,19 +14,26 @@
 #    limitations under the License.
 
 import logging
-import netifaces
+import socket
 
+from mercury_agent.inspector import fingerprint
 from mercury_agent.inspector.inspectors import inspector
 
 from mercury_agent.inspector.hwlib import biosdevname
-from mercury_agent.inspector.hwlib.sysfs import NetClass
-from mercury_agent.inspector.hwlib.udev import UDevHelper
-from mercury_agent.inspector.hwlib import network_interfaces
+from mercury_agent.inspector.hwlib import rtnetlink
+from mercury_agent.inspector.hwlib import udev
+from mercury_agent.inspector.hwlib.sysfs import NetClass, convert_bool
 
 log = logging.getLogger(__name__)
 
 
 def get_udev_interface_by_name(interfaces, name):
+    """
+    :param interfaces: list of pyudev net devices or a dictionary of
+        sys_name: device
+    """
+    if isinstance(interfaces, dict):
+        return interfaces.get(name)
     for interface in interfaces:
         if interface.get('INTERFACE') == name:
             return interface
@@ -38,75 +45,126 @@ def index_gateways(gateways):
         if gateway == 'default':
             continue
         log.debug(gateway)
-        _d[gateway[1]] = list()
-        _d[gateway[1]].append(dict(list(zip(['gateway_ip', 'interface', 'default'], gateway))))
+        _d.setdefault(gateway[1], list()).append(
+            dict(list(zip(['gateway_ip', 'interface', 'default'], gateway))))
     return _d
 
 
-@inspector.expose('interfaces')
+def index_network_gateways(network):
+    """
+    :param network: rtnetlink.NetlinkSnapshot
+    :return: dictionary of address family: index_gateways result
+    """
+    gateways = network.gateways()
+    return dict((family, index_gateways(gateways.get(family, [])))
+                for family in (socket.AF_INET, socket.AF_INET6))
+
+
+def interface_fingerprint():
+    """ Link state, addresses, and routes, all without forking """
+    return fingerprint.digest(
+        fingerprint.listing('/sys/class/net'),
+        fingerprint.contents('/sys/class/net/*/address',
+                             '/sys/class/net/*/carrier',
+                             '/sys/class/net/*/speed',
+                             '/sys/class/net/*/duplex',
+                             '/proc/net/if_inet6',
+                             '/proc/net/fib_trie',
+                             '/proc/net/route',
+                             '/proc/net/ipv6_route'))
+
+
+def get_biosdevnames(interfaces=None):
+    try:
+        return biosdevname.get_names(interfaces)
+    except OSError as e:
+        log.debug('Cannot resolve biosdevname names: %s', e)
+        return {}
+
+
+def inspect_interface(interface, udev_interfaces, network, gateways=None,
+                      biosdevnames=None):
+    """
+    Inspect a single network interface
+    :param interface: interface devname
+    :param udev_interfaces: pyudev net devices, see get_udev_interface_by_name
+    :param network: rtnetlink.NetlinkSnapshot
+    :param gateways: index_network_gateways(network), computed when omitted
+    :param biosdevnames: get_biosdevnames() result, resolved when omitted
+    :return: interface dictionary or None if the interface has no hardware address
+    """
+    log.debug('Inspecting: {}'.format(interface))
+    ndi = NetClass(interface).snapshot()
+    _iface = dict()
+    _iface['devname'] = interface
+    address = ndi['address']
+    if not address:
+        return None
+    _iface['address'] = address
+    _iface['carrier'] = convert_bool(ndi['carrier'])
+    log.debug('Interface {} is {}'.format(interface, _iface['carrier'] and 'up' or 'down'))
+    _iface['dev_port'] = ndi['dev_port']
+    _iface['duplex'] = ndi['duplex']
+    _iface['speed'] = ndi['speed']
+    _iface['predictable_names'] = {}
+    if biosdevnames is None:
+        biosdevnames = get_biosdevnames([interface])
+    _iface['predictable_names']['biosdevname'] = biosdevnames.get(interface)
+
+    udev_interface = get_udev_interface_by_name(udev_interfaces, interface) or dict()
+    _iface['predictable_names']['systemd_udev'] = udev_interface.get('ID_NET_NAME_PATH')
+    _iface['predictable_names']['systemd_onboard'] = udev_interface.get('ID_NET_NAME_ONBOARD')
+    _iface['predictable_names']['systemd_mac'] = udev_interface.get('ID_NET_NAME_MAC')
+    _iface['predictable_names']['systemd_slot'] = udev_interface.get('ID_NET_NAME_SLOT')
+
+    if not udev_interface:
+        udev_parent = dict()
+    else:
+        udev_parent = udev_interface.parent or dict()
+    _iface['pci_slot'] = udev_parent.get('PCI_SLOT_NAME')
+    _iface['model_name'] = udev_parent.get('ID_MODEL_FROM_DATABASE')
+    _iface['vendor_name'] = udev_parent.get('ID_VENDOR_FROM_DATABASE')
+    _iface['pci_class'] = udev_parent.get('PCI_CLASS')
+    _iface['pci_id'] = udev_parent.get('PCI_ID')
+    _iface['pci_subsystem_id'] = udev_parent.get('PCI_SUBSYS_ID')
+    _iface['driver'] = udev_parent.get('DRIVER')
+
+    if gateways is None:
+        gateways = index_network_gateways(network)
+
+    # provide per interface routing table
+    addresses = network.ifaddresses(interface)
+    _iface['address_info'] = addresses.get(socket.AF_INET, [])
+    _iface['ipv4_gateways'] = gateways[socket.AF_INET].get(interface)
+
+    _iface['address_info_v6'] = addresses.get(socket.AF_INET6, [])
+    _iface['ipv6_gateways'] = gateways[socket.AF_INET6].get(interface)
+
+    return _iface
+
+
+@inspector.expose('interfaces', fingerprint=interface_fingerprint)
 def interface_inspector():
     """
     Doc this by providing an example interfaces data structure
     :return: interface data structure
     """
     i = []
-    uh = UDevHelper()
-    udev_interfaces = uh.get_network_devices()
-    interfaces = network_interfaces.list_interfaces()
-    gateways = netifaces.gateways()
+    udev_interfaces = dict(
+        (device.sys_name, device)
+        for device in udev.get_snapshot().get_network_devices())
+    # Shared with the routes inspector
+    network = rtnetlink.get_snapshot()
+    gateways = index_network_gateways(network)
     log.debug(gateways)
+    interfaces = network.list_interfaces()
+    biosdevnames = get_biosdevnames(interfaces)
 
     for interface in interfaces:
-        log.debug('Inspecting: {}'.format(interface))
-        ndi = NetClass(interface)
-        _iface = dict()
-        _iface['devname'] = interface
-        address = ndi.address
-        if not address:
-            continue
-        _iface['address'] = address
-        _iface['carrier'] = ndi.carrier
-        log.debug('Interface {} is {}'.format(interface, ndi.carrier and 'up' or 'down'))
-        _iface['dev_port'] = ndi.dev_port
-        _iface['duplex'] = ndi.duplex
-        _iface['speed'] = ndi.speed
-        _iface['predictable_names'] = {}
-        try:
-            _iface['predictable_names']['biosdevname'] = biosdevname.get_name(interface)
-        except OSError:
-            _iface['predictable_names']['biosdevname'] = None
-
-        udev_interface = get_udev_interface_by_name(udev_interfaces, interface) or dict()
-        _iface['predictable_names']['systemd_udev'] = udev_interface.get('ID_NET_NAME_PATH')
-        _iface['predictable_names']['systemd_onboard'] = udev_interface.get('ID_NET_NAME_ONBOARD')
-        _iface['predictable_names']['systemd_mac'] = udev_interface.get('ID_NET_NAME_MAC')
-        _iface['predictable_names']['systemd_slot'] = udev_interface.get('ID_NET_NAME_SLOT')
-
-        if not udev_interface:
-            udev_parent = dict()
-        else:
-            udev_parent = udev_interface.parent or dict()
-        _iface['pci_slot'] = udev_parent.get('PCI_SLOT_NAME')
-        _iface['model_name'] = udev_parent.get('ID_MODEL_FROM_DATABASE')
-        _iface['vendor_name'] = udev_parent.get('ID_VENDOR_FROM_DATABASE')
-        _iface['pci_class'] = udev_parent.get('PCI_CLASS')
-        _iface['pci_id'] = udev_parent.get('PCI_ID')
-        _iface['pci_subsystem_id'] = udev_parent.get('PCI_SUBSYS_ID')
-        _iface['driver'] = udev_parent.get('DRIVER')
-
-        # provide per interface routing table
-        _iface['address_info'] = network_interfaces.get_ipv4_network_info(interface)
-
-        ipv4_gateways = gateways.get(netifaces.AF_INET, [])
-        _iface['ipv4_gateways'] = index_gateways(ipv4_gateways).get(interface)
-
-        _iface['address_info_v6'] = network_interfaces.get_ipv6_network_info(interface)
-
-        ipv6_gateways = gateways.get(netifaces.AF_INET6, [])
-        _iface['ipv6_gateways'] = index_gateways(ipv6_gateways).get(interface)
-
-        # TODO: Add gateway information from netifaces.gateways()
-        i.append(_iface)
+        _iface = inspect_interface(interface, udev_interfaces, network,
+                                   gateways, biosdevnames)
+        if _iface:
+            i.append(_iface)
 
     return i
 
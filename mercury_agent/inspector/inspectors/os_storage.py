@@ -14,61 +14,103 @@
 #    limitations under the License.
 
 import logging
+import os
 import re
 
-from press.helpers import parted
-
+from mercury_agent.inspector import fingerprint
 from mercury_agent.inspector.inspectors import inspector
-from mercury_agent.inspector.hwlib.udev import UDevHelper
+from mercury_agent.inspector.hwlib import partition_table
+from mercury_agent.inspector.hwlib.sysfs import BlockQueue, convert_bool
+from mercury_agent.inspector.hwlib import udev
+from mercury_agent.inspector.scheduler import map_on_threads
 
 log = logging.getLogger(__name__)
 
+# Disks probed concurrently
+MAX_PROBE_WORKERS = 16
+
 
 def get_disk_type(dev):
-    dev = dev.lstrip('/dev/')
-    sysfs_rotational_path = f'/sys/block/{dev}/queue/rotational'
-    try:
-        return 'disk' if int(open(sysfs_rotational_path).read()) else 'ssd'
-    except (IOError, OSError):
+    dev = os.path.basename(dev)
+    rotational = BlockQueue(dev).get_cookie('rotational')
+    if not rotational:
         log.warning('Could not parse sysfs for %s', dev)
         return 'unknown'
+    return 'disk' if convert_bool(rotational) else 'ssd'
 
 
 def _fix_udev_device_for_mongo(udev_device):
     rgx = re.compile('[{}]'.format('$. '))
-    for k in udev_device:
+    for k in list(udev_device):
         if rgx.search(k):
             udev_device[rgx.sub('_', k)] = udev_device.pop(k)
 
 
-@inspector.expose('os_storage')
+def probe_device_info(devname):
+    """
+    Read the disk label, parted is only run for disks the native reader does
+    not recognize
+    :param devname: device node, ie /dev/sda
+    :return: PartedInterface.device_info dictionary, empty if the label
+        cannot be read
+    """
+    # Requires root privilages
+    try:
+        device_info = partition_table.read_device_info(devname)
+    except OSError as e:
+        log.debug('Could not read %s [%s], using parted', devname, e)
+        device_info = None
+    if device_info is not None:
+        return device_info
+
+    # press is slow to import and only needed once inspection starts
+    from press.helpers import parted
+
+    try:
+        return parted.PartedInterface(devname).device_info
+    except parted.PartedException:
+        log.warning('Could not parse disk label for %s. Got root?', devname)
+        return {}
+
+
+def inspect_storage_device(storage_device):
+    """
+    Inspect a single block device
+    :param storage_device: pyudev.Device
+    :return: os_storage entry
+    """
+    udev_device = dict(list(storage_device.items()))
+    device_info = probe_device_info(udev_device['DEVNAME'])
+    device_info['udev'] = udev_device
+    if udev_device.get('ID_BUS') != 'fc':
+        device_info['media_type'] = get_disk_type(udev_device['DEVNAME'])
+    else:
+        # Fibre channel!
+        device_info['media_type'] = 'external'
+
+    _fix_udev_device_for_mongo(udev_device)
+
+    return device_info
+
+
+def os_storage_fingerprint():
+    # Disk add/remove and partition table changes generate uevents
+    return fingerprint.digest(fingerprint.uevent_seqnum(),
+                              fingerprint.contents('/proc/partitions'))
+
+
+@inspector.expose('os_storage', fingerprint=os_storage_fingerprint)
 def os_storage_inspector():
-    os_storage = []
-    storage_devices = UDevHelper().discover_valid_storage_devices(
+    storage_devices = udev.get_snapshot().get_storage_devices(
         fc_enabled=True, loop_enabled=False)
-    for storage_device in storage_devices:
-        device_info = {}
-        udev_device = dict(list(storage_device.items()))
-        # Requires root privilages
-        try:
-            device_info.update(**parted.PartedInterface(
-                udev_device['DEVNAME']).device_info)
-        except parted.PartedException:
-            log.warning(
-                'Could not parse disk label for %s. Got root?',
-                udev_device['DEVNAME'])
-        device_info['udev'] = udev_device
-        if udev_device.get('ID_BUS') != 'fc':
-            device_info['media_type'] = get_disk_type(udev_device['DEVNAME'])
-        else:
-            # Fibre channel!
-            device_info['media_type'] = 'external'
-
-        os_storage.append(device_info)
-
-        _fix_udev_device_for_mongo(udev_device)
-
-    return os_storage
+    if not storage_devices:
+        return []
+
+    # Disks are probed side by side, results keep the udev order. A parted
+    # fallback which hangs is killed along with the inspector when its
+    # deadline passes
+    return map_on_threads(inspect_storage_device, storage_devices,
+                          MAX_PROBE_WORKERS)
 
 
 if __name__ == '__main__':
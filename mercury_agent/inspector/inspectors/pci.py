@@ -13,13 +13,21 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from mercury_agent.inspector import fingerprint
 from mercury_agent.inspector.inspectors import inspector
 from mercury_agent.inspector.hwlib import lspci
 
 
-@inspector.expose('pci')
+def pci_fingerprint():
+    # hotplug and driver bind/unbind both generate uevents
+    return fingerprint.digest(fingerprint.boot_id(),
+                              fingerprint.uevent_seqnum(),
+                              fingerprint.listing('/sys/bus/pci/devices'))
+
+
+@inspector.expose('pci', fingerprint=pci_fingerprint)
 def pci_inspector():
-    _pci = lspci.parse_nnvmmk()
+    _pci = lspci.get_pci_devices()
     return _pci
 
 
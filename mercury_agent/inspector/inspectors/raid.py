@@ -16,14 +16,27 @@
 import logging
 
 from mercury_agent.hardware.drivers import get_subsystem_drivers
+from mercury_agent.inspector import fingerprint, instrumentation
 from mercury_agent.inspector.inspectors import expose_late
 
 
 log = logging.getLogger(__name__)
 
 
+def raid_fingerprint():
+    """ Combines driver fingerprints. If any driver cannot provide one, the
+    inspector is always run
+    """
+    parts = [fingerprint.uevent_seqnum()]
+    for driver in get_subsystem_drivers('raid'):
+        parts.append(driver.name)
+        parts.append(driver.fingerprint())
+    return fingerprint.digest(*parts)
+
+
 # noinspection PyUnusedLocal
-@expose_late('raid')
+@expose_late('raid', requires=[], subsystems=['raid'],
+             fingerprint=raid_fingerprint)
 def raid_inspector(device_info):
     drivers = get_subsystem_drivers('raid')
 
@@ -35,7 +48,8 @@ def raid_inspector(device_info):
     for driver in drivers:
         log.info('Running RAID inspector %s' % driver.name)
 
-        data = driver.inspect()
+        with instrumentation.measure('drivers', driver.name):
+            data = driver.inspect()
 
         if isinstance(data, list):
             _inspected += data
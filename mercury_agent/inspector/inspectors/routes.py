@@ -17,32 +17,46 @@
 The current device routing table
 """
 
+import socket
+
 from . import inspector
-from mercury_agent.inspector.hwlib.iproute2 import IPRoute2
+from mercury_agent.inspector import fingerprint
+from mercury_agent.inspector.hwlib import rtnetlink
+from mercury_agent.inspector.hwlib.route_table import (
+    MAIN_TABLE, route_family, route_metric)
+
 
+def route_fingerprint():
+    # /proc/net/route only lists the main IPv4 table, changes to other IPv4
+    # tables are picked up by the next full inspection
+    return fingerprint.digest(
+        fingerprint.contents('/proc/net/route', '/proc/net/ipv6_route'))
 
-@inspector.expose('routes')
+
+@inspector.expose('routes', fingerprint=route_fingerprint)
 def route_inspector():
-    return IPRoute2().table
+    # Every table of both families, as `ip route show table all` and
+    # `ip -6 route show table all` present them. Routes outside of the main
+    # table include the table name or id
+    return rtnetlink.get_snapshot().route_table(family=None, table=None)
 
 
-def find_default_route(routes):
+def find_default_route(routes, family=socket.AF_INET):
     """
 
     :param routes:
+    :param family: socket.AF_INET or AF_INET6
     :return:
     """
-    _defaults = []
-    for route in routes:
-        if route.get('destination') == 'default':
-            if 'metric' not in route:
-                route['metric'] = 0
-            _defaults.append(route)
-
+    _defaults = [route for route in routes
+                 if route.get('destination') == 'default' and
+                 route.get('table', MAIN_TABLE) == MAIN_TABLE and
+                 route_family(route) == family]
     if not _defaults:
         return {}
 
-    return sorted(_defaults, key=lambda _d: int(_d['metric']))[0]
+    # A route without a metric has metric 0
+    return min(_defaults, key=route_metric)
 
 
 if __name__ == '__main__':
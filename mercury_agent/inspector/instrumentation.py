@@ -0,0 +1,147 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Timing instrumentation for inspectors, driver probes, and driver inspection
+
+Each measurement records wall time, the CPU time consumed by the measuring
+thread, and the number of child processes spawned from that thread. Child
+processes are counted using an audit hook, which is only available on
+python 3.8+. On older interpreters, processes is reported as None.
+
+Results are collected in device_info under STATS_KEY
+"""
+
+import logging
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+STATS_KEY = '_inspection_stats'
+
+# subprocess.Popen may start the child with os.posix_spawn, which raises its
+# own audit event. Counting both would count one process twice, so direct
+# os.posix_spawn calls are not counted
+SPAWN_EVENTS = frozenset(['subprocess.Popen', 'os.system', 'os.fork'])
+
+# thread_time is not available before python 3.7
+_thread_time = getattr(time, 'thread_time', time.process_time)
+
+_local = threading.local()
+_lock = threading.Lock()
+_active = None
+
+
+def _audit_hook(event, args):
+    if event in SPAWN_EVENTS:
+        _local.spawned = getattr(_local, 'spawned', 0) + 1
+
+
+if hasattr(sys, 'addaudithook'):
+    sys.addaudithook(_audit_hook)
+    _counting_processes = True
+else:
+    _counting_processes = False
+
+
+def spawned_processes():
+    """
+    :return: The number of processes spawned by the calling thread or None
+        if process accounting is not supported
+    """
+    if not _counting_processes:
+        return None
+    return getattr(_local, 'spawned', 0)
+
+
+class Measurement(object):
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.result = None
+        self._wall = None
+        self._cpu = None
+        self._spawned = None
+
+    def __enter__(self):
+        self._spawned = spawned_processes()
+        self._cpu = _thread_time()
+        self._wall = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        processes = spawned_processes()
+        self.result = {
+            'wall_time': time.monotonic() - self._wall,
+            'cpu_time': _thread_time() - self._cpu,
+            'processes': None if processes is None else
+            processes - self._spawned
+        }
+        record(self.kind, self.name, self.result)
+
+
+def measure(kind, name):
+    """
+    Context manager which times the enclosed block and records the result in
+    the active collection, if any
+
+    :param kind: inspectors, probes, late_inspectors, or drivers
+    :param name: The inspector key or driver name
+    """
+    return Measurement(kind, name)
+
+
+def begin():
+    """ Start a new collection. Measurements taken outside of an active
+    collection are discarded
+
+    :return: The stats dictionary which will be populated
+    """
+    global _active
+    with _lock:
+        _active = {
+            'started': time.time(),
+            'wall_time': None,
+            'inspectors': {},
+            'probes': {},
+            'late_inspectors': {},
+            'drivers': {}
+        }
+        _active['_start'] = time.monotonic()
+        return _active
+
+
+def end():
+    """ Close the active collection
+
+    :return: The populated stats dictionary
+    """
+    global _active
+    with _lock:
+        stats, _active = _active, None
+    if stats:
+        stats['wall_time'] = time.monotonic() - stats.pop('_start')
+    return stats
+
+
+def record(kind, name, result):
+    with _lock:
+        if _active is None:
+            return
+        _active.setdefault(kind, {})[name] = result
+    log.debug('%s %s took %.3fs (cpu: %.3fs, processes: %s)', kind, name,
+              result['wall_time'], result['cpu_time'], result['processes'])
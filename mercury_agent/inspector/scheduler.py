@@ -0,0 +1,331 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Dependency aware inspection scheduler
+
+Inspectors, driver probes, and late inspectors are registered as tasks. Each
+task declares the names of the tasks it requires. A task is started as soon
+as everything it requires has completed and a worker slot is available, so
+independent branches (lspci -> raid probe -> storcli, dmi -> racadm, etc)
+run side by side rather than one after another.
+
+Tasks may have a deadline. When a deadline passes, every process spawned by
+the task's thread is killed, the task is recorded as timed out, and its
+result is None. The thread itself cannot be killed; it is abandoned and its
+worker slot is released. Workers are daemon threads, so an abandoned worker
+never prevents the agent from exiting. Tasks which fan out onto their own
+threads use map_on_threads, which runs the work on daemon threads as well
+and binds it to the task with bind_to_task, so that processes spawned from
+those threads are killed along with the task's own.
+"""
+
+import functools
+import logging
+import os
+import signal
+import threading
+import time
+
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+from mercury.common.exceptions import fancy_traceback_short, parse_exception
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+# The task run by each worker thread
+_local = threading.local()
+
+
+def _native_thread_id():
+    # get_native_id is not available before python 3.8
+    get_native_id = getattr(threading, 'get_native_id', None)
+    return get_native_id and get_native_id()
+
+
+def _child_pids(pid, tid=None):
+    """ Returns the direct children of a process or, if tid is specified,
+    only those spawned by the given thread
+    """
+    if tid:
+        paths = ['/proc/{}/task/{}/children'.format(pid, tid)]
+    else:
+        try:
+            paths = ['/proc/{}/task/{}/children'.format(pid, t)
+                     for t in os.listdir('/proc/{}/task'.format(pid))]
+        except OSError:
+            return []
+
+    pids = []
+    for path in paths:
+        try:
+            with open(path) as fp:
+                pids += [int(p) for p in fp.read().split()]
+        except (IOError, OSError):
+            continue
+    return pids
+
+
+def kill_thread_children(tid):
+    """ Kill every process spawned by a thread, including their descendants
+
+    :param tid: The native (kernel) thread id
+    :return: list of killed pids
+    """
+    killed = []
+    stack = _child_pids(os.getpid(), tid)
+    while stack:
+        pid = stack.pop()
+        # Collect descendants before the parent is reaped
+        stack += _child_pids(pid)
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+        except OSError:
+            pass
+    return killed
+
+
+def current_task():
+    """
+    :return: The Task run by the calling thread, None outside of a scheduled
+        task
+    """
+    return getattr(_local, 'task', None)
+
+
+def bind_to_task(f):
+    """ Wrap f, a callable which will be run on another thread (ie by
+    map_on_threads), so that processes it spawns are killed when the
+    deadline of the calling task passes
+
+    :param f: callable
+    :return: f, wrapped when called from a scheduled task
+    """
+    task = current_task()
+    if task is None:
+        return f
+
+    @functools.wraps(f)
+    def bound(*args, **kwargs):
+        tid = _native_thread_id()
+        if tid:
+            task.helper_thread_ids.add(tid)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            # The thread id may be reused once the helper thread exits
+            task.helper_thread_ids.discard(tid)
+    return bound
+
+
+
+def map_on_threads(f, items, max_workers):
+    """ Like ThreadPoolExecutor.map, but the work is run on daemon threads
+    and bound to the calling task. ThreadPoolExecutor workers are joined when
+    the interpreter exits, so a call which never returns after its task was
+    abandoned would block agent shutdown.
+
+    :param f: callable accepting an item
+    :param items: iterable
+    :param max_workers: The maximum number of threads
+    :return: list of results, in the order of items
+    :raises: The exception raised by f for the first item which failed
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = [None] * len(items)
+    indexes = iter(range(len(items)))
+    lock = threading.Lock()
+    f = bind_to_task(f)
+
+    def worker():
+        while True:
+            with lock:
+                index = next(indexes, None)
+            if index is None:
+                return
+            # noinspection PyBroadException
+            try:
+                results[index] = f(items[index])
+            except Exception as e:
+                errors[index] = e
+
+    threads = [threading.Thread(target=worker, name='map-{}'.format(idx),
+                                daemon=True)
+               for idx in range(min(max_workers, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for error in errors:
+        if error is not None:
+            raise error
+    return results
+
+class Task(object):
+    def __init__(self, name, target, requires=None, provides=None,
+                 timeout=None):
+        """
+        :param name: Unique task name
+        :param target: callable accepting a snapshot of the collected data
+        :param requires: names of tasks which must complete before this one
+        :param provides: The collected key the return value is stored under,
+            None if the task is only run for side effects (driver probes)
+        :param timeout: Seconds the task may run before it is abandoned,
+            None or 0 to wait forever
+        """
+        self.name = name
+        self.target = target
+        self.requires = set(requires or [])
+        self.provides = provides
+        self.timeout = timeout
+        self.started = None
+        self.thread_id = None
+        # Threads running bind_to_task callables on behalf of the task
+        self.helper_thread_ids = set()
+
+    @property
+    def deadline(self):
+        if not self.timeout or self.started is None:
+            return None
+        return self.started + self.timeout
+
+    def __repr__(self):
+        return 'Task({})'.format(self.name)
+
+
+class InspectionScheduler(object):
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.tasks = {}
+        self.timed_out = []
+
+    def add_task(self, name, target, requires=None, provides=None,
+                 timeout=None):
+        if name in self.tasks:
+            raise ValueError('Task {} is already scheduled'.format(name))
+        self.tasks[name] = Task(name, target, requires, provides, timeout)
+
+    def _prune_requirements(self):
+        """ Requirements referencing tasks which were never registered are
+        dropped so that a typo cannot stall inspection forever
+        """
+        for task in self.tasks.values():
+            unknown = task.requires - set(self.tasks)
+            if unknown:
+                log.warning('%s requires unknown tasks: %s', task.name,
+                            ', '.join(sorted(unknown)))
+                task.requires -= unknown
+
+    @staticmethod
+    def _run_task(task, collected):
+        # noinspection PyBroadException
+        try:
+            return task.target(collected)
+        except Exception:
+            log.error(fancy_traceback_short(
+                parse_exception(),
+                preamble='Scheduled task {} failed'.format(task.name)))
+
+    def _start(self, task, collected):
+        future = Future()
+
+        def worker():
+            task.thread_id = _native_thread_id()
+            _local.task = task
+            future.set_result(self._run_task(task, collected))
+
+        task.started = time.monotonic()
+        threading.Thread(target=worker,
+                         name='inspect-{}'.format(task.name),
+                         daemon=True).start()
+        return future
+
+    def _expire(self, task):
+        log.error('%s did not complete within %s seconds, abandoning',
+                  task.name, task.timeout)
+        if task.thread_id:
+            killed = []
+            for tid in [task.thread_id] + list(task.helper_thread_ids):
+                killed += kill_thread_children(tid)
+            if killed:
+                log.error('Killed processes spawned by %s: %s', task.name,
+                          ', '.join(str(pid) for pid in killed))
+        else:
+            log.warning('Cannot identify the thread running %s, child '
+                        'processes have not been killed', task.name)
+        self.timed_out.append(task.name)
+
+    @staticmethod
+    def _wait_timeout(running):
+        deadlines = [task.deadline for task in running.values()
+                     if task.deadline is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
+
+    def run(self, collected=None):
+        """
+        Run all tasks, respecting declared requirements and deadlines
+        :param collected: Optional seed data
+        :return: collected data
+        """
+        collected = collected if collected is not None else {}
+        self._prune_requirements()
+
+        pending = dict(self.tasks)
+        completed = set()
+        running = {}
+
+        while pending or running:
+            ready = [name for name, task in pending.items()
+                     if task.requires <= completed]
+            for name in ready:
+                if len(running) >= self.max_workers:
+                    break
+                task = pending.pop(name)
+                log.debug('Scheduling %s', name)
+                # Tasks receive a snapshot so that concurrent writes do
+                # not change the dictionary under them
+                running[self._start(task, dict(collected))] = task
+
+            if not running:
+                # Only possible with a dependency cycle
+                log.error('Could not schedule tasks, circular '
+                          'requirements: %s', ', '.join(sorted(pending)))
+                break
+
+            done, _ = wait(running, timeout=self._wait_timeout(running),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                completed.add(task.name)
+                if task.provides:
+                    collected[task.provides] = future.result()
+
+            now = time.monotonic()
+            for future, task in list(running.items()):
+                if task.deadline is not None and task.deadline <= now:
+                    del running[future]
+                    self._expire(task)
+                    completed.add(task.name)
+                    if task.provides:
+                        collected[task.provides] = None
+
+        return collected
@@ -13,13 +13,31 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from mercury_agent.procedures.dell_firmware import *
-from mercury_agent.procedures.hp_raid import *
-from mercury_agent.procedures.hp_firmware import *
-from mercury_agent.procedures.inspector import *
-from mercury_agent.procedures.megaraid import *
-from mercury_agent.procedures.misc import *
-from mercury_agent.procedures.press_native import *
-from mercury_agent.procedures.raid import *
-from mercury_agent.procedures.erase import *
-from mercury_agent.procedures.stress import *
+"""
+Procedures are imported when one of their capabilities is first called.
+Importing them all pulls in press, lxml, requests, and every RAID and firmware
+interface, which is too slow for agent startup. Dependency callbacks, which
+are checked during registration, live in procedures.dependencies.
+"""
+
+from mercury_agent.capabilities import add_lazy_capabilities
+
+PROCEDURE_MODULES = [
+    'mercury_agent.procedures.dell_firmware',
+    'mercury_agent.procedures.hp_raid',
+    'mercury_agent.procedures.hp_firmware',
+    'mercury_agent.procedures.inspector',
+    'mercury_agent.procedures.megaraid',
+    'mercury_agent.procedures.misc',
+    'mercury_agent.procedures.press_native',
+    'mercury_agent.procedures.raid',
+    'mercury_agent.procedures.erase',
+    'mercury_agent.procedures.stress'
+]
+
+
+def load_capabilities():
+    """ Add the capabilities of every procedure module to
+    runtime_capabilities without importing them
+    """
+    add_lazy_capabilities(PROCEDURE_MODULES)
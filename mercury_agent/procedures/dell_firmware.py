@@ -23,8 +23,7 @@ from mercury.common.helpers import cli
 from mercury.common.exceptions import MercuryFirmwareException
 
 from mercury_agent.capabilities import capability
-from mercury_agent.hardware.platform_detection import is_dell
-from mercury_agent.inspector.inspect import global_device_info
+from mercury_agent.procedures.dependencies import vendor_is_dell
 from mercury_agent.procedures.lib import download_file
 
 log = logging.getLogger(__name__)
@@ -59,11 +58,6 @@ def xml_to_dict(xml_str, xml_element):
     return xml_element_dict
 
 
-def vendor_is_dell():
-    dmi_info = global_device_info.get('dmi')
-    return is_dell(dmi_info)
-
-
 def get_return_code_status(ret):
         # Return codes for DELL firmware updates.. supposedly for Linux
         ret_code = dict(
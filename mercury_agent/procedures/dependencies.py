@@ -0,0 +1,58 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Capability dependency callbacks
+
+Registration checks every capability's dependency callback. Procedure modules
+are imported lazily (see mercury_agent.procedures), so their callbacks live
+here and only consult driver probe and inspection results which are already
+loaded.
+"""
+
+from mercury_agent.hardware.drivers.drivers import (
+    driver_class_cache, get_subsystem_drivers)
+from mercury_agent.hardware.platform_detection import is_dell, is_hp
+from mercury_agent.inspector.inspect import global_device_info
+
+
+def has_abstraction_handler():
+    raid_drivers = get_subsystem_drivers('raid')
+    if not raid_drivers:
+        return False
+
+    # Loaded RAID drivers have already imported the abstraction
+    from mercury_agent.hardware.raid.abstraction.api import RAIDActions
+
+    for driver in raid_drivers:
+        if isinstance(driver.handler, RAIDActions):
+            return True
+    return False
+
+
+def has_hp_raid_driver():
+    return bool(driver_class_cache.get('hpssa'))
+
+
+def has_megaraid_driver():
+    return bool(driver_class_cache.get('megaraid_sas'))
+
+
+def vendor_is_dell():
+    return is_dell(global_device_info.get('dmi') or {})
+
+
+def vendor_is_hp():
+    return is_hp(global_device_info.get('dmi') or {})
@@ -5,7 +5,7 @@ import time
 from mercury.common.exceptions import MercuryCritical
 
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
+from mercury_agent import backend_client
 from mercury_agent.hardware.drivers.drivers import get_subsystem_drivers
 from mercury_agent.hardware.erase import os_level_erase as os_erase
 from mercury_agent.inspector.inspect import global_device_info
@@ -20,7 +20,6 @@ HARDWARE_ERASE_SUPPORTED = [
 
 
 def update_inventory():
-    backend_client = get_backend_client()
     raid_info = raid_inspector(global_device_info)
     os_storage_info = os_storage_inspector()
     mercury_id = global_device_info['mercury_id']
@@ -28,7 +27,7 @@ def update_inventory():
     log.debug('Configuration changed, updating inventory and cache')
     update = {'raid': raid_info, 'os_storage': os_storage_info}
     global_device_info.update(update)
-    backend_client.update(mercury_id, update)
+    backend_client.update_inventory(mercury_id, update)
 
 
 def get_raid_drivers():
@@ -65,10 +64,9 @@ def driver_start_erase(drivers, method):
 
 
 def _assemble_jbod(driver, adapter):
-    unassigned = driver.handler.get_unassigned(adapter)
-    for idx, drive in enumerate(unassigned):
-        log.info('Creating RAID 0 on %s disk %s', driver.name, idx)
-        driver.handler.create_logical_drive(adapter, level='0', drives=[idx])
+    log.info('Creating RAID 0 on each unassigned %s disk [adapter: %s]',
+             driver.name, adapter)
+    driver.handler.create_logical_drives(adapter, drives='unassigned')
 
 
 def driver_assemble_jbod(drivers):
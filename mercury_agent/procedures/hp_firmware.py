@@ -22,10 +22,9 @@ import lxml
 import requests
 
 from mercury_agent.capabilities import capability
-from mercury_agent.inspector.inspect import global_device_info
 from mercury.common.exceptions import HPFirmwareException
 from mercury.common.helpers import cli
-from mercury_agent.hardware.platform_detection import is_hp
+from mercury_agent.procedures.dependencies import vendor_is_hp
 
 log = logging.getLogger(__name__)
 
@@ -33,11 +32,6 @@ firmware_path = '/tmp/hp/firmware'
 sum_log_path = '/var/log/sum/*.raw'
 
 
-def vendor_is_hp():
-    dmi_info = global_device_info.get('dmi')
-    return is_hp(dmi_info)
-
-
 def _extract(tarball_path, extract_path):
     if not os.path.exists(extract_path):
         os.makedirs(extract_path)
@@ -21,12 +21,29 @@ from mercury_agent.inspector.inspectors import health
 
 
 @capability('inspector', description='Run inspector')
-def inspector():
+def inspector(full=False, inspectors=None, subsystems=None):
     """
-    Manually run inspectors
+    Manually run inspectors. Inspectors whose fingerprints have not changed
+    since the last run are reused unless full is True
+    :param full: Run every inspector
+    :param inspectors: Only run these inspectors, ie ['os_storage', 'raid'],
+        and the inspectors and driver probes they depend on
+    :param subsystems: Probe drivers of these types, ie ['raid']
     :return: results
     """
-    return inspect.inspect()
+    inspector_configuration = get_configuration().agent.inspector
+    device_info = inspect.inspect(
+        max_workers=inspector_configuration.max_workers,
+        timeout=inspector_configuration.timeout,
+        timeouts=inspector_configuration.timeouts,
+        incremental=not full,
+        only=inspectors,
+        subsystems=subsystems)
+
+    if inspector_configuration.cache_path:
+        inspect.save_cache(inspector_configuration.cache_path)
+
+    return device_info
 
 
 @capability('check_hardware', description='Check hardware for errors')
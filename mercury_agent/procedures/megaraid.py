@@ -16,10 +16,11 @@
 import logging
 
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
+from mercury_agent import backend_client
 from mercury_agent.hardware.drivers.drivers import driver_class_cache
 from mercury_agent.inspector.inspect import global_device_info
 from mercury_agent.inspector.inspectors.raid import raid_inspector
+from mercury_agent.procedures.dependencies import has_megaraid_driver
 
 
 log = logging.getLogger(__name__)
@@ -29,17 +30,12 @@ def get_megaraid_driver():
     return driver_class_cache.get('megaraid_sas')
 
 
-def has_megaraid_driver():
-    return bool(get_megaraid_driver())
-
-
 def update_inventory():
-    backend_client = get_backend_client()
     raid_info = raid_inspector(global_device_info)
     mercury_id = global_device_info['mercury_id']
 
     log.debug('RAID configuration changed, updating inventory')
-    backend_client.update(mercury_id, {'raid': raid_info})
+    backend_client.update_inventory(mercury_id, {'raid': raid_info})
 
 
 def update_on_change(f):
@@ -1,30 +1,21 @@
 import logging
 
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
+from mercury_agent import backend_client
 from mercury_agent.hardware.drivers.drivers import get_subsystem_drivers
-from mercury_agent.hardware.raid.abstraction.api import RAIDActions
 from mercury_agent.inspector.inspect import global_device_info
 from mercury_agent.inspector.inspectors.raid import raid_inspector
+from mercury_agent.procedures.dependencies import has_abstraction_handler
 
 log = logging.getLogger(__name__)
 
 
-def has_abstraction_handler():
-    raid_drivers = get_subsystem_drivers('raid')
-    for driver in raid_drivers:
-        if isinstance(driver.handler, RAIDActions):
-            return True
-    return False
-
-
 def update_inventory():
-    backend_client = get_backend_client()
     raid_info = raid_inspector(global_device_info)
     mercury_id = global_device_info['mercury_id']
 
     log.debug('RAID configuration changed, updating inventory')
-    backend_client.update(mercury_id, {'raid': raid_info})
+    backend_client.update_inventory(mercury_id, {'raid': raid_info})
 
 
 def update_on_change(f):
@@ -82,6 +73,31 @@ def abstract_create_logical_drive(adapter, level, drives=None, size=None, array=
     return raid_driver.handler.create_logical_drive(adapter, level, drives, size, array)
 
 
+@capability('create_logical_drives',
+            description='Creates a RAID 0 logical drive on each of the selected '
+                        'drives',
+            kwarg_names=['adapter'],
+            serial=True,
+            dependency_callback=has_abstraction_handler,
+            timeout=300
+            )
+@update_on_change
+def abstract_create_logical_drives(adapter, drives='unassigned'):
+    """
+    :param adapter: Target adapter
+    :type adapter: int
+    :param drives: A drive selection, see create_logical_drive. By default, every
+        unassigned drive
+    :return:
+    """
+    log.info('Creating single drive arrays on adapter {}: drives={}'.format(
+        adapter, drives))
+
+    raid_driver = get_subsystem_drivers('raid')[0]
+
+    return raid_driver.handler.create_logical_drives(adapter, drives)
+
+
 @capability('delete_logical_drive',
             description='Delete the specified logical drive',
             kwarg_names=['adapter', 'array', 'logical_drive'],
@@ -13,11 +13,16 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import ipaddress
 import logging
+import socket
 import time
 
+from urllib.parse import urlsplit
+
 from mercury_agent.configuration import get_configuration
 from mercury.common.exceptions import MercuryCritical, MercuryConfigurationError
+from mercury_agent.inspector.hwlib.route_table import RouteTable, UNREACHABLE_TYPES, route_next_hop
 from mercury_agent.inspector.inspectors.interfaces import get_interface_by_name
 from mercury_agent.inspector.inspectors.routes import find_default_route
 
@@ -40,6 +45,7 @@ def get_dhcp_ip(device_info, method='simple'):
                     carries the agent and inspector codes contains a script that is called during udhcpc operation.
                     This script will configured the interface as normal. In addition the script will write a file,
                     mercury_dhcp_info.sh, containing DHCP options recieved from the server (including the dhcp_ip).
+                    routing_table - The source address of the route used to reach the backend host
     :return: ip address
     """
     override_ip = get_configuration()['agent']['local_ip']
@@ -56,7 +62,7 @@ def get_dhcp_ip(device_info, method='simple'):
             return default_route['src']
 
         # If the route does not contain a src definition, we take the first address on the 'default' dev
-        default_interface = get_interface_by_name(interfaces, default_route['dev']) or dict()
+        default_interface = get_interface_by_name(interfaces, route_next_hop(default_route)[0]) or dict()
         address_info = default_interface.get('address_info')
         if not address_info:
             raise MercuryCritical('Failed to determine dhcp address')
@@ -64,6 +70,84 @@ def get_dhcp_ip(device_info, method='simple'):
         log.debug('address_info: %s' % address_info)
         return address_info[0]['addr']
 
+    if method == 'routing_table':
+        backend_url = get_configuration()['agent']['remote']['backend_url']
+        host = urlsplit(backend_url).hostname
+        if not host:
+            raise MercuryConfigurationError('Could not find the backend host in {}'.format(backend_url))
+
+        table = RouteTable(device_info['routes'])
+        for address in _resolve(host):
+            address, interface = find_source_address(table, device_info['interfaces'], address)
+            if address:
+                log.info('Using %s on %s to reach %s', address, interface, host)
+                return address
+        raise MercuryCritical('No route to the backend host {}, cannot use routing_table method'.format(host))
+
+
+def _resolve(host):
+    """
+    :return: addresses of host, in getaddrinfo order
+    """
+    try:
+        infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise MercuryCritical('Could not resolve the backend host {}: {}'.format(host, e))
+    addresses = []
+    for info in infos:
+        address = info[4][0]
+        if address not in addresses:
+            addresses.append(address)
+    return addresses
+
+
+def _interface_addresses(interface, family):
+    """
+    :return: list of ipaddress.IPv4Interface or IPv6Interface, link local
+        IPv6 addresses last
+    """
+    key = 'address_info' if family == socket.AF_INET else 'address_info_v6'
+    addresses = []
+    for info in interface.get(key) or []:
+        address = info['addr'].split('%', 1)[0]
+        # netifaces style netmasks, 255.255.255.0 or ffff:ffff:ffff:ffff::/64
+        netmask = info.get('netmask', '').rsplit('/', 1)[-1]
+        try:
+            addresses.append(ipaddress.ip_interface('{}/{}'.format(address, netmask) if netmask else address))
+        except ValueError:
+            log.debug('Ignoring malformed address: %s', info)
+    return sorted(addresses, key=lambda a: a.is_link_local)
+
+
+def find_source_address(table, interfaces, destination):
+    """ Select the source address for connections to destination
+
+    :param table: RouteTable built from the routes inventory
+    :param interfaces: interfaces inventory
+    :param destination: IPv4 or IPv6 address
+    :return: (source address, interface name), (None, None) when there is no usable route
+    """
+    route = table.lookup(destination)
+    if not route or route.get('type') in UNREACHABLE_TYPES:
+        return None, None
+
+    dev, via = route_next_hop(route)
+    if route.get('src'):
+        return route['src'], dev
+
+    interface = get_interface_by_name(interfaces, dev) or dict()
+    family = ':' in destination and socket.AF_INET6 or socket.AF_INET
+    addresses = _interface_addresses(interface, family)
+    if not addresses:
+        return None, None
+
+    # Prefer an address on the network of the next hop
+    next_hop = ipaddress.ip_address(via or destination)
+    for address in addresses:
+        if next_hop in address.network:
+            return str(address.ip), dev
+    return str(addresses[0].ip), dev
+
 
 def _serialize_capabilities(capabilities):
     _d = {}
@@ -0,0 +1,60 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+python -m tests.benchmarks [--update-baseline] [name ...]
+"""
+
+import argparse
+import sys
+
+from tests.benchmarks import harness
+from tests.benchmarks.benchmarks import BENCHMARKS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run parser benchmarks')
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run, all by default. One of: '
+                             '{}'.format(', '.join(sorted(BENCHMARKS))))
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error('Unknown benchmarks: {}'.format(
+            ', '.join(sorted(unknown))))
+
+    baseline = harness.load_baseline()
+    results = {}
+    failed = False
+    for name in args.names or sorted(BENCHMARKS):
+        with BENCHMARKS[name]() as f:
+            results[name] = harness.measure(f)
+        print(harness.format_result(name, results[name], baseline.get(name)))
+        for regression in harness.regressions(results[name],
+                                              baseline.get(name)):
+            failed = True
+            print('  REGRESSION: {}'.format(regression))
+
+    if args.update_baseline:
+        harness.save_baseline(results)
+        print('Baseline updated: {}'.format(harness.BASELINE_PATH))
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
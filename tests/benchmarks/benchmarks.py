@@ -0,0 +1,275 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Parser benchmarks. Each benchmark is a context manager which patches the
+command or file the parser reads with a fixture and yields the callable to
+measure. Nothing is executed on the host.
+"""
+
+import contextlib
+import json
+import shutil
+import tempfile
+
+import mock
+
+from mercury.common.helpers.cli import CLIResult
+
+from mercury_agent.hardware.drivers.megaraid import MegaRAIDActions
+from mercury_agent.hardware.oem.dell import om_xml_deserializer
+from mercury_agent.hardware.oem.hp import hpasmcli
+from mercury_agent.hardware.raid.interfaces.megaraid import storcli
+from mercury_agent.inspector.hwlib import (
+    biosdevname, cpuinfo, iproute2, lspci, meminfo, partition_table,
+    pci_sysfs, pciids, rtnetlink)
+from mercury_agent.inspector.hwlib.route_table import RouteTable
+
+from tests.benchmarks import fixtures
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def wrap(f):
+        BENCHMARKS[name] = contextlib.contextmanager(f)
+        return f
+    return wrap
+
+
+@benchmark('lspci_nnvmmk')
+def bench_lspci():
+    with mock.patch.object(lspci, 'lspci_run',
+                           return_value=fixtures.lspci_nnvmmk()):
+        yield lspci.parse_nnvmmk
+
+
+@benchmark('pci_sysfs')
+def bench_pci_sysfs():
+    root = tempfile.mkdtemp()
+    try:
+        devices, path = fixtures.pci_sysfs(root)
+        ids = pciids.PCIIds(path)
+        try:
+            yield lambda: pci_sysfs.enumerate_devices(devices, ids)
+        finally:
+            ids.close()
+    finally:
+        shutil.rmtree(root)
+
+
+@benchmark('cpuinfo_448')
+def bench_cpuinfo():
+    data = fixtures.proc_cpuinfo()
+    with mock.patch.object(cpuinfo.os.path, 'exists', return_value=True), \
+            mock.patch('builtins.open', mock.mock_open(read_data=data)):
+        yield cpuinfo.CPUInfo
+
+
+@benchmark('cpu_topology_448')
+def bench_cpu_topology():
+    root = tempfile.mkdtemp()
+    try:
+        paths = fixtures.cpu_sysfs(root)
+        yield lambda: cpuinfo.CPUTopology(*paths)
+    finally:
+        shutil.rmtree(root)
+
+
+@benchmark('cpufreq_sample_448')
+def bench_cpufreq_sample():
+    root = tempfile.mkdtemp()
+    try:
+        topology = cpuinfo.CPUTopology(*fixtures.cpu_sysfs(root))
+        cpuinfo.raise_open_file_limit(
+            len(topology.cpus) * len(cpuinfo.CPUFREQ_ATTRIBUTES))
+        sampler = cpuinfo.CPUFrequencySampler(topology)
+
+        def sample():
+            sampler.refresh()
+            return sampler.package_vectors(), sampler.core_vectors()
+
+        try:
+            yield sample
+        finally:
+            sampler.close()
+    finally:
+        shutil.rmtree(root)
+
+
+@benchmark('meminfo')
+def bench_meminfo():
+    data = fixtures.proc_meminfo()
+    with mock.patch('builtins.open', mock.mock_open(read_data=data)):
+        yield meminfo.parse_meminfo
+
+
+@benchmark('ip_route_10k')
+def bench_ip_route():
+    with mock.patch.object(iproute2.cli, 'find_in_path',
+                           return_value='/sbin/ip'), \
+            mock.patch.object(iproute2.IPRoute2, 'get_table',
+                              return_value=fixtures.ip_route()):
+        yield iproute2.IPRoute2
+
+
+@benchmark('rtnetlink_10k')
+def bench_rtnetlink():
+    buffers = fixtures.rtnetlink_dump()
+
+    def route_table():
+        return rtnetlink.NetlinkSnapshot.from_messages(buffers).route_table()
+
+    yield route_table
+
+
+@benchmark('biosdevname_148')
+def bench_biosdevname():
+    """ 4 embedded ports, 4 quad port cards, and 8 VFs per slot port """
+    root = tempfile.mkdtemp()
+    try:
+        tables, net = fixtures.net_sysfs(root)
+
+        def get_names():
+            locations = biosdevname.PCILocations.from_sysfs(tables)
+            return biosdevname.resolve_names(locations, path=net)
+
+        yield get_names
+    finally:
+        shutil.rmtree(root)
+
+
+@benchmark('partition_table_60')
+def bench_partition_table():
+    """ Native labels of a 60 drive GPT JBOD """
+    root = tempfile.mkdtemp()
+    try:
+        sysfs, images = fixtures.gpt_disks(root)
+
+        def read_labels():
+            return [partition_table.read_device_info(image, sysfs)
+                    for image in images]
+
+        yield read_labels
+    finally:
+        shutil.rmtree(root)
+
+
+@benchmark('route_lookup_10k')
+def bench_route_lookup():
+    """ 1000 lookups in a 10k route table """
+    routes = rtnetlink.NetlinkSnapshot.from_messages(
+        fixtures.rtnetlink_dump()).route_table()
+    table = RouteTable(routes)
+    addresses = ['172.{}.{}.{}'.format(16 + idx % 20, idx % 256, idx % 200)
+                 for idx in range(1000)]
+
+    def lookup():
+        for address in addresses:
+            table.lookup(address)
+
+    yield lookup
+
+
+@benchmark('storcli_8x240')
+def bench_storcli():
+    show_all, dall = fixtures.storcli()
+
+    def run(cmd, ignore_error=False):
+        if cmd.startswith('/call show all'):
+            return CLIResult(show_all, '', 0)
+        controller = int(cmd.split('/')[1][1:])
+        return CLIResult(dall[controller], '', 0)
+
+    class Actions(MegaRAIDActions):
+        def __init__(self):
+            super(MegaRAIDActions, self).__init__()
+            self.storcli = s
+
+    with mock.patch.object(storcli.cli, 'find_in_path',
+                           return_value='/opt/storcli64'):
+        s = storcli.Storcli()
+    s.run = run
+
+    def inventory():
+        actions = Actions()
+        return [actions.transform_adapter_info(idx)
+                for idx in range(len(s.controllers))]
+
+    yield inventory
+
+
+@benchmark('raid_selection_8x240')
+def bench_raid_selection():
+    """ The adapter reads and drive selections of a create_logical_drive call
+    on every controller, served from one bulk snapshot
+    """
+    show_all, dall = fixtures.storcli()
+    dall_all = json.dumps({'Controllers': [
+        controller for idx in sorted(dall)
+        for controller in json.loads(dall[idx])['Controllers']]})
+
+    def run(cmd, ignore_error=False):
+        if cmd.startswith('/call show all'):
+            return CLIResult(show_all, '', 0)
+        return CLIResult(dall_all, '', 0)
+
+    class Actions(MegaRAIDActions):
+        def __init__(self):
+            super(MegaRAIDActions, self).__init__()
+            self.storcli = s
+
+    with mock.patch.object(storcli.cli, 'find_in_path',
+                           return_value='/opt/storcli64'):
+        s = storcli.Storcli()
+    s.run = run
+
+    def operation():
+        actions = Actions()
+        for idx in range(len(dall)):
+            actions.get_adapter_info(idx)
+            actions.get_drives_from_selection(idx, 'unassigned')
+            actions.get_all_drives(idx)
+        return actions
+
+    yield operation
+
+
+@benchmark('hpasmcli')
+def bench_hpasmcli():
+    outputs = {
+        'SHOW SERVER': fixtures.hpasmcli_show_server(),
+        'SHOW DIMM': fixtures.hpasmcli_show_dimm()
+    }
+
+    with mock.patch.object(hpasmcli.cli, 'find_in_path',
+                           return_value='/sbin/hpasmcli'):
+        hpasm = hpasmcli.HPASMCLI()
+    hpasm.hpasm_run = lambda command: CLIResult(outputs[command], '', 0)
+
+    def inspect():
+        return hpasm.show_server(), hpasm.show_dimm()
+
+    yield inspect
+
+
+@benchmark('omreport_pdisk_240')
+def bench_omreport():
+    data = fixtures.omreport_pdisk()
+
+    def pdisk():
+        return om_xml_deserializer.XMLPDisk(
+            om_xml_deserializer.XLoader(data).root)
+
+    yield pdisk
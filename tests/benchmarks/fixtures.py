@@ -0,0 +1,553 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Recorded command output, synthetically scaled to the size of large hosts.
+
+Recordings live in tests/benchmarks/resources and tests/unit/resources. The
+generators are deterministic so that runs are comparable with the stored
+baseline.
+"""
+
+import copy
+import json
+import os
+import re
+import socket
+import struct
+import zlib
+
+HERE = os.path.dirname(__file__)
+UNIT_RESOURCES = os.path.join(HERE, '..', 'unit', 'resources')
+DELL_RESOURCES = os.path.join(HERE, '..', 'unit', 'hardware', 'oem', 'dell',
+                              'resources')
+
+
+def read_resource(filename, directory=None, mode='r'):
+    with open(os.path.join(directory or os.path.join(HERE, 'resources'),
+                           filename), mode) as fp:
+        return fp.read()
+
+
+def _load_json(filename):
+    return json.loads(read_resource(filename, UNIT_RESOURCES))
+
+
+def lspci_nnvmmk(scale=4):
+    """ lspci -nnvmmk output of the recorded 198 device HP host, repeated on
+    additional PCI domains
+
+    :param scale: number of copies of the recorded bus
+    :return: str
+    """
+    devices = _load_json('pci_data.json')
+    blocks = []
+    for domain in range(scale):
+        for device in devices:
+            lines = ['Slot:\t{:04x}:{}'.format(domain, device['slot']),
+                     'Class:\t{} [{}]'.format(device['class_name'],
+                                              device['class_id']),
+                     'Vendor:\t{} [{}]'.format(device['vendor_name'],
+                                               device['vendor_id']),
+                     'Device:\t{} [{}]'.format(device['device_name'],
+                                               device['device_id'])]
+            if 'svendor_id' in device:
+                lines.append('SVendor:\t{} [{}]'.format(
+                    device['svendor_name'], device['svendor_id']))
+                lines.append('SDevice:\t{} [{}]'.format(
+                    device['sdevice_name'], device['sdevice_id']))
+            if 'revision' in device:
+                lines.append('Rev:\t{}'.format(device['revision']))
+            if 'progif' in device:
+                lines.append('ProgIf:\t{}'.format(device['progif']))
+            if 'driver' in device:
+                lines.append('Driver:\t{}'.format(device['driver']))
+                lines.append('Module:\t{}'.format(device['driver']))
+            blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks) + '\n\n'
+
+
+def pci_sysfs(root, scale=4):
+    """ A /sys/bus/pci/devices tree and a pci.ids database for the devices
+    generated by lspci_nnvmmk
+
+    :param root: empty directory to populate
+    :return: (devices directory, pci.ids path)
+    """
+    devices = _load_json('pci_data.json')
+    sysfs = os.path.join(root, 'devices')
+
+    vendors, classes = {}, {}
+    for device in devices:
+        vendors.setdefault(device['vendor_id'], (device['vendor_name'], {}))
+        vendors[device['vendor_id']][1][device['device_id']] = \
+            device['device_name']
+        if 'svendor_id' in device:
+            vendors.setdefault(device['svendor_id'],
+                               (device['svendor_name'], {}))
+        classes[device['class_id']] = device['class_name']
+
+    for domain in range(scale):
+        for device in devices:
+            path = os.path.join(sysfs, '{:04x}:{}'.format(domain,
+                                                          device['slot']))
+            os.makedirs(path)
+            attributes = {
+                'class': '0x{}{}'.format(device['class_id'],
+                                         device.get('progif', '00')),
+                'vendor': '0x' + device['vendor_id'],
+                'device': '0x' + device['device_id'],
+                'subsystem_vendor': '0x' + device.get('svendor_id', '0000'),
+                'subsystem_device': '0x' + device.get('sdevice_id', '0000'),
+                'revision': '0x' + device.get('revision', '00')
+            }
+            for name, value in attributes.items():
+                with open(os.path.join(path, name), 'w') as fp:
+                    fp.write(value + '\n')
+            if 'driver' in device:
+                os.symlink('../../../bus/pci/drivers/' + device['driver'],
+                           os.path.join(path, 'driver'))
+
+    lines = []
+    for vendor_id, (name, vendor_devices) in sorted(vendors.items()):
+        lines.append('{}  {}'.format(vendor_id, name))
+        for device_id, device_name in sorted(vendor_devices.items()):
+            lines.append('\t{}  {}'.format(device_id, device_name))
+    for class_id, name in sorted(classes.items()):
+        lines.append('C {}  Class {}'.format(class_id[:2], class_id[:2]))
+        lines.append('\t{}  {}'.format(class_id[2:], name))
+
+    ids = os.path.join(root, 'pci.ids')
+    with open(ids, 'w') as fp:
+        fp.write('\n'.join(lines) + '\n')
+
+    return sysfs, ids
+
+
+def proc_cpuinfo(sockets=8, cores=28, threads_per_core=2):
+    """ /proc/cpuinfo for an 8 socket, 28 core, hyper-threaded host (448
+    logical processors)
+    """
+    template = read_resource('cpuinfo_processor.txt')
+    blocks = []
+    processor = 0
+    for thread in range(threads_per_core):
+        for socket in range(sockets):
+            for core in range(cores):
+                apicid = (socket << 7) | (core << 1) | thread
+                block = template
+                for key, value in (('processor', processor),
+                                   ('physical id', socket),
+                                   ('siblings', cores * threads_per_core),
+                                   ('core id', core),
+                                   ('cpu cores', cores),
+                                   ('apicid', apicid),
+                                   ('initial apicid', apicid)):
+                    block = re.sub(r'(?m)^{}\t*: .*$'.format(key),
+                                   '{}\t: {}'.format(key, value), block)
+                blocks.append(block)
+                processor += 1
+    return '\n'.join(blocks) + '\n'
+
+
+def cpu_sysfs(root, sockets=8, cores=28, threads_per_core=2):
+    """ /sys/devices/system/cpu and /sys/devices/system/node trees matching
+    proc_cpuinfo, one NUMA node per socket, with a cpufreq policy for every
+    processor
+
+    :param root: empty directory to populate
+    :return: (cpu directory, node directory, cpuinfo path)
+    """
+    cpu_path = os.path.join(root, 'cpu')
+    node_path = os.path.join(root, 'node')
+    logical = sockets * cores
+
+    for thread in range(threads_per_core):
+        for socket in range(sockets):
+            for core in range(cores):
+                processor = thread * logical + socket * cores + core
+                siblings = ','.join(
+                    str(t * logical + socket * cores + core)
+                    for t in range(threads_per_core))
+                path = os.path.join(cpu_path, 'cpu{}'.format(processor),
+                                    'topology')
+                os.makedirs(path)
+                for name, value in (('physical_package_id', socket),
+                                    ('die_id', 0),
+                                    ('core_id', core),
+                                    ('thread_siblings_list', siblings)):
+                    with open(os.path.join(path, name), 'w') as fp:
+                        fp.write('{}\n'.format(value))
+                path = os.path.join(cpu_path, 'cpu{}'.format(processor),
+                                    'cpufreq')
+                os.makedirs(path)
+                for name, value in (('scaling_cur_freq', 2400000 + core),
+                                    ('scaling_min_freq', 1200000),
+                                    ('scaling_max_freq', 3600000)):
+                    with open(os.path.join(path, name), 'w') as fp:
+                        fp.write('{}\n'.format(value))
+
+    for socket in range(sockets):
+        path = os.path.join(node_path, 'node{}'.format(socket))
+        os.makedirs(path)
+        with open(os.path.join(path, 'cpulist'), 'w') as fp:
+            fp.write(','.join(
+                '{}-{}'.format(t * logical + socket * cores,
+                               t * logical + (socket + 1) * cores - 1)
+                for t in range(threads_per_core)) + '\n')
+
+    cpuinfo_path = os.path.join(root, 'cpuinfo')
+    with open(cpuinfo_path, 'w') as fp:
+        fp.write(proc_cpuinfo(sockets, cores, threads_per_core))
+
+    return cpu_path, node_path, cpuinfo_path
+
+
+def proc_meminfo():
+    return read_resource('meminfo.txt')
+
+
+def ip_route(routes=10000):
+    """ ip route show output with a default route, connected networks and
+    many static routes
+    """
+    lines = ['default via 10.0.0.1 dev bond0 proto static metric 100']
+    for vlan in range(16):
+        lines.append('10.{0}.0.0/16 dev bond0.{0} proto kernel scope link '
+                     'src 10.{0}.0.10 metric 100'.format(vlan + 1))
+    for idx in range(routes - len(lines)):
+        lines.append('172.{}.{}.0/24 via 10.{}.0.1 dev bond0.{} proto '
+                     'static metric 200'.format(16 + idx // 256 % 16,
+                                                idx % 256, idx % 16 + 1,
+                                                idx % 16 + 1))
+    lines.append('192.168.122.0/24 dev virbr0 proto kernel scope link '
+                 'src 192.168.122.1 linkdown')
+    return '\n'.join(lines) + '\n'
+
+
+def _rtattr(rta_type, value):
+    length = 4 + len(value)
+    return struct.pack('=HH', length, rta_type) + value + \
+        b'\0' * ((4 - length % 4) % 4)
+
+
+def _route_message(seq, dst, dst_len, oif, gateway=None, prefsrc=None,
+                   protocol=4, scope=0, priority=None):
+    attributes = _rtattr(15, struct.pack('=I', 254))
+    if dst_len:
+        attributes += _rtattr(1, socket.inet_aton(dst))
+    if priority is not None:
+        attributes += _rtattr(6, struct.pack('=I', priority))
+    if prefsrc:
+        attributes += _rtattr(7, socket.inet_aton(prefsrc))
+    if gateway:
+        attributes += _rtattr(5, socket.inet_aton(gateway))
+    attributes += _rtattr(4, struct.pack('=I', oif))
+    payload = struct.pack('=BBBBBBBBI', socket.AF_INET, dst_len, 0, 0, 254,
+                          protocol, scope, 1, 0) + attributes
+    return struct.pack('=IHHII', 16 + len(payload), 24, 2, seq, 0) + payload
+
+
+def rtnetlink_dump(routes=10000):
+    """ rtnetlink replies describing the same routes as ip_route. Links and
+    addresses are those of the captured unit test dump, bond0.<vlan> is
+    interface <vlan>
+    """
+    captured = read_resource('rtnetlink_dump.bin', UNIT_RESOURCES, 'rb')
+    # The captured route dump is replaced
+    link_and_address = []
+    offset = 0
+    while offset < len(captured):
+        length, msg_type, _, seq, _ = struct.unpack_from('=IHHII', captured,
+                                                         offset)
+        if seq < 3:
+            link_and_address.append(captured[offset:offset + length])
+        offset += (length + 3) & ~3
+
+    messages = [_route_message(3, '0.0.0.0', 0, 1, gateway='10.0.0.1',
+                               priority=100)]
+    for vlan in range(16):
+        messages.append(_route_message(
+            3, '10.{}.0.0'.format(vlan + 1), 16, vlan + 1,
+            prefsrc='10.{}.0.10'.format(vlan + 1), protocol=2, scope=253,
+            priority=100))
+    for idx in range(routes - len(messages)):
+        messages.append(_route_message(
+            3, '172.{}.{}.0'.format(16 + idx // 256 % 16, idx % 256), 24,
+            idx % 16 + 1, gateway='10.{}.0.1'.format(idx % 16 + 1),
+            priority=200))
+    messages.append(struct.pack('=IHHIIi', 20, 3, 2, 3, 0, 0))
+
+    # Replies arrive in buffers of up to 64k
+    buffers = [b''.join(link_and_address)]
+    current = b''
+    for message in messages:
+        if len(current) + len(message) > 1 << 16:
+            buffers.append(current)
+            current = b''
+        current += message
+    buffers.append(current)
+    return buffers
+
+
+
+def _smbios_structure(structure_type, body, strings=()):
+    data = struct.pack('<BBH', structure_type, 4 + len(body),
+                       0x100 + structure_type) + body
+    if not strings:
+        return data + b'\0\0'
+    return data + b''.join(s.encode() + b'\0' for s in strings) + b'\0'
+
+
+def smbios_tables(root, embedded=(), slots=()):
+    """ smbios_entry_point and DMI for a SMBIOS 3.0 system
+
+    :param embedded: (instance, bus, devfn) onboard devices
+    :param slots: (slot, bus, devfn) system slots
+    :return: tables directory
+    """
+    path = os.path.join(root, 'tables')
+    os.makedirs(path)
+    table = b''
+    for instance, bus, devfn in embedded:
+        table += _smbios_structure(41, struct.pack(
+            '<BBBHBB', 1, 0x85, instance, 0, bus, devfn),
+            ['Embedded NIC {}'.format(instance)])
+    for slot, bus, devfn in slots:
+        table += _smbios_structure(9, struct.pack(
+            '<BBBBBHBBHBB', 1, 0xb6, 0x0d, 0x04, 0x04, slot, 0x04, 0x03, 0,
+            bus, devfn), ['PCIe Slot {}'.format(slot)])
+    table += _smbios_structure(127, b'')
+    with open(os.path.join(path, 'smbios_entry_point'), 'wb') as fp:
+        fp.write(b'_SM3_' + bytes([0, 0x18, 3, 0, 0]))
+    with open(os.path.join(path, 'DMI'), 'wb') as fp:
+        fp.write(table)
+    return path
+
+
+def net_sysfs(root, embedded=4, slots=4, ports=4, vfs=8):
+    """ /sys/class/net for a host with embedded ports on bus 1 and multi-port
+    cards in slots behind root ports 00:02.0, 00:03.0, ... Every slot port
+    has vfs virtual functions with a netdev each
+
+    :return: (tables directory, net directory)
+    """
+    devices = os.path.join(root, 'devices', 'pci0000:00')
+    net = os.path.join(root, 'net')
+    os.makedirs(net)
+
+    def add_netdev(name, device, dev_port=0):
+        path = os.path.join(devices, device)
+        os.makedirs(path)
+        os.makedirs(os.path.join(net, name))
+        os.symlink(path, os.path.join(net, name, 'device'))
+        with open(os.path.join(net, name, 'dev_port'), 'w') as fp:
+            fp.write('{}\n'.format(dev_port))
+        return path
+
+    for port in range(embedded):
+        add_netdev('eno{}'.format(port + 1),
+                   '0000:00:01.0/0000:01:00.{}'.format(port))
+
+    index = 0
+    for slot in range(slots):
+        bus = 0x10 + slot
+        for port in range(ports):
+            pf = add_netdev(
+                'ens{}f{}'.format(slot + 2, port),
+                '0000:00:{:02x}.0/0000:{:02x}:00.{}'.format(
+                    slot + 2, bus, port))
+            for vf in range(vfs):
+                path = add_netdev(
+                    'eth{}'.format(index),
+                    '0000:00:{:02x}.0/0000:{:02x}:{:02x}.{}'.format(
+                        slot + 2, bus, 0x10 + port, vf))
+                os.symlink(path, os.path.join(pf, 'virtfn{}'.format(vf)))
+                os.symlink(pf, os.path.join(path, 'physfn'))
+                index += 1
+
+    tables = smbios_tables(
+        root, [(port + 1, 1, port) for port in range(embedded)],
+        [(slot + 1, 0, (slot + 2) << 3) for slot in range(slots)])
+    return tables, net
+
+
+
+def gpt_disks(root, disks=60, partitions=4, sectors=1 << 31):
+    """ Images holding the first 34 sectors of GPT labelled disks with
+    /sys/class/block attributes, as a 60 drive JBOD chassis would have
+
+    :return: (sysfs block directory, [disk image, ...])
+    """
+    sysfs = os.path.join(root, 'sys')
+    images = []
+    step = (sectors - 4096) // partitions
+    for disk in range(disks):
+        name = 'sd' + chr(ord('a') + disk // 26) + chr(ord('a') + disk % 26)
+        entries = b''.join(
+            struct.pack('<16s16sQQQ72s', b'\xaf=\xc6\x0f\x83\x84rG\x8ey=i'
+                        b'\xd8G}\xe4', struct.pack('>QQ', disk, index),
+                        2048 + index * step, 2048 + (index + 1) * step - 1,
+                        0, 'data{}'.format(index).encode('utf-16-le'))
+            for index in range(partitions)).ljust(128 * 128, b'\0')
+        header = struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92,
+                             0, 0, 1, sectors - 1, 34, sectors - 34,
+                             struct.pack('>QQ', disk, 0), 2, 128, 128,
+                             zlib.crc32(entries))
+        header = header[:16] + struct.pack('<I', zlib.crc32(header)) + \
+            header[20:]
+        mbr = bytearray(512)
+        struct.pack_into('<B3sB3sII', mbr, 446, 0, b'\0\0\x02', 0xee,
+                         b'\xff\xff\xff', 1, 0xffffffff)
+        mbr[510:512] = b'\x55\xaa'
+
+        image = os.path.join(root, name)
+        with open(image, 'wb') as fp:
+            fp.write((bytes(mbr) + header.ljust(512, b'\0') +
+                      entries).ljust(34 * 512, b'\0'))
+        images.append(image)
+
+        for path, attributes in (
+                ('', {'size': sectors}),
+                ('device', {'vendor': 'ATA', 'model': 'ST8000NM0055-1RM'}),
+                ('queue', {'logical_block_size': 512,
+                           'physical_block_size': 4096})):
+            path = os.path.join(sysfs, name, path)
+            os.makedirs(path, exist_ok=True)
+            for attribute, value in attributes.items():
+                with open(os.path.join(path, attribute), 'w') as fp:
+                    fp.write('{}\n'.format(value))
+    return sysfs, images
+
+
+def _storcli_drive(enclosure, slot, did, state, dg):
+    return {'EID:Slt': '{}:{}'.format(enclosure, slot), 'DID': did,
+            'State': state, 'DG': dg, 'Size': '1.090 TB', 'Intf': 'SAS',
+            'Med': 'HDD', 'SED': 'N', 'PI': 'N', 'SeSz': '512B',
+            'Model': 'ST1200MM0099    ', 'Sp': 'U'}
+
+
+def storcli(controllers=8, drives=240):
+    """ storcli /call show all J and /cN/dall show all J output
+
+    Each controller has RAID1 disk groups across most of its drives, a
+    dedicated and a global hot spare, and a few unconfigured drives.
+
+    :return: (show_all, {controller: dall_show}), json strings
+    """
+    show_all = json.loads(read_resource('storcli.json', UNIT_RESOURCES))
+    template = show_all['Controllers'][0]
+    dall_template = _load_json('storcli_dall_show.json')['Controllers'][0]
+    per_controller = drives // controllers
+
+    show_all['Controllers'] = []
+    dall = {}
+    for c in range(controllers):
+        controller = copy.deepcopy(template)
+        controller['Command Status']['Controller'] = c
+        basics = controller['Response Data']['Basics']
+        basics['Controller'] = c
+        basics['PCI Address'] = '00:{:02x}:00:00'.format(c + 3)
+
+        configured = per_controller - 6
+        topology, vds, dg_drives, unconfigured, free = [], [], [], [], []
+        for dg in range(configured // 2):
+            row = {'DG': dg, 'Arr': '-', 'Row': '-', 'EID:Slot': '-',
+                   'DID': '-', 'Type': 'RAID1', 'State': 'Optl', 'BT': 'N',
+                   'Size': '1.090 TB', 'PDC': 'dflt', 'PI': 'N', 'SED': 'N',
+                   'DS3': 'dflt', 'FSpace': 'N'}
+            topology.append(row)
+            topology.append(dict(row, Arr=0))
+            for member in range(2):
+                did = dg * 2 + member
+                topology.append(dict(row, Arr=0, Row=member,
+                                     **{'EID:Slot': '32:{}'.format(did),
+                                        'DID': did, 'Type': 'DRIVE',
+                                        'State': 'Onln', 'FSpace': '-'}))
+                dg_drives.append(_storcli_drive(32, did, did, 'Onln', dg))
+            vds.append({'DG/VD': '{0}/{0}'.format(dg), 'TYPE': 'RAID1',
+                        'State': 'Optl', 'Access': 'RW', 'Consist': 'Yes',
+                        'Cache': 'RWBD', 'Cac': '-', 'sCC': 'OFF',
+                        'Size': '1.090 TB',
+                        'Name': 'Virtual Disk{}'.format(dg)})
+        free.append({'ID': 0, 'DG': 0, 'AftrVD': 0, 'Size': '10.0 GB'})
+
+        for did in range(configured, per_controller):
+            if did == configured:
+                state, dg = 'DHS', '0'
+            elif did == configured + 1:
+                state, dg = 'GHS', '-'
+            else:
+                state, dg = 'UGood', '-'
+            unconfigured.append(_storcli_drive(32, did, did, state, dg))
+
+        controller['Response Data']['PD LIST'] = dg_drives + unconfigured
+        controller['Response Data']['Physical Drives'] = per_controller
+        show_all['Controllers'].append(controller)
+
+        dg_info = copy.deepcopy(dall_template)
+        dg_info['Command Status']['Controller'] = c
+        dg_info['Response Data']['Response Data'] = {
+            'TOPOLOGY': topology,
+            'VD LIST': vds,
+            'Total VD Count': len(vds),
+            'DG Drive LIST': dg_drives,
+            'Total Drive Count': len(dg_drives),
+            'UN-CONFIGURED DRIVE LIST': unconfigured,
+            'Unconfigured Drive Count': len(unconfigured),
+            'FREE SPACE DETAILS': free,
+            'Total Free Slots': len(free)
+        }
+        dall[c] = json.dumps({'Controllers': [dg_info]})
+
+    return json.dumps(show_all), dall
+
+
+def hpasmcli_show_server():
+    return read_resource('hpasmcli_show_server.txt')
+
+
+def hpasmcli_show_dimm(dimms=48):
+    """ SHOW DIMM for a two socket host with every slot populated """
+    recorded = read_resource('hpasmcli_show_dimm.txt')
+    header = '\n'.join(recorded.splitlines()[:3])
+    segment = recorded.split('\n\n')[1]
+    segments = []
+    for idx in range(dimms):
+        s = re.sub(r'(?m)^(Processor #:\s+)\d+$',
+                   r'\g<1>{}'.format(idx // (dimms // 2) + 1), segment)
+        s = re.sub(r'(?m)^(Module #:\s+)\d+$',
+                   r'\g<1>{}'.format(idx % (dimms // 2) + 1), s)
+        segments.append(s)
+    return header + '\n' + '\n\n'.join(segments) + '\n\n'
+
+
+def omreport_pdisk(disks=240):
+    """ omreport storage pdisk -fmt xml output
+
+    :return: bytes
+    """
+    recorded = read_resource('pdisk.xml', DELL_RESOURCES, 'rb')
+    start = recorded.index(b'<DCStorageObject>')
+    end = recorded.rindex(b'</DCStorageObject>') + len(b'</DCStorageObject>')
+    disk = recorded[start:recorded.index(b'</DCStorageObject>') +
+                    len(b'</DCStorageObject>')]
+    objects = []
+    for idx in range(disks):
+        obj = re.sub(b'<DeviceID type="u32">[^<]*<',
+                     '<DeviceID type="u32">{}<'.format(idx).encode(), disk)
+        objects.append(re.sub(b'<DeviceSerialNumber type="astring">[^<]*<',
+                              '<DeviceSerialNumber type="astring">'
+                              'PHDV{:014d}<'.format(idx).encode(), obj))
+    return recorded[:start] + b'\n'.join(objects) + recorded[end:]
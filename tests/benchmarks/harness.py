@@ -0,0 +1,126 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Measures throughput and peak memory and compares results with a stored
+baseline.
+
+Throughput is machine dependent. The stored baseline should be regenerated
+(python -m tests.benchmarks --update-baseline) on the machine that runs the
+suite; the tolerances absorb run to run noise, not hardware differences.
+"""
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A benchmark regresses when it is this much slower than the baseline
+THROUGHPUT_TOLERANCE = float(
+    os.environ.get('MERCURY_BENCH_THROUGHPUT_TOLERANCE', 0.5))
+
+# or uses this much more memory
+MEMORY_TOLERANCE = float(os.environ.get('MERCURY_BENCH_MEMORY_TOLERANCE',
+                                        0.25))
+
+MIN_TIME = float(os.environ.get('MERCURY_BENCH_MIN_TIME', 0.5))
+MIN_ROUNDS = 5
+
+
+def measure(f, min_time=MIN_TIME, min_rounds=MIN_ROUNDS):
+    """ Run f repeatedly
+
+    :param f: callable taking no arguments
+    :param min_time: minimum seconds to spend timing
+    :param min_rounds: minimum number of timed calls
+    :return: {'ops_per_sec': calls per second, using the median call time,
+        'peak_memory': peak bytes allocated during a single call,
+        'rounds': number of timed calls}
+    """
+    # Warm up caches and lazy imports before measuring memory
+    f()
+
+    tracemalloc.start()
+    try:
+        f()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_rounds or time.perf_counter() - started < min_time:
+        t = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t)
+
+    return {
+        'ops_per_sec': 1.0 / statistics.median(times),
+        'peak_memory': peak,
+        'rounds': len(times)
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (IOError, OSError):
+        return {}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = load_baseline(path)
+    for name, result in results.items():
+        baseline[name] = {'ops_per_sec': round(result['ops_per_sec'], 2),
+                          'peak_memory': result['peak_memory']}
+    with open(path, 'w') as fp:
+        json.dump(baseline, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+
+
+def regressions(result, baseline):
+    """
+    :param result: measure() result
+    :param baseline: baseline entry or None
+    :return: list of regression descriptions
+    """
+    if not baseline:
+        return []
+
+    found = []
+    minimum = baseline['ops_per_sec'] * (1 - THROUGHPUT_TOLERANCE)
+    if result['ops_per_sec'] < minimum:
+        found.append('{:.2f} ops/sec is below {:.2f} (baseline {:.2f})'.format(
+            result['ops_per_sec'], minimum, baseline['ops_per_sec']))
+
+    maximum = baseline['peak_memory'] * (1 + MEMORY_TOLERANCE)
+    if result['peak_memory'] > maximum:
+        found.append('peak memory {} exceeds {:.0f} (baseline {})'.format(
+            result['peak_memory'], maximum, baseline['peak_memory']))
+
+    return found
+
+
+def format_result(name, result, baseline=None):
+    line = '{:<24} {:>12.2f} ops/sec {:>12} bytes peak'.format(
+        name, result['ops_per_sec'], result['peak_memory'])
+    if baseline:
+        line += ' ({:+.1%} ops/sec, {:+.1%} memory)'.format(
+            result['ops_per_sec'] / baseline['ops_per_sec'] - 1,
+            result['peak_memory'] / max(baseline['peak_memory'], 1) - 1)
+    return line
@@ -0,0 +1,31 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Fails when a parser regresses against the stored baseline"""
+
+import pytest
+
+from tests.benchmarks import harness
+from tests.benchmarks.benchmarks import BENCHMARKS
+
+BASELINE = harness.load_baseline()
+
+
+@pytest.mark.parametrize('name', sorted(BENCHMARKS))
+def test_benchmark(name):
+    with BENCHMARKS[name]() as f:
+        result = harness.measure(f)
+
+    print(harness.format_result(name, result, BASELINE.get(name)))
+    assert not harness.regressions(result, BASELINE.get(name))
@@ -0,0 +1,158 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.hardware.general.mcelog"""
+
+import io
+import json
+
+import mock
+
+from mercury.common.exceptions import MercuryGeneralException
+
+from mercury_agent.hardware.general import mcelog
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def memory_event(cpu, bank, socket, channel, dimm):
+    return [
+        'Hardware event. This is not a software error.',
+        'MCE 0',
+        'CPU {} BANK {} TSC 2b0a4d2fa8'.format(cpu, bank),
+        'MISC 9014d0c0000086 ADDR 3f0a8cd040',
+        'TIME 1501234567 Fri Jul 28 09:36:07 2017',
+        'MCG status:',
+        'MCi status:',
+        'Corrected error',
+        'MCA: MEMORY CONTROLLER RD_CHANNEL{}_ERR'.format(channel),
+        'Transaction: Memory read error',
+        'Location: SOCKET:{} CHANNEL:{} DIMM:{} []'.format(socket, channel,
+                                                          dimm),
+        'STATUS 8c00004000010091 MCGSTATUS 0',
+        'MCGCAP 1000c14 APICID 4 SOCKETID {}'.format(socket),
+        'CPUID Vendor Intel Family 6 Model 63'
+    ]
+
+
+class FakeJournal(object):
+    """ Popen replacement serving journal entries after a cursor """
+    def __init__(self, messages):
+        self.entries = [{'__CURSOR': 's=1;i={:x}'.format(index),
+                         'MESSAGE': message}
+                        for index, message in enumerate(messages)]
+        self.commands = []
+        self.returncode = 0
+        self.stderr = b''
+
+    def append(self, messages):
+        for message in messages:
+            self.entries.append({
+                '__CURSOR': 's=1;i={:x}'.format(len(self.entries)),
+                'MESSAGE': message})
+
+    def __call__(self, command, **kwargs):
+        self.commands.append(command)
+        entries = self.entries
+        for argument in command:
+            if argument.startswith('--after-cursor='):
+                cursor = argument.split('=', 1)[1]
+                index = [e['__CURSOR'] for e in entries].index(cursor)
+                entries = entries[index + 1:]
+
+        p = mock.Mock()
+        p.returncode = self.returncode
+        p.stdout = io.BytesIO(b''.join(
+            json.dumps(entry).encode() + b'\n' for entry in entries))
+        # stderr must not be a pipe which is read after stdout
+        kwargs['stderr'].write(self.stderr)
+        return p
+
+
+class TestMCEEventCounter(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestMCEEventCounter, self).setUp()
+        self.journal = FakeJournal(
+            ['Started Machine Check Exception Logging Daemon.'] +
+            memory_event(2, 7, 0, 1, 0) + memory_event(14, 7, 1, 2, 1))
+        patch = mock.patch.object(mcelog.subprocess, 'Popen', self.journal)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.counter = mcelog.MCEEventCounter()
+
+    def test_buckets(self):
+        self.assertEqual(self.counter.update().total, 2)
+        self.assertEqual(self.counter.buckets(), {
+            'bank': {'7': 2},
+            'cpu': {'2': 1, '14': 1},
+            'dimm': {'SOCKET:0 CHANNEL:1 DIMM:0': 1,
+                     'SOCKET:1 CHANNEL:2 DIMM:1': 1}})
+
+    def test_incremental(self):
+        self.counter.update()
+        cursor = self.counter.cursor
+
+        # An event split across two updates
+        event = memory_event(2, 8, 0, 1, 0)
+        self.journal.append(event[:3])
+        self.assertEqual(self.counter.update().total, 3)
+        self.assertIn('--after-cursor={}'.format(cursor),
+                      self.journal.commands[-1])
+        self.journal.append(event[3:])
+        self.counter.update()
+        self.assertEqual(self.counter.buckets()['bank'], {'7': 2, '8': 1})
+        self.assertEqual(self.counter.dimms['SOCKET:0 CHANNEL:1 DIMM:0'], 2)
+
+        # Nothing new
+        self.assertEqual(self.counter.update().total, 3)
+        self.assertEqual(len(self.journal.commands), 4)
+
+    def test_binary_message(self):
+        self.journal.append([list(memory_event(1, 5, 0, 0, 0)[0].encode())])
+        self.assertEqual(self.counter.update().total, 3)
+
+    def test_invalid_cursor(self):
+        self.counter.update()
+        self.counter.cursor = 's=2;i=99'
+        self.journal.entries.append({'__CURSOR': 's=2;i=99'})
+
+        # journalctl fails to seek, everything is counted again
+        calls = []
+
+        def journalctl(command, **kwargs):
+            calls.append(command)
+            p = self.journal(command, **kwargs)
+            if any(a.startswith('--after-cursor') for a in command):
+                p.returncode = 1
+                p.stdout = io.BytesIO(b'')
+            return p
+
+        with mock.patch.object(mcelog.subprocess, 'Popen', journalctl):
+            self.assertEqual(self.counter.update().total, 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_error(self):
+        self.journal.returncode = 1
+        self.journal.stderr = b'Failed to open journal\n' * 8192
+        with mock.patch.object(mcelog, 'log') as log:
+            with self.assertRaises(MercuryGeneralException):
+                self.counter.update()
+        self.assertIn('Failed to open journal',
+                      log.error.call_args_list[0][0][2])
+        self.assertEqual(self.counter.total, 0)
+        self.assertIsNone(self.counter.cursor)
+
+    def test_count_logged_events(self):
+        with mock.patch.object(mcelog, 'get_counter',
+                               return_value=self.counter):
+            self.assertEqual(mcelog.count_logged_events(), 2)
@@ -0,0 +1,188 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.biosdevname"""
+
+import os
+import shutil
+import struct
+import tempfile
+
+import mock
+
+from mercury_agent.inspector.hwlib import biosdevname
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def structure(structure_type, body, *strings):
+    data = struct.pack('<BBH', structure_type, 4 + len(body), 0) + body
+    if not strings:
+        return data + b'\0\0'
+    return data + b''.join(s + b'\0' for s in strings) + b'\0'
+
+
+def onboard_device(instance, bus, devfn):
+    return structure(41, struct.pack('<BBBHBB', 1, 0x85, instance, 0, bus,
+                                     devfn), b'Embedded NIC')
+
+
+def system_slot(slot, bus, devfn):
+    return structure(9, struct.pack('<BBBBBHBBHBB', 1, 0xb6, 0x0d, 0x04, 0x04,
+                                    slot, 0x04, 0x03, 0, bus, devfn),
+                     b'PCIe Slot')
+
+
+TABLE = b''.join([
+    structure(0, b'\x01\x02\x00\xf0\x03\xff', b'Vendor', b'1.0.0'),
+    onboard_device(1, 0x01, 0x00),
+    onboard_device(2, 0x01, 0x01),
+    # Unknown location
+    onboard_device(3, 0xff, 0xff),
+    # The root port of slot 2 and a slot without a device
+    system_slot(2, 0x00, 0x03 << 3),
+    system_slot(3, 0xff, 0xff),
+    structure(127, b'')
+])
+
+
+class TestSMBIOS(MercuryAgentUnitTest):
+    def test_entry_point(self):
+        self.assertEqual(biosdevname.parse_entry_point(
+            b'_SM3_\x00\x18\x03\x02\x00'), (3, 2))
+        self.assertEqual(biosdevname.parse_entry_point(
+            b'_SM_\x00\x1f\x02\x08\x00'), (2, 8))
+        self.assertIsNone(biosdevname.parse_entry_point(b'_DMI_'))
+
+    def test_iter_structures(self):
+        self.assertEqual(
+            [t for t, _ in biosdevname.iter_structures(TABLE + TABLE)],
+            [0, 41, 41, 41, 9, 9, 127])
+
+    def test_locations(self):
+        locations = biosdevname.PCILocations.from_table(TABLE)
+        self.assertEqual(locations.embedded, {'0000:01:00.0': 1,
+                                              '0000:01:00.1': 2})
+        self.assertEqual(locations.slots, {'0000:00:03.0': 2})
+
+        self.assertEqual(locations.locate(['0000:00:01.0', '0000:01:00.1']),
+                         ('em', 2))
+        self.assertEqual(locations.locate(['0000:00:03.0', '0000:04:00.0',
+                                           '0000:05:00.1']), ('p', 2))
+        self.assertIsNone(locations.locate(['0000:00:1f.6']))
+
+
+class TestResolveNames(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestResolveNames, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.devices = os.path.join(self.root, 'devices', 'pci0000:00')
+        self.net = os.path.join(self.root, 'class', 'net')
+        os.makedirs(self.net)
+
+        self.add_interface('eno1', '0000:00:01.0/0000:01:00.0')
+        self.add_interface('eno2', '0000:00:01.0/0000:01:00.1')
+        # A dual port card behind a switch, the second function has two ports
+        self.add_interface('ens3f0', '0000:00:03.0/0000:04:00.0/0000:05:00.0')
+        self.add_interface('ens3f1', '0000:00:03.0/0000:04:00.0/0000:05:00.1')
+        self.add_interface('ens3f1d1',
+                           '0000:00:03.0/0000:04:00.0/0000:05:00.1', 1)
+        self.add_interface('eth0', '0000:00:03.0/0000:04:00.0/0000:05:02.1')
+        self.add_virtfn('0000:00:03.0/0000:04:00.0/0000:05:00.0', 1,
+                        '0000:00:03.0/0000:04:00.0/0000:05:02.1')
+        # Not in the SMBIOS tables, a USB adapter, and a virtual interface
+        self.add_interface('eno3', '0000:00:1f.6')
+        self.add_interface('usb0', '0000:00:14.0/usb1/1-1/1-1:1.0')
+        os.makedirs(os.path.join(self.net, 'bond0'))
+
+        self.locations = biosdevname.PCILocations.from_table(TABLE)
+
+    def add_interface(self, name, device, dev_port=0):
+        device = os.path.join(self.devices, device)
+        # sysfs links are relative
+        netdev = os.path.join(device, 'net', name)
+        os.makedirs(netdev)
+        os.symlink(os.path.relpath(netdev, self.net),
+                   os.path.join(self.net, name))
+        os.symlink('../..', os.path.join(netdev, 'device'))
+        with open(os.path.join(netdev, 'dev_port'), 'w') as fp:
+            fp.write('{}\n'.format(dev_port))
+
+    def add_virtfn(self, physfn, index, virtfn):
+        physfn = os.path.join(self.devices, physfn)
+        virtfn = os.path.join(self.devices, virtfn)
+        os.symlink(os.path.relpath(virtfn, physfn),
+                   os.path.join(physfn, 'virtfn{}'.format(index)))
+        os.symlink(os.path.relpath(physfn, virtfn),
+                   os.path.join(virtfn, 'physfn'))
+
+    def test_resolve_names(self):
+        self.assertEqual(
+            biosdevname.resolve_names(self.locations, path=self.net), {
+                'eno1': 'em1',
+                'eno2': 'em2',
+                'ens3f0': 'p2p1',
+                'ens3f1': 'p2p2',
+                'ens3f1d1': 'p2p3',
+                'eth0': 'p2p1_1'
+            })
+
+    def test_selected_interfaces(self):
+        self.assertEqual(
+            biosdevname.resolve_names(self.locations, ['eth0', 'eno3'],
+                                      path=self.net),
+            {'eth0': 'p2p1_1'})
+
+    def test_get_names(self):
+        with mock.patch.object(biosdevname, 'in_virtual_machine',
+                               return_value=False), \
+                mock.patch.object(biosdevname, 'get_pci_locations',
+                                  return_value=self.locations), \
+                mock.patch.object(biosdevname, 'SYSFS_NET', self.net), \
+                mock.patch.object(biosdevname, 'get_name') as get_name:
+            names = biosdevname.get_names(['eno1'])
+            self.assertFalse(get_name.called)
+        self.assertEqual(names, {'eno1': 'em1'})
+
+    def test_get_names_without_smbios(self):
+        with mock.patch.object(biosdevname, 'in_virtual_machine',
+                               return_value=False), \
+                mock.patch.object(biosdevname, 'get_pci_locations',
+                                  return_value=None), \
+                mock.patch.object(biosdevname, 'get_name',
+                                  side_effect=['em1', None]) as get_name:
+            self.assertEqual(biosdevname.get_names(['eno1', 'bond0']),
+                             {'eno1': 'em1'})
+        self.assertEqual(get_name.call_count, 2)
+
+    def test_virtual_machine(self):
+        with mock.patch.object(biosdevname, 'in_virtual_machine',
+                               return_value=True):
+            self.assertEqual(biosdevname.get_names(), {})
+
+    def test_from_sysfs(self):
+        path = os.path.join(self.root, 'tables')
+        os.makedirs(path)
+        self.assertIsNone(biosdevname.PCILocations.from_sysfs(path))
+
+        with open(os.path.join(path, 'DMI'), 'wb') as fp:
+            fp.write(TABLE)
+        with open(os.path.join(path, 'smbios_entry_point'), 'wb') as fp:
+            fp.write(b'_SM_\x00\x1f\x02\x05\x00')
+        self.assertIsNone(biosdevname.PCILocations.from_sysfs(path))
+
+        with open(os.path.join(path, 'smbios_entry_point'), 'wb') as fp:
+            fp.write(b'_SM3_\x00\x18\x03\x00\x00')
+        self.assertEqual(biosdevname.PCILocations.from_sysfs(path).slots,
+                         {'0000:00:03.0': 2})
@@ -14,6 +14,12 @@
 #    limitations under the License.
 """Module to unit test mercury_agent.inspector.hwlib.cpuinfo"""
 
+import errno
+import os
+import resource
+import shutil
+import tempfile
+
 import mock
 import pytest
 
@@ -509,3 +515,226 @@ class MercuryHwlibCpuinfoUnitTests(MercuryAgentUnitTest):
         assert speed_info[0]['current'] == 1268.115
         assert speed_info[0]['min'] == 1268.115
         assert speed_info[0]['max'] == 1268.115
+
+
+def make_cpu_sysfs(root, topology, nodes=None, offline=()):
+    """
+    :param topology: dictionary of processor: (package, core, siblings list)
+    :param nodes: dictionary of node: cpulist
+    :return: (cpu path, node path)
+    """
+    cpu_path = os.path.join(root, 'cpu')
+    node_path = os.path.join(root, 'node')
+    for processor, (package, core, siblings) in topology.items():
+        path = os.path.join(cpu_path, 'cpu{}'.format(processor), 'topology')
+        os.makedirs(path)
+        for name, value in (('physical_package_id', package),
+                            ('core_id', core),
+                            ('thread_siblings_list', siblings)):
+            with open(os.path.join(path, name), 'w') as fp:
+                fp.write('{}\n'.format(value))
+    for processor in offline:
+        os.makedirs(os.path.join(cpu_path, 'cpu{}'.format(processor)))
+    for node, cpulist in (nodes or {}).items():
+        path = os.path.join(node_path, 'node{}'.format(node))
+        os.makedirs(path)
+        with open(os.path.join(path, 'cpulist'), 'w') as fp:
+            fp.write(cpulist + '\n')
+    return cpu_path, node_path
+
+
+class MercuryHwlibCPUTopologyUnitTests(MercuryAgentUnitTest):
+    """Unit tests for mercury_agent.inspector.hwlib.cpuinfo.CPUTopology"""
+    def setUp(self):
+        super(MercuryHwlibCPUTopologyUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cpuinfo_path = os.path.join(self.root, 'cpuinfo')
+
+    def write_cpuinfo(self, data):
+        with open(self.cpuinfo_path, 'w') as fp:
+            fp.write(data)
+
+    def test_single_package(self):
+        """Test the 5820k from EXAMPLE_PROC_CPUINFO_OUTPUT"""
+        cpu_path, node_path = make_cpu_sysfs(
+            self.root,
+            dict((p, (0, p % 6, '{},{}'.format(p % 6, p % 6 + 6)))
+                 for p in range(12)),
+            nodes={0: '0-11'},
+            offline=[12])
+        self.write_cpuinfo(EXAMPLE_PROC_CPUINFO_OUTPUT)
+
+        topology = cpuinfo.CPUTopology(cpu_path, node_path,
+                                       self.cpuinfo_path)
+
+        assert topology.physical_processor_count == 1
+        assert topology.logical_core_count == 12
+        assert topology.total_physical_core_count == 6
+        assert topology.get_siblings(7) == [1, 7]
+
+        package = topology.get_package(0)
+        assert package.core_count == 6
+        assert package.thread_count == 12
+        assert package.dies == {0}
+        assert package.nodes == {0}
+        assert [cpu.processor for cpu in package.cores[(0, 1)]] == [1, 7]
+        assert package.info['processor'] == 0
+        assert package.info['model_name'] == \
+            'Intel(R) Core(TM) i7-5820K CPU @ 3.30GHz'
+        assert package.info['cpu_mhz'] == '1268.115'
+        assert 'avx2' in package.flags
+        assert 'flags' not in package.info
+
+    def test_packages_share_flags(self):
+        """Test that /proc/cpuinfo is read for one processor per package"""
+        cpu_path, node_path = make_cpu_sysfs(
+            self.root,
+            {0: (0, 0, '0,2'), 1: (1, 0, '1,3'),
+             2: (0, 0, '0,2'), 3: (1, 0, '1,3')},
+            nodes={0: '0,2', 1: '1,3'})
+        blocks = EXAMPLE_PROC_CPUINFO_OUTPUT.split('\n\n')
+        # Processor 2 and 3 are never parsed
+        self.write_cpuinfo('\n\n'.join(blocks[:2]) + '\n\nprocessor\t: 2\n'
+                           'garbage without a separator\n')
+
+        topology = cpuinfo.CPUTopology(cpu_path, node_path,
+                                       self.cpuinfo_path)
+
+        assert sorted(topology.packages) == [0, 1]
+        assert topology.get_package(1).info['processor'] == 1
+        assert topology.get_package(1).nodes == {1}
+        assert [cpu.processor for cpu in topology.nodes[0]] == [0, 2]
+        assert topology.get_package(0).flags is \
+            topology.get_package(1).flags
+
+    def test_parse_cpu_list(self):
+        assert cpuinfo.parse_cpu_list('0-3,8,10-11\n') == [
+            0, 1, 2, 3, 8, 10, 11]
+        assert cpuinfo.parse_cpu_list('') == []
+
+
+class MercuryHwlibCPUFrequencySamplerUnitTests(MercuryAgentUnitTest):
+    """Unit tests for mercury_agent.inspector.hwlib.cpuinfo.CPUFrequencySampler
+    """
+    def setUp(self):
+        super(MercuryHwlibCPUFrequencySamplerUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cpu_path, node_path = make_cpu_sysfs(
+            self.root,
+            {0: (0, 0, '0,2'), 1: (1, 0, '1,3'),
+             2: (0, 0, '0,2'), 3: (1, 0, '1,3'),
+             4: (0, 1, '4')})
+        cpuinfo_path = os.path.join(self.root, 'cpuinfo')
+        with open(cpuinfo_path, 'w') as fp:
+            fp.write(EXAMPLE_PROC_CPUINFO_OUTPUT)
+        self.topology = cpuinfo.CPUTopology(self.cpu_path, node_path,
+                                            cpuinfo_path)
+        # cpu4 has no cpufreq policy
+        for processor in range(4):
+            self.write_freq(processor, 2000000 + processor)
+
+    def write_freq(self, processor, cur, _min=1200000, _max=4000000):
+        path = os.path.join(self.cpu_path, 'cpu{}'.format(processor),
+                            'cpufreq')
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for attribute, value in zip(cpuinfo.CPUFREQ_ATTRIBUTES,
+                                    (cur, _min, _max)):
+            with open(os.path.join(path, attribute), 'w') as fp:
+                fp.write('{}\n'.format(value))
+
+    def test_sample(self):
+        with cpuinfo.CPUFrequencySampler(self.topology) as sampler:
+            assert sampler.enabled
+            assert sampler.processors == [0, 1, 2, 3]
+            assert sampler.get_frequencies(1) == {
+                'cur': 2000001, 'min': 1200000, 'max': 4000000}
+            assert sampler.get_frequencies(4) == {}
+
+            assert dict((k, list(v)) for k, v in
+                        sampler.package_vectors().items()) == {
+                0: [2000000, 2000002], 1: [2000001, 2000003]}
+            assert dict((k, list(v)) for k, v in
+                        sampler.core_vectors().items()) == {
+                0: [2000002], 1: [2000003]}
+            assert list(sampler.package_vectors(sampler.MAXIMUM)[0]) == [
+                4000000, 4000000]
+
+            # The descriptors stay open, the values are re-read in place
+            self.write_freq(0, 3900000)
+            with mock.patch.object(cpuinfo.os, 'open') as open_mock:
+                values = sampler.refresh()
+            assert not open_mock.called
+            assert values is sampler.values
+            assert sampler.get_frequencies(0)['cur'] == 3900000
+            assert list(sampler.core_vectors()[0]) == [3900000]
+
+        assert not sampler.enabled
+
+    def test_subset(self):
+        with cpuinfo.CPUFrequencySampler(self.topology, [3, 1, 4]) as sampler:
+            assert sampler.requested == [1, 3, 4]
+            assert sampler.processors == [1, 3]
+            assert sampler.get_frequencies(3)['cur'] == 2000003
+            assert sampler.get_frequencies(0) == {}
+            assert dict((k, list(v)) for k, v in
+                        sampler.package_vectors().items()) == {
+                0: [], 1: [2000001, 2000003]}
+
+    def test_sample_frequencies(self):
+        self.patch_global(None)
+        self.addCleanup(lambda: getattr(
+            cpuinfo, '__frequency_sampler').close())
+
+        assert cpuinfo.sample_frequencies([0, 4], self.topology) == {
+            0: {'cur': 2000000, 'min': 1200000, 'max': 4000000}, 4: {}}
+        sampler = getattr(cpuinfo, '__frequency_sampler')
+
+        # The shared sampler is re-read, not reopened
+        self.write_freq(0, 3900000)
+        with mock.patch.object(cpuinfo.os, 'open') as open_mock:
+            frequencies = cpuinfo.sample_frequencies([4, 0], self.topology)
+        assert not open_mock.called
+        assert frequencies[0]['cur'] == 3900000
+
+        # and is replaced when the processors change
+        assert cpuinfo.sample_frequencies([1], self.topology) == {
+            1: {'cur': 2000001, 'min': 1200000, 'max': 4000000}}
+        assert not sampler.enabled
+        assert getattr(cpuinfo, '__frequency_sampler') is not sampler
+
+    def test_sample_frequencies_open_file_limit(self):
+        self.patch_global(None)
+        with mock.patch.object(cpuinfo, '_open_file_limit',
+                               return_value=(2, 4096, 128)):
+            assert cpuinfo.sample_frequencies([0], self.topology) is None
+        assert getattr(cpuinfo, '__frequency_sampler') is None
+
+    def patch_global(self, value):
+        patcher = mock.patch.object(cpuinfo, '__frequency_sampler', value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_cpufreq(self):
+        shutil.rmtree(os.path.join(self.cpu_path, 'cpu0', 'cpufreq'))
+        os.unlink(os.path.join(self.cpu_path, 'cpu1', 'cpufreq',
+                               'scaling_max_freq'))
+
+        with cpuinfo.CPUFrequencySampler(self.topology) as sampler:
+            assert sampler.processors == [2, 3]
+            assert list(sampler.package_vectors()[1]) == [2000003]
+
+    def test_open_file_limit(self):
+        # The limit is checked, never raised, by the sampler
+        with mock.patch.object(cpuinfo, '_open_file_limit',
+                               return_value=(64, 4096, 128)), \
+                mock.patch('resource.setrlimit') as setrlimit:
+            with pytest.raises(OSError) as raised:
+                cpuinfo.CPUFrequencySampler(self.topology)
+            assert raised.value.errno == errno.EMFILE
+
+            assert cpuinfo.raise_open_file_limit(15) == 128
+            setrlimit.assert_called_once_with(
+                resource.RLIMIT_NOFILE, (128, 4096))
@@ -220,8 +220,10 @@ def get_fake_pcidevice_required_args(slot='00:00.0', class_id='beef',
 
 class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
     """Unit tests for mercury_agent.inspector.hwlib.lspci"""
+    @mock.patch('mercury_agent.inspector.hwlib.lspci.pci_sysfs.available',
+                return_value=False)
     @mock.patch('mercury_agent.inspector.hwlib.lspci.subprocess.Popen')
-    def setUp(self, popen_mock):
+    def setUp(self, popen_mock, _available_mock):
         """Setup a PCIBus object for each test."""
         popen_mock.return_value.communicate.return_value = (
             EXAMPLE_LSPCI_OUTPUT, '')
@@ -263,7 +265,16 @@ class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
         """Test PCIDevice.__getattr__ behavior."""
         pci_device = lspci.PCIDevice(**get_fake_pcidevice_required_args())
         assert pci_device.slot == '00:00.0'
-        assert pci_device.asdfjkl is None
+
+        # Only unset optional fields read as None
+        del pci_device.driver
+        assert pci_device.driver is None
+        assert not hasattr(pci_device, 'asdfjkl')
+        with pytest.raises(AttributeError):
+            pci_device.drvier
+        del pci_device.slot
+        with pytest.raises(AttributeError):
+            pci_device.slot
 
     def test_pcibus_get_devices_by_class(self):
         """Test PCIBus.get_devices_by_class()"""
@@ -351,3 +362,33 @@ class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
         """Test PCIBus.{get,has}_raid_bus[_devices]()"""
         self._membership_and_retrieval_test_helper(lspci.RAID_CONTROLLER,
                                                    'raid_bus_controller')
+
+    def test_pcibus_query(self):
+        """Test PCIBus.query() with several criteria"""
+        devices = self.pci_bus.query(vendor_id='8086', driver='e1000e')
+        assert [d.slot for d in devices] == ['00:19.0']
+
+        assert self.pci_bus.query(vendor_id='144d', driver='e1000e') == []
+        assert len(self.pci_bus.query()) == len(self.pci_bus)
+        # Devices without a driver are indexed under None
+        assert [d.slot for d in self.pci_bus.query(driver=None)] == [
+            '00:00.0']
+
+        with pytest.raises(ValueError):
+            self.pci_bus.query(class_name='Host bridge')
+
+    def test_pcibus_get_device(self):
+        """Test PCIBus.get_device()"""
+        device = self.pci_bus.get_device('05:00.0')
+        assert device.device_id == 'a802'
+        assert self.pci_bus.get_device('ff:00.0') is None
+
+    def test_pcibus_from_records(self):
+        """Test PCIBus built from device_info['pci'] records"""
+        records = [dict((k, v) for k, v in device.items() if v is not None)
+                   for device in EXPECTED_PARSED_EXAMPLE_LSPCI_OUTPUT]
+        pci_bus = lspci.PCIBus(records)
+        assert pci_bus == self.pci_bus
+        assert lspci.as_pci_bus(pci_bus) is pci_bus
+        assert pci_bus.get_devices_by_device_id('8d31')[0].to_dict() == \
+            EXPECTED_PARSED_EXAMPLE_LSPCI_OUTPUT[2]
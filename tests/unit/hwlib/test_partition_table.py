@@ -0,0 +1,187 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.partition_table"""
+
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from mercury_agent.inspector.hwlib import partition_table
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.hwlib.test_sysfs import write_attributes
+
+LINUX_FILESYSTEM = b'\xaf\x3d\xc6\x0f\x83\x84\x72\x47\x8e\x79\x3d\x69\xd8\x47' \
+                   b'\x7d\xe4'
+DISK_SECTORS = 2097152
+
+
+def mbr(*entries):
+    """
+    :param entries: (boot, type, start LBA, sectors)
+    """
+    sector = bytearray(512)
+    for index, (boot, partition_type, start, sectors) in enumerate(entries):
+        struct.pack_into('<B3sB3sII', sector, 446 + index * 16, boot,
+                         b'\0\0\0', partition_type, b'\0\0\0', start, sectors)
+    sector[510:512] = b'\x55\xaa'
+    return bytes(sector)
+
+
+def gpt(partitions, sector_size=512, pmbr_boot=False):
+    """
+    :param partitions: (first LBA, last LBA) in entry order, None for an
+        unused entry
+    :return: the first 34 sectors of the disk
+    """
+    entries = b''
+    for partition in partitions:
+        if partition is None:
+            entries += b'\0' * 128
+            continue
+        entries += struct.pack('<16s16sQQQ72s', LINUX_FILESYSTEM,
+                               os.urandom(16), partition[0], partition[1], 0,
+                               'data'.encode('utf-16-le'))
+    entries = entries.ljust(128 * 128, b'\0')
+    last_lba = DISK_SECTORS - 1
+    header = struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92, 0,
+                         0, 1, last_lba, 34, last_lba - 33, os.urandom(16),
+                         2, 128, 128, zlib.crc32(entries))
+    header = header[:16] + struct.pack('<I', zlib.crc32(header)) + \
+        header[20:]
+    protective = mbr((pmbr_boot and 0x80 or 0, 0xee, 1, DISK_SECTORS - 1))
+    data = protective.ljust(sector_size, b'\0') + \
+        header.ljust(sector_size, b'\0') + entries
+    return data.ljust(34 * sector_size, b'\0')
+
+
+class TestPartitionTable(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestPartitionTable, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.disk = os.path.join(self.root, 'sda')
+
+    def write(self, data, offset=0):
+        with open(self.disk, 'r+b' if os.path.exists(self.disk) else 'wb') \
+                as fp:
+            fp.seek(offset)
+            fp.write(data)
+            fp.truncate(max(fp.tell(), 34 * 4096))
+
+    def read_table(self, sector_size=512):
+        fd = os.open(self.disk, os.O_RDONLY)
+        try:
+            return partition_table.read_partition_table(fd, sector_size)
+        finally:
+            os.close(fd)
+
+    def test_gpt(self):
+        self.write(gpt([(2048, 1050623), None, (1050624, 2097118)]))
+        self.assertEqual(self.read_table(), {
+            'partition_table': 'gpt',
+            'disk_flags': '',
+            'partitions': [
+                {'number': 1, 'start': 1048576, 'end': 537919487,
+                 'size': 536870912},
+                {'number': 3, 'start': 537919488, 'end': 1073724927,
+                 'size': 535805440}]})
+
+    def test_gpt_4k_sectors(self):
+        self.write(gpt([(256, 511)], sector_size=4096, pmbr_boot=True))
+        table = self.read_table(4096)
+        self.assertEqual(table['disk_flags'], 'pmbr_boot')
+        self.assertEqual(table['partitions'], [
+            {'number': 1, 'start': 1048576, 'end': 2097151,
+             'size': 1048576}])
+
+    def test_damaged_gpt(self):
+        data = bytearray(gpt([(2048, 4095)]))
+        # Corrupt the partition entry array
+        data[1024 + 40] ^= 0xff
+        self.write(bytes(data))
+        self.assertIsNone(self.read_table())
+
+        # Corrupt the header
+        data = bytearray(gpt([(2048, 4095)]))
+        data[512 + 60] ^= 0xff
+        self.write(bytes(data))
+        self.assertIsNone(self.read_table())
+
+    def test_msdos(self):
+        self.write(mbr((0x80, 0x83, 2048, 2048), (0, 0x05, 8192, 16384)))
+        # Two logical partitions in the extended partition
+        self.write(mbr((0, 0x83, 2048, 2048), (0, 0x05, 6144, 4096)),
+                   8192 * 512)
+        self.write(mbr((0, 0x82, 2048, 2048)), (8192 + 6144) * 512)
+
+        table = self.read_table()
+        self.assertEqual(table['partition_table'], 'msdos')
+        self.assertEqual(
+            [(p['number'], p['type'], p['start'] // 512, p['size'] // 512)
+             for p in table['partitions']],
+            [(1, 'primary', 2048, 2048), (2, 'extended', 8192, 16384),
+             (5, 'logical', 10240, 2048), (6, 'logical', 16384, 2048)])
+
+    def test_unrecognized(self):
+        # Blank disks have no label
+        self.write(b'\0' * 512)
+        self.assertEqual(self.read_table()['partition_table'], 'unknown')
+
+        # An ext4 superblock, parted reports a loop label
+        self.write(b'\x53\xef', 1024 + 0x38)
+        self.assertIsNone(self.read_table())
+
+        # A boot sector without partitions
+        self.write(mbr())
+        self.assertIsNone(self.read_table())
+
+        # Invalid boot indicator
+        self.write(mbr((0x12, 0x83, 2048, 2048)))
+        self.assertIsNone(self.read_table())
+
+    def test_read_device_info(self):
+        sysfs = os.path.join(self.root, 'sys')
+        path = os.path.join(sysfs, 'sda')
+        write_attributes(path, {'size': str(DISK_SECTORS)})
+        write_attributes(os.path.join(path, 'device'), {
+            'vendor': 'ATA     ', 'model': 'INTEL SSDSC2BB48'})
+        write_attributes(os.path.join(path, 'queue'), {
+            'logical_block_size': '512', 'physical_block_size': '4096'})
+        self.write(gpt([(2048, 4095)]))
+
+        self.assertEqual(
+            partition_table.read_device_info(self.disk, sysfs), {
+                'model': 'ATA INTEL SSDSC2BB48 (scsi)',
+                'device': self.disk,
+                'size': DISK_SECTORS * 512,
+                'sector_size': {'logical': 512, 'physical': 4096},
+                'partition_table': 'gpt',
+                'disk_flags': ''
+            })
+
+        # Unsupported device types use parted
+        self.assertIsNone(partition_table.read_device_info(
+            os.path.join(self.root, 'mmcblk0'), sysfs))
+
+    def test_parted_model(self):
+        self.assertEqual(partition_table.parted_model('vda', {}),
+                         'Virtio Block Device (virtblk)')
+        self.assertEqual(
+            partition_table.parted_model(
+                'nvme0n1', {'device/model': 'SAMSUNG MZ7LH480'}),
+            'SAMSUNG MZ7LH480 (nvme)')
+        self.assertIsNone(partition_table.parted_model('sdb', {}))
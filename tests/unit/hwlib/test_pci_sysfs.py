@@ -0,0 +1,161 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.pci_sysfs and pciids"""
+
+import copy
+import os
+import shutil
+import tempfile
+
+from mercury_agent.inspector.hwlib import pci_sysfs, pciids
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.hwlib.test_lspci import EXPECTED_PARSED_EXAMPLE_LSPCI_OUTPUT
+
+PCI_IDS = os.path.join(os.path.dirname(__file__), '..', 'resources',
+                       'pci.ids')
+
+# The devices lspci reported in test_lspci, as sysfs presents them
+SYSFS_DEVICES = {
+    '0000:00:00.0': {'class': '0x060000', 'vendor': '0x8086',
+                     'device': '0x2f00', 'subsystem_vendor': '0x8086',
+                     'subsystem_device': '0x0000', 'revision': '0x02'},
+    '0000:00:01.0': {'class': '0x060400', 'vendor': '0x8086',
+                     'device': '0x2f02', 'subsystem_vendor': '0x0000',
+                     'subsystem_device': '0x0000', 'revision': '0x02',
+                     'driver': 'pcieport'},
+    '0000:00:14.0': {'class': '0x0c0330', 'vendor': '0x8086',
+                     'device': '0x8d31', 'subsystem_vendor': '0x1043',
+                     'subsystem_device': '0x8600', 'revision': '0x05',
+                     'driver': 'xhci_hcd'},
+    '0000:00:16.0': {'class': '0x078000', 'vendor': '0x8086',
+                     'device': '0x8d3a', 'subsystem_vendor': '0x1043',
+                     'subsystem_device': '0x8600', 'revision': '0x05',
+                     'driver': 'mei_me'},
+    '0000:00:19.0': {'class': '0x020000', 'vendor': '0x8086',
+                     'device': '0x15a1', 'subsystem_vendor': '0x1043',
+                     'subsystem_device': '0x85c4', 'revision': '0x05',
+                     'driver': 'e1000e'},
+    '0000:05:00.0': {'class': '0x010802', 'vendor': '0x144d',
+                     'device': '0xa802', 'subsystem_vendor': '0x144d',
+                     'subsystem_device': '0xa801', 'revision': '0x01',
+                     'driver': 'nvme'}
+}
+
+
+def make_sysfs(root, devices):
+    for address, attributes in devices.items():
+        path = os.path.join(root, address)
+        os.makedirs(path)
+        for name, value in attributes.items():
+            if name == 'driver':
+                os.symlink('../../../bus/pci/drivers/' + value,
+                           os.path.join(path, 'driver'))
+                continue
+            with open(os.path.join(path, name), 'w') as fp:
+                fp.write(value + '\n')
+
+
+class TestPCIIds(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestPCIIds, self).setUp()
+        self.ids = pciids.PCIIds(PCI_IDS)
+        self.addCleanup(self.ids.close)
+
+    def test_vendor_name(self):
+        self.assertEqual(self.ids.vendor_name('8086'), 'Intel Corporation')
+        self.assertEqual(self.ids.vendor_name('144D'),
+                         'Samsung Electronics Co Ltd')
+        self.assertIsNone(self.ids.vendor_name('dead'))
+
+    def test_device_name(self):
+        self.assertEqual(self.ids.device_name('144d', 'a802'),
+                         'NVMe SSD Controller SM951/PM951')
+        # 2f00 is an Intel device, not a Samsung one
+        self.assertIsNone(self.ids.device_name('144d', '2f00'))
+        self.assertIsNone(self.ids.device_name('dead', 'a802'))
+
+    def test_subsystem_name(self):
+        self.assertEqual(
+            self.ids.subsystem_name('8086', '8d3a', '1043', '8600'),
+            'Z10PE-D16 WS Motherboard')
+        # Only 8d31 lists this subsystem
+        self.assertIsNone(
+            self.ids.subsystem_name('8086', '15a1', '1043', '85c4'))
+
+    def test_class_name(self):
+        self.assertEqual(self.ids.class_name('0200'), 'Ethernet controller')
+        # Unknown subclasses are named after their class
+        self.assertEqual(self.ids.class_name('0280'), 'Network controller')
+        self.assertIsNone(self.ids.class_name('ff00'))
+
+    def test_missing_database(self):
+        ids = pciids.PCIIds(os.path.join(tempfile.gettempdir(), 'missing'))
+        self.assertIsNone(ids.vendor_name('8086'))
+        self.assertIsNone(ids.class_name('0200'))
+
+
+class TestPCISysfs(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestPCISysfs, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ids = pciids.PCIIds(PCI_IDS)
+        self.addCleanup(self.ids.close)
+
+    def test_matches_lspci(self):
+        make_sysfs(self.root, SYSFS_DEVICES)
+        expected = copy.deepcopy(EXPECTED_PARSED_EXAMPLE_LSPCI_OUTPUT)
+        # The trimmed pci.ids names this subsystem, the one lspci used did not
+        expected[3]['sdevice_name'] = 'Z10PE-D16 WS Motherboard'
+
+        devices = pci_sysfs.enumerate_devices(self.root, self.ids)
+
+        self.assertEqual(
+            devices,
+            [dict((k, v) for k, v in device.items() if v is not None)
+             for device in expected])
+
+    def test_domains(self):
+        devices = {
+            '0000:00:00.0': SYSFS_DEVICES['0000:00:00.0'],
+            '0001:00:00.0': SYSFS_DEVICES['0000:00:00.0']
+        }
+        make_sysfs(self.root, devices)
+
+        self.assertEqual(
+            [device['slot'] for device in
+             pci_sysfs.enumerate_devices(self.root, self.ids)],
+            ['0000:00:00.0', '0001:00:00.0'])
+
+    def test_unknown_ids(self):
+        make_sysfs(self.root, {'0000:00:00.0': {
+            'class': '0xff0000', 'vendor': '0x1d0f', 'device': '0x8061',
+            'subsystem_vendor': '0x1d0f', 'subsystem_device': '0x8061',
+            'revision': '0x00'}})
+
+        self.assertEqual(pci_sysfs.enumerate_devices(self.root, self.ids), [{
+            'slot': '00:00.0', 'class_id': 'ff00', 'class_name': 'Class',
+            'vendor_id': '1d0f', 'vendor_name': 'Vendor',
+            'device_id': '8061', 'device_name': 'Device',
+            'svendor_id': '1d0f', 'svendor_name': 'Vendor',
+            'sdevice_id': '8061', 'sdevice_name': 'Device'}])
+
+    def test_device_removed(self):
+        make_sysfs(self.root, SYSFS_DEVICES)
+        os.unlink(os.path.join(self.root, '0000:05:00.0', 'class'))
+
+        self.assertEqual(
+            len(pci_sysfs.enumerate_devices(self.root, self.ids)),
+            len(SYSFS_DEVICES) - 1)
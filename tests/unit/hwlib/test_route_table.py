@@ -0,0 +1,107 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.route_table"""
+
+from mercury_agent.inspector.hwlib.route_table import (
+    RouteTable, route_next_hop)
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.hwlib.test_rtnetlink import load_snapshot
+
+ROUTES = [
+    {'destination': 'default', 'via': '10.0.0.254', 'dev': 'eth0',
+     'metric': '200'},
+    {'destination': 'default', 'via': '10.0.0.1', 'dev': 'eth0',
+     'metric': '100'},
+    {'destination': '10.0.0.0/24', 'dev': 'eth0', 'proto': 'kernel',
+     'scope': 'link', 'src': '10.0.0.5'},
+    {'destination': '172.16.0.0/12', 'via': '10.0.0.2', 'dev': 'eth0'},
+    {'destination': '172.16.4.0/24', 'via': '10.0.0.3', 'dev': 'eth0'},
+    {'destination': '172.16.4.9', 'via': '10.0.0.4', 'dev': 'eth0'},
+    {'destination': '192.168.0.0/16', 'type': 'blackhole'},
+    {'destination': '198.51.100.0/24', 'via': '10.0.0.6', 'dev': 'eth0',
+     'dead': True},
+    {'destination': 'default', 'via': '10.9.0.1', 'dev': 'eth1',
+     'table': '100'},
+    {'destination': 'default', 'via': '2001:db8::1', 'dev': 'eth0',
+     'metric': '1024', 'pref': 'medium'},
+    {'destination': '2001:db8:1::/48', 'via': '2001:db8::2', 'dev': 'eth0',
+     'metric': '1024'},
+    {'destination': 'fd00::/8', 'type': 'throw', 'table': 'local'}
+]
+
+
+class TestRouteTable(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestRouteTable, self).setUp()
+        self.table = RouteTable(ROUTES)
+
+    def via(self, address, **kwargs):
+        route = self.table.lookup(address, **kwargs)
+        return route and route.get('via', route.get('type'))
+
+    def test_longest_prefix(self):
+        # The dead route is not indexed
+        self.assertEqual(len(self.table), len(ROUTES) - 1)
+        self.assertEqual(self.via('172.16.5.1'), '10.0.0.2')
+        self.assertEqual(self.via('172.16.4.1'), '10.0.0.3')
+        self.assertEqual(self.via('172.16.4.9'), '10.0.0.4')
+        self.assertEqual(self.table.lookup('10.0.0.9')['src'], '10.0.0.5')
+
+    def test_metric(self):
+        self.assertEqual(self.via('8.8.8.8'), '10.0.0.1')
+
+    def test_route_types(self):
+        self.assertEqual(self.via('192.168.1.1'), 'blackhole')
+        # Dead routes are skipped
+        self.assertEqual(self.via('198.51.100.1'), '10.0.0.1')
+
+    def test_tables(self):
+        self.assertEqual(self.via('8.8.8.8', tables=['100']), '10.9.0.1')
+        self.assertIsNone(self.table.lookup('8.8.8.8', tables=['200']))
+        self.assertEqual(self.via('8.8.8.8', tables=['100', 'main']),
+                         '10.9.0.1')
+
+    def test_multipath(self):
+        table = RouteTable([
+            {'destination': '10.40.0.0/16', 'nexthops': [
+                {'dev': 'eth0', 'via': '10.0.0.7', 'weight': '1',
+                 'dead': True}]},
+            {'destination': 'default', 'nexthops': [
+                {'dev': 'eth0', 'via': '2001:db8::7', 'weight': '1'}]}])
+        # Every next hop is dead, the route is not indexed
+        self.assertEqual(len(table), 1)
+        self.assertIsNone(table.lookup('10.40.0.1'))
+        self.assertEqual(route_next_hop(table.lookup('2001:db8:9::1')),
+                         ('eth0', '2001:db8::7'))
+
+    def test_ipv6(self):
+        self.assertEqual(self.via('2001:db8:1::10'), '2001:db8::2')
+        self.assertEqual(self.via('2001:db8:2::10'), '2001:db8::1')
+        # A throw route in the local table continues with the main table
+        self.assertEqual(self.via('fd00::1'), '2001:db8::1')
+        self.assertEqual(self.via('fe80::1%eth0'), '2001:db8::1')
+
+    def test_snapshot_routes(self):
+        table = RouteTable(
+            load_snapshot().route_table(family=None, table=None))
+
+        self.assertEqual(table.lookup('10.30.1.1')['nexthops'][1]['via'],
+                         '10.10.0.3')
+        self.assertEqual(table.lookup('10.10.0.5')['type'], 'local')
+        self.assertEqual(table.lookup('10.10.0.7')['src'], '10.10.0.5')
+        self.assertEqual(table.lookup('10.50.1.1',
+                                      tables=['100'])['via'], '10.10.0.4')
+        self.assertEqual(table.lookup('2001:db8:ffff::1')['via'],
+                         '2001:db8::1')
@@ -0,0 +1,205 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.rtnetlink
+
+rtnetlink_dump.bin holds the replies to DUMP_REQUESTS captured in a network
+namespace with:
+
+    veth0 (up): 10.10.0.5/24, 10.10.0.6/24, 2001:db8::5/64
+    veth1 (up), br0 (down): 172.16.0.1/16 without a broadcast address
+    tap0 (tun, no carrier): 10.40.0.1 peer 10.40.0.2
+    default via 10.10.0.1 metric 100, default via 10.10.0.254 metric 200
+    static, dhcp, multipath, blackhole, and unreachable routes
+    table 100: default via 10.10.0.9, 10.50.0.0/16 via 10.10.0.4
+
+rtnetlink_netifaces.json and rtnetlink_ip_route.txt are what netifaces and
+`ip route show` reported at the same time.
+"""
+
+import errno
+import json
+import os
+import socket
+
+import mock
+
+from mercury_agent.inspector.hwlib import rtnetlink
+from mercury_agent.inspector.hwlib.iproute2 import IPRoute2
+from tests.unit.base import MercuryAgentUnitTest
+
+RESOURCES = os.path.join(os.path.dirname(__file__), '..', 'resources')
+
+
+def read_resource(name, mode='r'):
+    with open(os.path.join(RESOURCES, name), mode) as fp:
+        return fp.read()
+
+
+def load_snapshot():
+    return rtnetlink.NetlinkSnapshot.from_messages(
+        [read_resource('rtnetlink_dump.bin', 'rb')])
+
+
+class TestNetlinkSnapshot(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestNetlinkSnapshot, self).setUp()
+        self.snapshot = load_snapshot()
+        self.netifaces = json.loads(read_resource('rtnetlink_netifaces.json'))
+
+    def test_links(self):
+        self.assertEqual(self.snapshot.list_interfaces(exclude_loopback=False),
+                         self.netifaces['interfaces'])
+        self.assertEqual(self.snapshot.list_interfaces(),
+                         ['veth1', 'veth0', 'br0', 'tap0'])
+
+        veth0 = self.snapshot.get_link('veth0')
+        self.assertEqual(veth0['address'], '0c:c4:7a:10:00:05')
+        self.assertEqual(veth0['operstate'], 'up')
+        self.assertNotIn('address', self.snapshot.get_link('tap0'))
+
+    def test_ifaddresses_match_netifaces(self):
+        for interface, expected in self.netifaces['ifaddresses'].items():
+            # JSON keys are strings
+            addresses = json.loads(json.dumps(
+                self.snapshot.ifaddresses(interface)))
+            self.assertEqual(addresses, expected, interface)
+
+        self.assertEqual(self.snapshot.ifaddresses('eth9'), {})
+
+    def test_gateways(self):
+        self.assertEqual(self.snapshot.gateways(), {
+            'default': {socket.AF_INET: ('10.10.0.1', 'veth0'),
+                        socket.AF_INET6: ('2001:db8::1', 'veth0')},
+            socket.AF_INET: [('10.10.0.1', 'veth0', True),
+                             ('10.10.0.254', 'veth0', False)],
+            socket.AF_INET6: [('2001:db8::1', 'veth0', True)]
+        })
+
+    def test_route_table_matches_ip_route(self):
+        output = read_resource('rtnetlink_ip_route.txt')
+        # IPRoute2 cannot parse multipath, blackhole, or unreachable routes
+        simple = '\n'.join(
+            line for line in output.splitlines()
+            if not line.startswith(('\t', '10.30.', 'unreachable',
+                                    'blackhole')))
+        with mock.patch.object(IPRoute2, 'get_table', return_value=simple), \
+                mock.patch('mercury.common.helpers.cli.find_in_path',
+                           return_value='/sbin/ip'):
+            expected = IPRoute2().table
+
+        table = self.snapshot.route_table()
+        self.assertEqual(
+            [route for route in table
+             if 'nexthops' not in route and 'type' not in route],
+            expected)
+
+        self.assertIn({'destination': '10.30.0.0/16', 'nexthops': [
+            {'dev': 'veth0', 'via': '10.10.0.2', 'weight': '1'},
+            {'dev': 'veth0', 'via': '10.10.0.3', 'weight': '2'}]}, table)
+        self.assertIn({'destination': '10.99.0.0/16', 'type': 'blackhole'},
+                      table)
+
+    def test_route_table_all_tables(self):
+        table = self.snapshot.route_table(table=100)
+        self.assertEqual(table, [
+            {'destination': 'default', 'via': '10.10.0.9', 'dev': 'veth0',
+             'table': '100'},
+            {'destination': '10.50.0.0/16', 'via': '10.10.0.4',
+             'dev': 'veth0', 'table': '100'}])
+
+        routes = self.snapshot.route_table(family=None, table=None)
+        self.assertIn({'destination': 'default', 'via': '2001:db8::1',
+                       'dev': 'veth0', 'metric': '1024', 'pref': 'medium'},
+                      routes)
+        self.assertIn({'destination': '10.10.0.5', 'type': 'local',
+                       'table': 'local', 'dev': 'veth0', 'proto': 'kernel',
+                       'scope': 'host', 'src': '10.10.0.5'}, routes)
+
+
+class TestNetlinkSocket(MercuryAgentUnitTest):
+    def test_dump(self):
+        """ Replay the captured replies, split across two receives """
+        data = read_resource('rtnetlink_dump.bin', 'rb')
+        messages = []
+        offset = 0
+        for _, _, _, payload in rtnetlink.parse_messages(data):
+            length = rtnetlink._NLMSGHDR.size + len(payload)
+            messages.append(data[offset:offset + rtnetlink._align(length)])
+            offset += rtnetlink._align(length)
+
+        # Each dump ends with NLMSG_DONE
+        replies, current = [], []
+        for message in messages:
+            current.append(message)
+            if rtnetlink._NLMSGHDR.unpack_from(message)[1] == \
+                    rtnetlink.NLMSG_DONE:
+                half = len(current) // 2
+                replies.extend([b''.join(current[:half]),
+                                b''.join(current[half:])])
+                current = []
+        self.assertEqual(len(replies), 2 * len(rtnetlink.DUMP_REQUESTS))
+
+        sock = mock.Mock()
+        sock.recv.side_effect = replies
+        with mock.patch.object(rtnetlink.socket, 'socket',
+                               return_value=sock):
+            snapshot = rtnetlink.dump()
+
+        self.assertEqual(sock.send.call_count, len(rtnetlink.DUMP_REQUESTS))
+        self.assertTrue(sock.close.called)
+        self.assertEqual(snapshot.route_table(family=None, table=None),
+                         load_snapshot().route_table(family=None, table=None))
+
+    def test_error(self):
+        nl = rtnetlink.NetlinkSocket.__new__(rtnetlink.NetlinkSocket)
+        nl.seq = 0
+        nl.socket = mock.Mock()
+        nl.socket.recv.return_value = rtnetlink._NLMSGHDR.pack(
+            rtnetlink._NLMSGHDR.size + 4, rtnetlink.NLMSG_ERROR, 0, 1, 0) + \
+            b'\xff\xff\xff\xff'
+
+        with self.assertRaises(OSError):
+            nl.dump(rtnetlink.RTM_GETLINK, b'')
+
+    def test_interrupted_dump_is_retried(self):
+        def reply(seq, flags=0):
+            flags |= rtnetlink.NLM_F_MULTI
+            return b''.join(
+                rtnetlink._NLMSGHDR.pack(rtnetlink._NLMSGHDR.size + 4,
+                                         msg_type, flags, seq, 0) + b'\0' * 4
+                for msg_type in (rtnetlink.RTM_NEWLINK, rtnetlink.NLMSG_DONE))
+
+        nl = rtnetlink.NetlinkSocket.__new__(rtnetlink.NetlinkSocket)
+        nl.seq = 0
+        nl.socket = mock.Mock()
+        nl.socket.recv.side_effect = [
+            reply(1, rtnetlink.NLM_F_DUMP_INTR), reply(2)]
+
+        self.assertEqual(nl.dump(rtnetlink.RTM_GETLINK, b''), [reply(2)])
+        self.assertEqual(nl.socket.send.call_count, 2)
+
+        nl.socket.recv.side_effect = [
+            reply(seq, rtnetlink.NLM_F_DUMP_INTR) for seq in range(3, 8)]
+        with self.assertRaises(OSError) as raised:
+            nl.dump(rtnetlink.RTM_GETLINK, b'')
+        self.assertEqual(raised.exception.errno, errno.EINTR)
+
+    def test_route_attribute_types_are_masked(self):
+        route = rtnetlink._RTMSG.pack(socket.AF_INET, 0, 0, 0, 254, 4, 0,
+                                      rtnetlink.RTN_UNICAST, 0)
+        # RTA_PRIORITY with NLA_F_NET_BYTEORDER set
+        route += rtnetlink._RTATTR.pack(8, rtnetlink.RTA_PRIORITY | 0x4000) + \
+            rtnetlink._U32.pack(100)
+        self.assertEqual(rtnetlink.parse_route(route)['priority'], 100)
@@ -0,0 +1,114 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.sysfs"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from mercury_agent.inspector.hwlib import sysfs
+from tests.unit.base import MercuryAgentUnitTest
+
+ETH0 = {
+    'address': '0c:c4:7a:00:00:01',
+    'carrier': '1',
+    'dev_port': '0',
+    'dev_id': '0x0',
+    'duplex': 'full',
+    'speed': '10000',
+    'ifindex': '2',
+    'mtu': '1500'
+}
+
+
+def write_attributes(path, attributes):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    for name, value in attributes.items():
+        with open(os.path.join(path, name), 'w') as fp:
+            fp.write(value + '\n')
+
+
+class TestSysFSSnapshot(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestSysFSSnapshot, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'class', 'net', 'eth0')
+        write_attributes(self.path, ETH0)
+        os.makedirs(os.path.join(self.path, 'statistics'))
+        os.symlink(self.root, os.path.join(self.path, 'subsystem'))
+
+    def test_all_files(self):
+        snapshot = sysfs.SysFSSnapshot(self.path)
+
+        self.assertEqual(dict(snapshot), ETH0)
+
+    def test_names(self):
+        snapshot = sysfs.SysFSSnapshot(self.path,
+                                       ['speed', 'missing', 'statistics'])
+
+        self.assertEqual(dict(snapshot), {
+            'speed': '10000', 'missing': '', 'statistics': ''})
+
+    def test_missing_directory(self):
+        path = os.path.join(self.root, 'class', 'net', 'eth1')
+
+        self.assertEqual(dict(sysfs.SysFSSnapshot(path)), {})
+        self.assertEqual(dict(sysfs.SysFSSnapshot(path, ['address'])),
+                         {'address': ''})
+
+    def test_immutable(self):
+        snapshot = sysfs.SysFSSnapshot(self.path, ['speed'])
+
+        with self.assertRaises(TypeError):
+            snapshot['speed'] = '1000'
+
+    def test_refresh(self):
+        snapshot = sysfs.SysFSSnapshot(self.path, ['carrier', 'speed'])
+        write_attributes(self.path, {'carrier': '0', 'speed': '-1'})
+
+        refreshed = snapshot.refresh('carrier')
+
+        self.assertEqual(dict(refreshed), {'carrier': '0', 'speed': '10000'})
+        self.assertEqual(snapshot['carrier'], '1')
+        self.assertEqual(dict(refreshed.refresh()),
+                         {'carrier': '0', 'speed': '-1'})
+
+    def test_netclass(self):
+        with mock.patch.object(sysfs, 'append_sys',
+                               lambda path: os.path.join(self.root, path)):
+            netclass = sysfs.NetClass('eth0')
+            snapshot = netclass.snapshot()
+
+            self.assertEqual(
+                dict(snapshot),
+                dict((name, ETH0[name]) for name in sysfs.NetClass.attributes))
+            self.assertEqual(netclass.address, snapshot['address'])
+            self.assertTrue(netclass.carrier)
+
+    def test_dmi(self):
+        write_attributes(os.path.join(self.root, 'class', 'dmi', 'id'), {
+            'sys_vendor': 'Supermicro', 'product_name': 'X10DRi'})
+
+        with mock.patch.object(sysfs, 'append_sys',
+                               lambda path: os.path.join(self.root, path)):
+            dmi = sysfs.DMI()
+
+        self.assertEqual(dmi.dump(), {'sys_vendor': 'Supermicro',
+                                      'product_name': 'X10DRi'})
+        self.assertEqual(dmi.sys_vendor, 'Supermicro')
@@ -0,0 +1,152 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.udev"""
+
+import mock
+
+from mercury_agent.inspector.hwlib import udev
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeDevice(dict):
+    def __init__(self, subsystem, sys_name, device_type=None, parent=None,
+                 pci_parent=None, net_type=None, **properties):
+        super(FakeDevice, self).__init__(properties)
+        self.subsystem = subsystem
+        self.sys_name = sys_name
+        self.device_type = device_type
+        self.parent = parent
+        self.pci_parent = pci_parent
+        self.attributes = mock.Mock()
+        self.attributes.asint.side_effect = \
+            lambda name: net_type if net_type is not None else {}[name]
+
+    def find_parent(self, subsystem):
+        assert subsystem == 'pci'
+        return self.pci_parent
+
+
+RAID = FakeDevice('pci', '0000:03:00.0', PCI_SLOT_NAME='0000:03:00.0')
+NIC = FakeDevice('pci', '0000:05:00.0', PCI_SLOT_NAME='0000:05:00.0')
+
+SDA = FakeDevice('block', 'sda', 'disk', pci_parent=RAID, DEVNAME='/dev/sda',
+                 MAJOR='8', MINOR='0', DEVPATH='/devices/.../block/sda')
+SDB = FakeDevice('block', 'sdb', 'disk', pci_parent=RAID, DEVNAME='/dev/sdb',
+                 MAJOR='8', MINOR='16', DEVPATH='/devices/.../block/sdb')
+BLOCK_DEVICES = [
+    SDA,
+    FakeDevice('block', 'sda1', 'partition', parent=SDA, pci_parent=RAID,
+               DEVNAME='/dev/sda1', MAJOR='8', MINOR='1'),
+    FakeDevice('block', 'sda2', 'partition', parent=SDA, pci_parent=RAID,
+               DEVNAME='/dev/sda2', MAJOR='8', MINOR='2'),
+    SDB,
+    FakeDevice('block', 'sr0', 'disk', DEVNAME='/dev/sr0', MAJOR='11',
+               MINOR='0', ID_TYPE='cd'),
+    FakeDevice('block', 'loop0', 'disk', DEVNAME='/dev/loop0', MAJOR='7',
+               MINOR='0'),
+    FakeDevice('block', 'dm-0', 'disk', DEVNAME='/dev/dm-0', MAJOR='254',
+               MINOR='0')
+]
+NET_DEVICES = [
+    FakeDevice('net', 'lo', net_type=772, INTERFACE='lo'),
+    FakeDevice('net', 'eth1', pci_parent=NIC, net_type=1, INTERFACE='eth1'),
+    FakeDevice('net', 'eth0', pci_parent=NIC, net_type=1, INTERFACE='eth0'),
+    FakeDevice('net', 'bond0', INTERFACE='bond0')
+]
+
+
+class FakeContext(object):
+    def __init__(self):
+        self.enumerations = 0
+
+    def list_devices(self, subsystem):
+        self.enumerations += 1
+        return {'block': BLOCK_DEVICES, 'net': NET_DEVICES}[subsystem]
+
+
+class TestUDevSnapshot(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestUDevSnapshot, self).setUp()
+        self.snapshot = udev.UDevSnapshot(FakeContext(), '100')
+
+    def test_indexes(self):
+        self.assertIs(self.snapshot.block['sdb'], SDB)
+        self.assertIs(self.snapshot.get_device_by_name('/dev/sda'), SDA)
+        self.assertIs(self.snapshot.devnums['8:16'], SDB)
+        self.assertEqual(
+            [d.sys_name for d in self.snapshot.get_partitions('sda')],
+            ['sda1', 'sda2'])
+        self.assertEqual(self.snapshot.get_partitions('sdb'), [])
+        self.assertEqual(
+            [d.sys_name for d in self.snapshot.get_pci_devices(
+                '0000:05:00.0')], ['eth1', 'eth0'])
+        self.assertEqual(
+            len(self.snapshot.get_pci_devices('0000:03:00.0')), 4)
+
+    def test_device_by_link(self):
+        st = mock.Mock(st_rdev=(8 << 8) | 16)
+        with mock.patch.object(udev.os, 'stat', return_value=st):
+            self.assertIs(self.snapshot.get_device_by_name(
+                '/dev/disk/by-id/wwn-0x5000c500a1b2c3d4'), SDB)
+        self.assertIsNone(self.snapshot.get_device_by_name('/dev/missing'))
+
+    def test_storage_devices(self):
+        self.assertEqual(self.snapshot.get_storage_devices(), [SDA, SDB])
+        self.assertEqual(
+            len(self.snapshot.get_storage_devices(loop_enabled=True)), 3)
+
+    def test_network_devices(self):
+        self.assertEqual(
+            [d.sys_name for d in self.snapshot.get_network_devices()],
+            ['eth0', 'eth1'])
+
+
+class TestGetSnapshot(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestGetSnapshot, self).setUp()
+        self.context = FakeContext()
+        self.seqnum = mock.patch.object(udev.fingerprint, 'uevent_seqnum',
+                                        return_value='100').start()
+        self.queued = mock.patch.object(udev.os.path, 'exists',
+                                        return_value=False).start()
+        patches = [
+            mock.patch.object(udev, '__context', self.context, create=True),
+            mock.patch.object(udev, '__snapshot', None, create=True)
+        ]
+        for patch in patches:
+            patch.start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_reused_until_uevent(self):
+        snapshot = udev.get_snapshot()
+        self.assertIs(udev.get_snapshot(), snapshot)
+        self.assertEqual(self.context.enumerations, 2)
+
+        self.seqnum.return_value = '101'
+        self.assertIsNot(udev.get_snapshot(), snapshot)
+        self.assertEqual(self.context.enumerations, 4)
+
+    def test_not_reused_while_queued(self):
+        self.queued.return_value = True
+        snapshot = udev.get_snapshot()
+        self.assertIsNone(snapshot.seqnum)
+        self.assertIsNot(udev.get_snapshot(), snapshot)
+
+    def test_helper(self):
+        helper = udev.UDevHelper()
+        self.assertEqual(helper.discover_valid_storage_devices(), [SDA, SDB])
+        self.assertEqual([d.sys_name for d in helper.find_partitions(
+            '/dev/sda')], ['sda1', 'sda2'])
+        self.assertEqual(self.context.enumerations, 2)
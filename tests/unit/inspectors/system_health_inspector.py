@@ -40,7 +40,7 @@ class SysHealthInspector(unittest.TestCase):
             def show_powersupply(self):
                 return []
 
-        mock_mce.count_logged_events = mock.Mock(return_value=0)
+        mock_mce.get_counter.return_value.update.return_value.total = 0
         mock_get_config.return_value = box.Box(_config)
         mock_hpasm.HPASMCLI = mock.Mock(return_value=FakeHP())
         mock_hp_obj = mock_hpasm.HPASMCLI()
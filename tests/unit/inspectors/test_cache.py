@@ -0,0 +1,93 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.cache"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from mercury_agent.inspector import cache, inspect
+from tests.unit.base import MercuryAgentUnitTest
+
+DEVICE_INFO = {
+    'mercury_id': '0112426690d6f7ecb8c0d1ee1d0b3a2b9e5d8a1c4f',
+    'dmi': {'sys_vendor': 'Dell Inc.'},
+    'pci': [{'slot': '0000:00:00.0', 'class_id': '0600'}]
+}
+
+
+class TestInspectionCache(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestInspectionCache, self).setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'run', 'inspection.msgpack')
+
+        self.boot_id = 'c3a1f9e2-0e4b-4c36-9a5c-8b1d2f6e7a90'
+        self.version = '0.1.10'
+        patches = [
+            mock.patch.object(cache.fingerprint, 'boot_id',
+                              lambda: self.boot_id),
+            mock.patch.object(cache, 'agent_version', lambda: self.version)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_round_trip(self):
+        self.assertTrue(cache.save(DEVICE_INFO, {'dmi': 'abc'}, self.path))
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(cache.load(self.path), (DEVICE_INFO, {'dmi': 'abc'}))
+
+    def test_different_boot(self):
+        cache.save(DEVICE_INFO, {}, self.path)
+        self.boot_id = 'e9b4a3c1-7d2f-4e8a-b6c5-1f0a9d8e7c6b'
+        self.assertEqual(cache.load(self.path), (None, None))
+
+    def test_different_version(self):
+        cache.save(DEVICE_INFO, {}, self.path)
+        self.version = '0.1.11'
+        self.assertEqual(cache.load(self.path), (None, None))
+
+    def test_unknown_version(self):
+        self.version = None
+        self.assertFalse(cache.save(DEVICE_INFO, {}, self.path))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_missing_and_corrupt(self):
+        self.assertEqual(cache.load(self.path), (None, None))
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as fp:
+            fp.write(b'\xc1 not msgpack')
+        self.assertEqual(cache.load(self.path), (None, None))
+
+    def test_unserializable(self):
+        # msgpack raises OverflowError for integers wider than 64 bits
+        self.assertFalse(cache.save({'huge': 2 ** 70}, {}, self.path))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_no_temporary_files_left(self):
+        cache.save(DEVICE_INFO, {}, self.path)
+        cache.save(DEVICE_INFO, {}, self.path)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                         [os.path.basename(self.path)])
+
+    def test_save_cache_holds_inspect_lock(self):
+        with mock.patch.object(
+                cache, 'save',
+                side_effect=lambda *args: inspect._inspect_lock.locked()):
+            self.assertTrue(inspect.save_cache(self.path))
@@ -0,0 +1,93 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.delta"""
+
+import copy
+
+from mercury_agent.inspector import delta
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def _drives(count):
+    return [{'index': idx, 'status': 'OK', 'size': 1000204886016,
+             'extra': {'address': '252:{}'.format(idx)}}
+            for idx in range(count)]
+
+
+class TestDelta(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestDelta, self).setUp()
+        self.raid = [{
+            'name': 'PERC H730P Mini',
+            'configuration': {
+                'arrays': [],
+                'unassigned': _drives(128),
+                'spares': []
+            }
+        }]
+
+    def test_unchanged(self):
+        self.assertEqual(delta.diff(self.raid, copy.deepcopy(self.raid)), [])
+
+    def test_single_drive_change(self):
+        new = copy.deepcopy(self.raid)
+        new[0]['configuration']['unassigned'][100]['status'] = 'Failed'
+
+        ops = delta.diff(self.raid, new, ['raid'])
+        self.assertEqual(ops, [{
+            'op': 'replace',
+            'path': ['raid', 0, 'configuration', 'unassigned', 100, 'status'],
+            'value': 'Failed'}])
+        self.assertEqual(delta.to_update(ops, {'raid': new}),
+                         {'raid.0.configuration.unassigned.100.status':
+                          'Failed'})
+
+    def test_list_matched_by_identity(self):
+        old = [{'devname': 'sda', 'size': 1}, {'devname': 'sdb', 'size': 2},
+               {'devname': 'sdc', 'size': 3}]
+        new = [{'devname': 'sda', 'size': 1}, {'devname': 'sdc', 'size': 4},
+               {'devname': 'sdd', 'size': 5}]
+
+        ops = delta.diff(old, new, ['os_storage'])
+        self.assertEqual(ops, [
+            {'op': 'remove', 'path': ['os_storage', 1]},
+            {'op': 'add', 'path': ['os_storage', 2],
+             'value': {'devname': 'sdd', 'size': 5}},
+            {'op': 'replace', 'path': ['os_storage', 1, 'size'], 'value': 4}
+        ])
+        # $set cannot insert into a list, the list is replaced once
+        self.assertEqual(delta.to_update(ops, {'os_storage': new}),
+                         {'os_storage': new})
+
+    def test_reordered_list_is_replaced(self):
+        old = [{'slot': '0000:00:01.0'}, {'slot': '0000:00:02.0'}]
+        new = list(reversed(old))
+        self.assertEqual(delta.diff(old, new),
+                         [{'op': 'replace', 'path': [], 'value': new}])
+
+    def test_removed_key_sets_parent(self):
+        old = {'dmi': {'sys_vendor': 'HP', 'product_name': 'DL360'}}
+        new = {'dmi': {'sys_vendor': 'HP'}}
+        ops = delta.diff(old, new)
+        self.assertEqual(ops, [{'op': 'remove',
+                                'path': ['dmi', 'product_name']}])
+        self.assertEqual(delta.to_update(ops, new),
+                         {'dmi': {'sys_vendor': 'HP'}})
+
+    def test_unsafe_field_names(self):
+        old = {'lldp': {'eth0.100': {'switch': 'a'}}}
+        new = {'lldp': {'eth0.100': {'switch': 'b'}}}
+        self.assertEqual(delta.to_update(delta.diff(old, new), new),
+                         {'lldp': new['lldp']})
@@ -0,0 +1,168 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.inspect"""
+
+import mock
+
+from mercury_agent.inspector import inspect
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeInspector(object):
+    def __init__(self, value, fingerprint=None, requires=None):
+        self.value = value
+        self.calls = 0
+        self.fingerprint = fingerprint
+        self.requires = requires
+        self.subsystems = []
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.value
+
+
+class TestIncrementalInspection(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestIncrementalInspection, self).setUp()
+        self.fp = {'dmi': 'a', 'pci': 'b'}
+        self.dmi = FakeInspector({'sys_vendor': 'Dell Inc.'},
+                                 fingerprint=lambda: self.fp['dmi'])
+        self.pci = FakeInspector([], fingerprint=lambda: self.fp['pci'])
+        self.mem = FakeInspector({})
+        self.health = FakeInspector({'errors': []},
+                                    fingerprint=lambda: 'static',
+                                    requires=['dmi'])
+
+        patches = [
+            mock.patch.object(inspect, 'inspectors', [
+                ('dmi', self.dmi), ('pci', self.pci), ('mem', self.mem)]),
+            mock.patch.object(inspect, 'late_inspectors', [
+                ('system_health', self.health)]),
+            mock.patch.object(inspect, 'registered_drivers', []),
+            mock.patch.object(inspect, 'generate_mercury_id',
+                              mock.Mock(return_value='01abc')),
+            mock.patch.dict(inspect.global_device_info, clear=True),
+            mock.patch.dict(inspect.global_fingerprints, clear=True)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_unchanged_fingerprints_are_reused(self):
+        inspect.inspect()
+        device_info = inspect.inspect(incremental=True)
+
+        self.assertEqual(self.dmi.calls, 1)
+        self.assertEqual(self.pci.calls, 1)
+        self.assertEqual(self.health.calls, 1)
+        # Inspectors without a fingerprint are always run
+        self.assertEqual(self.mem.calls, 2)
+        self.assertEqual(
+            sorted(device_info[inspect.instrumentation.STATS_KEY]['reused']),
+            ['dmi', 'pci', 'system_health'])
+        self.assertEqual(device_info['dmi'], {'sys_vendor': 'Dell Inc.'})
+
+    def test_changed_fingerprints_are_run(self):
+        inspect.inspect()
+        self.fp['dmi'] = 'changed'
+        inspect.inspect(incremental=True)
+
+        self.assertEqual(self.dmi.calls, 2)
+        self.assertEqual(self.pci.calls, 1)
+        # health reads dmi, which was run again
+        self.assertEqual(self.health.calls, 2)
+
+    def test_full_inspection_ignores_fingerprints(self):
+        inspect.inspect()
+        inspect.inspect()
+        self.assertEqual(self.dmi.calls, 2)
+
+    def test_failed_inspector_is_not_reused(self):
+        self.pci.value = None
+        inspect.inspect()
+        self.pci.value = []
+        inspect.inspect(incremental=True)
+        self.assertEqual(self.pci.calls, 2)
+
+
+class TestSelectiveInspection(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestSelectiveInspection, self).setUp()
+        self.dmi = FakeInspector({'sys_vendor': 'Dell Inc.'})
+        self.pci = FakeInspector([{'slot': '02:00.0', 'class_id': '0104',
+                                   'vendor_id': '1000', 'device_id': '005d',
+                                   'driver': 'megaraid_sas'}])
+        self.os_storage = FakeInspector([{'devname': 'sda'}])
+        self.raid = FakeInspector([], requires=[])
+        self.raid.subsystems = ['raid']
+        self.health = FakeInspector({}, requires=['dmi'])
+
+        self.raid_driver = mock.Mock(wants='pci')
+        self.raid_driver.probe.return_value = None
+        self.bmc_driver = mock.Mock(wants='dmi')
+        self.bmc_driver.probe.return_value = None
+
+        patches = [
+            mock.patch.object(inspect, 'inspectors', [
+                ('dmi', self.dmi), ('pci', self.pci),
+                ('os_storage', self.os_storage)]),
+            mock.patch.object(inspect, 'late_inspectors', [
+                ('raid', self.raid), ('system_health', self.health)]),
+            mock.patch.object(inspect, 'registered_drivers', [
+                {'name': 'megaraid_sas', 'class': self.raid_driver,
+                 'driver_type': 'raid', 'wants': 'pci'},
+                {'name': 'drac', 'class': self.bmc_driver,
+                 'driver_type': 'bmc', 'wants': 'dmi'}]),
+            mock.patch.object(inspect, 'generate_mercury_id',
+                              mock.Mock(return_value='01abc')),
+            mock.patch.dict(inspect.global_device_info, clear=True),
+            mock.patch.dict(inspect.global_fingerprints, clear=True)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_only_selected_and_requirements(self):
+        inspect.global_device_info['dmi'] = {'sys_vendor': 'HP'}
+        device_info = inspect.inspect(only=['os_storage', 'raid'])
+
+        self.assertEqual(self.os_storage.calls, 1)
+        self.assertEqual(self.raid.calls, 1)
+        # raid requires the megaraid_sas probe, which wants pci
+        self.assertEqual(self.pci.calls, 1)
+        self.raid_driver.probe.assert_called_once_with(mock.ANY)
+        pci_bus = self.raid_driver.probe.call_args[0][0]
+        self.assertEqual(pci_bus.get_devices_by_driver('megaraid_sas'),
+                         [pci_bus.get_device('02:00.0')])
+        self.assertEqual(self.dmi.calls, 0)
+        self.assertEqual(self.health.calls, 0)
+        self.bmc_driver.probe.assert_not_called()
+
+        # Sections which were not inspected are untouched
+        self.assertEqual(device_info['dmi'], {'sys_vendor': 'HP'})
+        inspect.generate_mercury_id.assert_called_with(
+            {'sys_vendor': 'HP'}, {})
+
+    def test_subsystems(self):
+        inspect.inspect(only=[], subsystems=['bmc'])
+        self.assertEqual(self.dmi.calls, 1)
+        self.bmc_driver.probe.assert_called_once_with(
+            {'sys_vendor': 'Dell Inc.'})
+        self.assertEqual(self.pci.calls, 0)
+        self.raid_driver.probe.assert_not_called()
+
+    def test_unknown_inspector(self):
+        self.assertRaises(inspect.MercuryUserError, inspect.inspect,
+                          only=['disks'])
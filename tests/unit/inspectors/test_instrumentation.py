@@ -0,0 +1,65 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.instrumentation"""
+
+import subprocess
+import sys
+
+import pytest
+
+from mercury_agent.inspector import instrumentation
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class TestInstrumentation(MercuryAgentUnitTest):
+    def tearDown(self):
+        instrumentation.end()
+
+    def test_measure_records_in_active_collection(self):
+        stats = instrumentation.begin()
+        with instrumentation.measure('inspectors', 'cpu'):
+            sum(range(1000))
+
+        self.assertIn('cpu', stats['inspectors'])
+        result = stats['inspectors']['cpu']
+        self.assertGreaterEqual(result['wall_time'], 0)
+        self.assertGreaterEqual(result['cpu_time'], 0)
+
+        ended = instrumentation.end()
+        self.assertIs(ended, stats)
+        self.assertIsNotNone(ended['wall_time'])
+        self.assertNotIn('_start', ended)
+
+    def test_measure_without_collection(self):
+        with instrumentation.measure('drivers', 'noop') as m:
+            pass
+        self.assertIsNotNone(m.result)
+        self.assertIsNone(instrumentation.end())
+
+    @pytest.mark.skipif(not hasattr(sys, 'addaudithook'),
+                        reason='audit hooks require python 3.8')
+    def test_processes_are_counted(self):
+        with instrumentation.measure('inspectors', 'spawner') as m:
+            subprocess.Popen(['true']).wait()
+            subprocess.Popen(['true']).wait()
+        self.assertEqual(m.result['processes'], 2)
+
+    @pytest.mark.skipif(not hasattr(sys, 'addaudithook'),
+                        reason='audit hooks require python 3.8')
+    def test_posix_spawn_is_counted_once(self):
+        # close_fds=False lets Popen use os.posix_spawn where available
+        with instrumentation.measure('inspectors', 'spawner') as m:
+            subprocess.Popen(['/bin/true'], close_fds=False).wait()
+        self.assertEqual(m.result['processes'], 1)
@@ -0,0 +1,82 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for the os_storage inspector"""
+
+import mock
+
+from press.helpers import parted
+
+from mercury_agent.inspector.inspectors import os_storage
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def device_info(devname, label='gpt'):
+    return {'model': 'ATA INTEL SSDSC2BB48 (scsi)', 'device': devname,
+            'size': 480103981056,
+            'sector_size': {'logical': 512, 'physical': 4096},
+            'partition_table': label, 'disk_flags': ''}
+
+
+class TestOSStorage(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestOSStorage, self).setUp()
+        self.read_device_info = mock.patch.object(
+            os_storage.partition_table, 'read_device_info',
+            side_effect=device_info).start()
+        self.parted = mock.patch.object(parted, 'PartedInterface').start()
+        mock.patch.object(os_storage, 'get_disk_type',
+                          return_value='ssd').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_native(self):
+        self.assertEqual(os_storage.probe_device_info('/dev/sda'),
+                         device_info('/dev/sda'))
+        self.assertFalse(self.parted.called)
+
+    def test_parted_fallback(self):
+        self.read_device_info.side_effect = [None, OSError(13, 'denied')]
+        self.parted.return_value.device_info = device_info('/dev/sda', 'loop')
+        self.assertEqual(os_storage.probe_device_info('/dev/sda')[
+            'partition_table'], 'loop')
+        self.assertEqual(os_storage.probe_device_info('/dev/sda')[
+            'partition_table'], 'loop')
+        self.assertEqual(self.parted.call_count, 2)
+
+        self.parted.side_effect = parted.PartedException('Got root?')
+        self.read_device_info.side_effect = None
+        self.read_device_info.return_value = None
+        self.assertEqual(os_storage.probe_device_info('/dev/sda'), {})
+
+    def test_inspector(self):
+        devices = [{'DEVNAME': '/dev/sd{}'.format(chr(ord('a') + i)),
+                    'ID_BUS': 'ata'} for i in range(40)]
+        devices[3]['ID_BUS'] = 'fc'
+        # The udev properties of an unreadable disk are still reported
+        self.read_device_info.side_effect = \
+            lambda devname: None if devname == '/dev/sdc' else \
+            device_info(devname)
+        self.parted.side_effect = parted.PartedException('Got root?')
+
+        snapshot = mock.Mock()
+        snapshot.get_storage_devices.return_value = devices
+        with mock.patch.object(os_storage.udev, 'get_snapshot',
+                               return_value=snapshot):
+            result = os_storage.os_storage_inspector()
+
+        self.assertEqual([entry['udev']['DEVNAME'] for entry in result],
+                         [device['DEVNAME'] for device in devices])
+        self.assertEqual(result[0]['size'], 480103981056)
+        self.assertEqual(result[2], {'udev': devices[2], 'media_type': 'ssd'})
+        self.assertEqual(result[3]['media_type'], 'external')
@@ -0,0 +1,183 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.scheduler"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from mercury_agent.inspector.scheduler import (
+    InspectionScheduler, bind_to_task, map_on_threads)
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class TestInspectionScheduler(MercuryAgentUnitTest):
+    def test_requirements_are_respected(self):
+        order = []
+        scheduler = InspectionScheduler(max_workers=4)
+
+        def make(name, value):
+            def target(collected):
+                order.append(name)
+                return value
+            return target
+
+        scheduler.add_task('late', lambda c: c['pci'] + 1,
+                           requires=['pci', 'probe'], provides='late')
+        scheduler.add_task('probe', make('probe', None), requires=['pci'])
+        scheduler.add_task('pci', make('pci', 1), provides='pci')
+
+        collected = scheduler.run()
+
+        self.assertEqual(collected['pci'], 1)
+        self.assertEqual(collected['late'], 2)
+        self.assertLess(order.index('pci'), order.index('probe'))
+
+    def test_independent_tasks_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        scheduler = InspectionScheduler(max_workers=3)
+
+        for name in ('a', 'b', 'c'):
+            # Each task waits on the others, this deadlocks (and times out)
+            # if tasks are run serially
+            scheduler.add_task(name, lambda c: barrier.wait() >= 0,
+                               provides=name)
+
+        collected = scheduler.run()
+        self.assertEqual(collected, {'a': True, 'b': True, 'c': True})
+
+    def test_failed_task_does_not_block(self):
+        scheduler = InspectionScheduler()
+
+        def bad(collected):
+            raise Exception('boom')
+
+        scheduler.add_task('bad', bad, provides='bad')
+        scheduler.add_task('after', lambda c: 'ok', requires=['bad'],
+                           provides='after')
+
+        collected = scheduler.run()
+        self.assertIsNone(collected['bad'])
+        self.assertEqual(collected['after'], 'ok')
+
+    def test_unknown_and_circular_requirements(self):
+        scheduler = InspectionScheduler()
+        scheduler.add_task('typo', lambda c: 1, requires=['nope'],
+                           provides='typo')
+        scheduler.add_task('x', lambda c: 1, requires=['y'], provides='x')
+        scheduler.add_task('y', lambda c: 1, requires=['x'], provides='y')
+
+        start = time.time()
+        collected = scheduler.run()
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(collected, {'typo': 1})
+
+    def test_duplicate_task(self):
+        scheduler = InspectionScheduler()
+        scheduler.add_task('a', lambda c: 1)
+        self.assertRaises(ValueError, scheduler.add_task, 'a', lambda c: 1)
+
+    def test_timeout_records_partial_results(self):
+        release = threading.Event()
+        scheduler = InspectionScheduler()
+        scheduler.add_task('hung', lambda c: release.wait(30),
+                           provides='hung', timeout=0.2)
+        scheduler.add_task('fast', lambda c: 'ok', provides='fast',
+                           timeout=0.2)
+        scheduler.add_task('after', lambda c: c['hung'], requires=['hung'],
+                           provides='after')
+
+        start = time.time()
+        collected = scheduler.run()
+        release.set()
+
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(collected, {'hung': None, 'fast': 'ok',
+                                     'after': None})
+        self.assertEqual(scheduler.timed_out, ['hung'])
+
+    @pytest.mark.skipif(not hasattr(threading, 'get_native_id') or
+                        not os.path.exists('/proc/self/task'),
+                        reason='requires linux and python 3.8')
+    def test_timeout_kills_child_processes(self):
+        procs = []
+
+        def spawn(collected):
+            p = subprocess.Popen([sys.executable, '-c',
+                                  'import time; time.sleep(30)'])
+            procs.append(p)
+            return p.wait()
+
+        scheduler = InspectionScheduler()
+        scheduler.add_task('spawner', spawn, provides='spawner', timeout=0.5)
+        collected = scheduler.run()
+
+        self.assertIsNone(collected['spawner'])
+        self.assertEqual(procs[0].wait(5), -9)
+
+    @pytest.mark.skipif(not hasattr(threading, 'get_native_id') or
+                        not os.path.exists('/proc/self/task'),
+                        reason='requires linux and python 3.8')
+    def test_timeout_kills_helper_thread_processes(self):
+        procs = []
+
+        def spawn(_):
+            p = subprocess.Popen([sys.executable, '-c',
+                                  'import time; time.sleep(30)'])
+            procs.append(p)
+            return p.wait()
+
+        def fan_out(collected):
+            return map_on_threads(spawn, range(2), 2)
+
+        scheduler = InspectionScheduler()
+        scheduler.add_task('fan_out', fan_out, provides='fan_out',
+                           timeout=0.5)
+        collected = scheduler.run()
+
+        self.assertIsNone(collected['fan_out'])
+        self.assertEqual([p.wait(5) for p in procs], [-9, -9])
+
+    def test_bind_outside_of_a_task(self):
+        self.assertIs(bind_to_task(len), len)
+
+    def test_map_on_threads(self):
+        barrier = threading.Barrier(2, timeout=5)
+        threads = []
+
+        def square(value):
+            threads.append(threading.current_thread())
+            if value < 2:
+                # Deadlocks (and times out) unless items run side by side
+                barrier.wait()
+            return value * value
+
+        self.assertEqual(map_on_threads(square, range(5), 2),
+                         [0, 1, 4, 9, 16])
+        self.assertTrue(all(thread.daemon for thread in threads))
+        self.assertEqual(map_on_threads(square, [], 2), [])
+
+        def fail(value):
+            if value in (1, 3):
+                raise ValueError(value)
+            return value
+
+        with pytest.raises(ValueError) as raised:
+            map_on_threads(fail, range(4), 4)
+        self.assertEqual(raised.value.args, (1,))
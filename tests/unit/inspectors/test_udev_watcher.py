@@ -0,0 +1,179 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for the udev watcher"""
+
+import time
+
+import mock
+
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.inspectors.async_inspectors import udev_watcher
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def _device(subsystem, sys_name, action, device_type=None, **properties):
+    device = mock.MagicMock()
+    device.subsystem = subsystem
+    device.sys_name = sys_name
+    device.sys_path = '/sys/class/{}/{}'.format(subsystem, sys_name)
+    device.action = action
+    device.device_type = device_type
+    device.get.side_effect = properties.get
+    return device
+
+
+class FakeMonitor(object):
+    def __init__(self, watcher, events):
+        self.watcher = watcher
+        self.events = list(events)
+
+    def filter_by(self, subsystem):
+        pass
+
+    def start(self):
+        pass
+
+    def poll(self, timeout=None):
+        if self.events:
+            event = self.events.pop(0)
+            if isinstance(event, Exception):
+                raise event
+            return event
+        if not self.watcher.pending_flushed:
+            time.sleep(timeout)
+            return None
+        self.watcher.cleanup()
+
+
+class TestUDevWatcher(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestUDevWatcher, self).setUp()
+        patches = [
+            mock.patch.dict(inspect.global_device_info, clear=True),
+            mock.patch.object(udev_watcher, 'backend_client'),
+            mock.patch.object(udev_watcher, 'inspect_storage_device',
+                              lambda d: {'udev': {'DEVNAME': d.get('DEVNAME')},
+                                         'size': 1}),
+            mock.patch.object(udev_watcher, 'inspect_interface',
+                              lambda n, d, g: {'devname': n, 'carrier': True}),
+            mock.patch.object(udev_watcher, '_is_ethernet', lambda d: True),
+            mock.patch.object(udev_watcher.rtnetlink, 'dump',
+                              lambda: None),
+            mock.patch.object(udev_watcher.UDevHelper,
+                              'is_valid_storage_device', lambda d: True)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        inspect.global_device_info.update({
+            'mercury_id': '01abc',
+            'os_storage': [{'udev': {'DEVNAME': '/dev/sda'}, 'size': 1},
+                           {'udev': {'DEVNAME': '/dev/sdb'}, 'size': 1}],
+            'interfaces': [{'devname': 'eth0', 'carrier': False}]
+        })
+
+    def test_process(self):
+        watcher = udev_watcher.UDevWatcher(monitor=mock.Mock())
+        sdb = _device('block', 'sdb', 'remove', 'disk', DEVNAME='/dev/sdb')
+        sdc = _device('block', 'sdc', 'add', 'disk', DEVNAME='/dev/sdc')
+        eth0 = _device('net', 'eth0', 'change')
+
+        watcher.process({('block', 'sdb'): ('remove', sdb),
+                         ('block', 'sdc'): ('add', sdc),
+                         ('net', 'eth0'): ('change', eth0)})
+
+        self.assertEqual(inspect.global_device_info['os_storage'], [
+            {'udev': {'DEVNAME': '/dev/sda'}, 'size': 1},
+            {'udev': {'DEVNAME': '/dev/sdc'}, 'size': 1}])
+        self.assertEqual(inspect.global_device_info['interfaces'],
+                         [{'devname': 'eth0', 'carrier': True}])
+        udev_watcher.backend_client.update_inventory.assert_called_once_with(
+            '01abc', {
+                'os_storage': inspect.global_device_info['os_storage'],
+                'interfaces': inspect.global_device_info['interfaces']})
+
+    def test_partition_events_are_debounced(self):
+        sdb = _device('block', 'sdb', 'change', 'disk', DEVNAME='/dev/sdb')
+        partitions = []
+        for number in range(1, 4):
+            partition = _device('block', 'sdb{}'.format(number), 'add',
+                                'partition')
+            partition.find_parent.return_value = sdb
+            partitions.append(partition)
+
+        watcher = udev_watcher.UDevWatcher(debounce=0.05, monitor=mock.Mock())
+        watcher.pending_flushed = False
+        watcher.monitor = FakeMonitor(watcher, partitions)
+
+        processed = []
+
+        def process(events):
+            processed.append(events)
+            watcher.pending_flushed = True
+
+        watcher.process = process
+        watcher.watch()
+
+        self.assertEqual(len(processed), 1)
+        self.assertEqual(processed[0], {('block', 'sdb'): ('change', sdb)})
+
+    def test_rename_removes_old_name(self):
+        ens1 = _device('net', 'ens1', 'move', INTERFACE_OLD='eth0',
+                       DEVPATH_OLD='/devices/pci0000:00/net/eth0')
+        events = dict(udev_watcher.UDevWatcher.event_keys(ens1))
+        self.assertEqual(events, {('net', 'ens1'): ('move', ens1),
+                                  ('net', 'eth0'): ('remove', ens1)})
+
+        watcher = udev_watcher.UDevWatcher(monitor=mock.Mock())
+        watcher.process(events)
+        self.assertEqual(inspect.global_device_info['interfaces'],
+                         [{'devname': 'ens1', 'carrier': True}])
+
+    def test_rename_without_interface_old(self):
+        ens1 = _device('net', 'ens1', 'move',
+                       DEVPATH_OLD='/devices/pci0000:00/net/eth0')
+        self.assertIn((('net', 'eth0'), ('remove', ens1)),
+                      udev_watcher.UDevWatcher.event_keys(ens1))
+
+    def test_process_errors_are_logged(self):
+        watcher = udev_watcher.UDevWatcher(monitor=mock.Mock())
+        eth0 = _device('net', 'eth0', 'change')
+        with mock.patch.object(udev_watcher.rtnetlink, 'dump',
+                               side_effect=OSError('netlink')), \
+                mock.patch.object(udev_watcher.log, 'error') as error:
+            watcher.process({('net', 'eth0'): ('change', eth0)})
+        self.assertTrue(error.called)
+        udev_watcher.backend_client.update_inventory.assert_not_called()
+
+    def test_watch_survives_poll_errors(self):
+        sdb = _device('block', 'sdb', 'change', 'disk', DEVNAME='/dev/sdb')
+        watcher = udev_watcher.UDevWatcher(debounce=0.01, monitor=mock.Mock())
+        watcher.pending_flushed = False
+        watcher.monitor = FakeMonitor(watcher, [OSError('poll'), sdb])
+
+        processed = []
+
+        def process(events):
+            processed.append(events)
+            watcher.pending_flushed = True
+
+        watcher.process = process
+        with mock.patch.object(udev_watcher, 'POLL_INTERVAL', 0.01), \
+                mock.patch.object(udev_watcher.log, 'error') as error:
+            watcher.watch()
+
+        self.assertTrue(error.called)
+        self.assertEqual(processed, [{('block', 'sdb'): ('change', sdb)}])
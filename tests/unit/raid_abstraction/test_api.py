@@ -16,17 +16,21 @@
 import json
 import os
 
+import mock
+
+from mercury_agent.hardware.raid.abstraction import api
 from mercury_agent.hardware.raid.abstraction.api import (
     RAIDAbstractionException,
     RAIDActions,
+    invalidates_snapshots,
 )
 
 from ..base import MercuryAgentUnitTest
 
 
 class DummyImplementation(RAIDActions):
-    def __init__(self):
-        super(DummyImplementation, self).__init__()
+    def __init__(self, **kwargs):
+        super(DummyImplementation, self).__init__(**kwargs)
 
         with open(os.path.join(os.path.dirname(__file__), '../resources/dummy.json')) as fp:
             self.dummy_data = json.load(fp)
@@ -40,6 +44,7 @@ class DummyImplementation(RAIDActions):
     def create(self, adapter, level, drives=None, size=None, array=None):
         return True
 
+    @invalidates_snapshots
     def delete_logical_drive(self, adapter, array, ld):
         return True
 
@@ -129,6 +134,15 @@ class MercuryRAIDAbstractionAPITest(MercuryAgentUnitTest):
         for args in test_exception_args:
             self.assertRaises(RAIDAbstractionException, self.dummy.create_logical_drive, *args)
 
+    def test_create_logical_drives(self):
+        self.assertEqual(self.dummy.create_logical_drives(0, '9-11'),
+                         [True, True, True])
+        self.assertEqual(self.dummy.create_logical_drives(0, []), [])
+
+        # One of the unassigned drives is marked FAILED
+        self.assertRaises(RAIDAbstractionException,
+                          self.dummy.create_logical_drives, 0)
+
     def test_abstract(self):
         # Silly tests for 'coverage'
         self.assertRaises(NotImplementedError, self.abstract.transform_adapter_info, *(0, ))
@@ -150,3 +164,62 @@ class MercuryRAIDAbstractionAPITest(MercuryAgentUnitTest):
         drives = self.dummy.get_all_drives(0)
         for idx in range(len(drives)):
             assert idx == drives[idx]['index']
+
+
+class MercuryRAIDSnapshotTest(MercuryAgentUnitTest):
+    def setUp(self):
+        super(MercuryRAIDSnapshotTest, self).setUp()
+        self.dummy = DummyImplementation()
+        self.transform = mock.patch.object(
+            self.dummy, 'transform_adapter_info',
+            wraps=self.dummy.transform_adapter_info).start()
+        self.monotonic = mock.patch.object(api.time, 'monotonic',
+                                           return_value=1000.0).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_single_read_per_operation(self):
+        self.dummy.create_logical_drive(adapter=0, level='0', drives='9-11',
+                                        size='10%FREE')
+        self.dummy.create_logical_drive(adapter=0, level='0', drives=9)
+        self.assertEqual(self.transform.call_count, 1)
+
+        self.dummy.get_adapter_info(1)
+        self.assertEqual(self.transform.call_count, 2)
+
+    def test_copies(self):
+        self.dummy.get_adapter_info(0)['configuration']['unassigned'] = []
+        self.assertTrue(
+            self.dummy.get_adapter_info(0)['configuration']['unassigned'])
+
+    def test_invalidated_by_mutation(self):
+        self.dummy.get_adapter_info(0)
+        self.dummy.delete_logical_drive(0, 0, 0)
+        self.dummy.get_adapter_info(0)
+        self.assertEqual(self.transform.call_count, 2)
+
+    def test_ttl(self):
+        self.dummy.get_adapter_info(0)
+        self.monotonic.return_value += api.DEFAULT_SNAPSHOT_TTL - 1
+        self.dummy.get_adapter_info(0)
+        self.assertEqual(self.transform.call_count, 1)
+
+        self.monotonic.return_value += 1
+        self.dummy.get_adapter_info(0)
+        self.assertEqual(self.transform.call_count, 2)
+
+        self.dummy.snapshot_ttl = 0
+        self.dummy.invalidate()
+        self.dummy.get_adapter_info(0)
+        self.dummy.get_adapter_info(0)
+        self.assertEqual(self.transform.call_count, 4)
+
+    def test_changed_during_read(self):
+        def transform(adapter_index):
+            self.dummy.invalidate()
+            return DummyImplementation.transform_adapter_info(self.dummy,
+                                                              adapter_index)
+
+        self.transform.side_effect = transform
+        self.dummy.get_adapter_info(0)
+        self.dummy.get_adapter_info(0)
+        self.assertEqual(self.transform.call_count, 2)
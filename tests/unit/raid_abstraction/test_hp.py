@@ -161,6 +161,11 @@ class MercurySmartArrayActionsTest(MercuryAgentUnitTest):
         assert self.dummy_actions.create_logical_drive(0, '10', [10, 11, 12, 13], size='10GiB')
         assert self.dummy_actions.create_logical_drive(0, '6', array=0)
 
+    def test_create_logical_drives(self):
+        self.assertEqual(self.dummy_actions.create_logical_drives(0, [10, 11]), [True])
+        self.dummy_actions.hpssa.create.assert_called_once_with(
+            0, selection='1I:1:11,1I:1:12', raid='0', array_type='arrayr0')
+
     def test_delete_logical_drive(self):
         assert self.dummy_actions.delete_logical_drive(0, 0, 0)
         self.assertRaises(RAIDAbstractionException, self.dummy_actions.delete_logical_drive, *(0, 0, 100))
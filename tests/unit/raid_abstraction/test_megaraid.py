@@ -53,6 +53,11 @@ class DummyMegaRAIDActions(MegaRAIDActions):
 
         self.storcli.get_disk_group = get_storcli_dall_show
 
+        # Follows get_disk_group when tests replace it
+        self.storcli.get_inventory = lambda: [
+            (controller, self.storcli.get_disk_group(idx)[0])
+            for idx, controller in enumerate(self.storcli.controllers)]
+
 
 class TestMegaRAIDActions(MercuryAgentUnitTest):
     """ MegaRAIDActions Test Case """
@@ -235,6 +240,75 @@ class TestMegaRAIDActions(MercuryAgentUnitTest):
         self.assertRaises(RAIDAbstractionException, new_dummy_actions.create,
                           *(adapter_info, 0, drives))
 
+    def test_create_logical_drive_reads_once(self):
+        """ The adapter is read once per operation """
+        dg_info = get_storcli_dall_show(0)
+
+        for drive in dg_info[0]['UN-CONFIGURED DRIVE LIST']:
+            drive['State'] = 'UGood'
+            drive['DG'] = '-'
+
+        new_dummy_actions = DummyMegaRAIDActions()
+        new_dummy_actions.storcli.get_disk_group = mock.Mock()
+        new_dummy_actions.storcli.get_disk_group.return_value = dg_info
+
+        new_dummy_actions.create_logical_drive(0, '0', drives='unassigned')
+        self.assertEqual(new_dummy_actions.storcli.get_disk_group.call_count,
+                         1)
+        self.assertEqual(new_dummy_actions.storcli.add.call_count, 1)
+
+        # The new array is visible to the next operation
+        new_dummy_actions.get_adapter_info(0)
+        self.assertEqual(new_dummy_actions.storcli.get_disk_group.call_count,
+                         2)
+
+    def test_transform_adapters(self):
+        """ All controllers are read and cached together """
+        controllers = get_controllers() + get_controllers()
+        controllers[1]['Basics']['Model'] = 'PERC H730 Mini'
+        self.dummy_actions.storcli.controllers = controllers
+        self.dummy_actions.storcli.get_disk_group = mock.Mock(
+            side_effect=get_storcli_dall_show)
+
+        self.assertEqual(self.dummy_actions.get_adapter_info(1)['name'],
+                         'PERC H730 Mini')
+        self.assertEqual(self.dummy_actions.get_adapter_info(0)['name'],
+                         'PERC 6/i Integrated')
+        self.assertEqual(
+            self.dummy_actions.storcli.get_disk_group.call_count, 2)
+
+        self.assertRaises(RAIDAbstractionException,
+                          self.dummy_actions.get_adapter_info, 2)
+
+    def test_create_logical_drives(self):
+        """ One storcli command per enclosure """
+        dg_info = get_storcli_dall_show(0)
+
+        unconfigured = dg_info[0]['UN-CONFIGURED DRIVE LIST']
+        template = unconfigured.pop()
+        for did, address in enumerate(['32:4', '32:5', '33:0', '32:6']):
+            drive = dict(template, State='UGood', DG='-')
+            drive['EID:Slt'] = address
+            drive['DID'] = 10 + did
+            unconfigured.append(drive)
+
+        new_dummy_actions = DummyMegaRAIDActions()
+        new_dummy_actions.storcli.get_disk_group = mock.Mock()
+        new_dummy_actions.storcli.get_disk_group.return_value = dg_info
+
+        new_dummy_actions.create_logical_drives(0)
+        self.assertEqual(new_dummy_actions.storcli.add.call_args_list, [
+            mock.call(controller=0, array_type='r0', drives='32:4,5,6',
+                      each=True),
+            mock.call(controller=0, array_type='r0', drives='33:0',
+                      each=True)])
+        self.assertEqual(new_dummy_actions.storcli.get_disk_group.call_count,
+                         1)
+
+        unconfigured[0]['State'] = 'UBad'
+        self.assertRaises(RAIDAbstractionException,
+                          new_dummy_actions.create_logical_drives, *(0, [3]))
+
     def test_delete_logical_drive(self):
         """ Test delete_logical_drive implementation """
         self.dummy_actions.storcli.delete = mock.Mock()
@@ -318,17 +392,25 @@ class MercuryMegaRaidDSDriverTest(MercuryAgentUnitTest):
     def test_probe(self):
         self.assertEqual(MegaRaidSASDriver.probe(self.pci_data), ['02:00.0'])
 
+    def test_probe_unbound(self):
+        del self.pci_data[0]['driver']
+        self.assertEqual(MegaRaidSASDriver.probe(self.pci_data), [])
+
     @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
     @mock.patch('mercury_agent.hardware.drivers.megaraid.get_configuration')
     def test_inspect(self, mock_cli, mock_get_configuration):
         driver = MegaRaidSASDriver(['02:00.0'])
-        driver.handler = mock.Mock()
-        driver.handler.get_adapter_info = mock.Mock()
+        driver.handler = DummyMegaRAIDActions()
+        driver.handler.storcli.get_disk_group = mock.Mock(
+            side_effect=get_storcli_dall_show)
 
         mock_cli.run.return_value = CLIResult('', '', 0)
         mock_cli.find_in_path.return_value = '/sbin/storcli64'
         mock_get_configuration.return_value = {}
 
-        driver.inspect()
+        adapters = driver.inspect()
+        self.assertEqual([a['name'] for a in adapters], ['PERC 6/i Integrated'])
 
-        driver.handler.get_adapter_info.assert_called_with(0)
+        # Reads again, even though the adapter is cached
+        driver.inspect()
+        self.assertEqual(driver.handler.storcli.get_disk_group.call_count, 2)
@@ -0,0 +1,93 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.hardware.raid.abstraction.model"""
+
+from mercury_agent.hardware.raid.abstraction.model import Adapter
+
+from ..base import MercuryAgentUnitTest
+
+
+def drive(address, status='OK', **extra):
+    extra['address'] = address
+    return dict(size=100, status=status, type='HDD', extra=extra)
+
+
+def adapter_info():
+    return {
+        'name': 'PERC H730 Mini',
+        'provider': 'megaraid',
+        'vendor_info': {'general': {'Controller': 0}},
+        'configuration': {
+            'arrays': [{
+                'logical_drives': [{'level': 1, 'size': 100, 'status': 'OK',
+                                    'extra': {'disk_group': 0}}],
+                'physical_drives': [drive('32:1'), drive('32:0')],
+                'free_space': 0,
+                'extra': {'disk_group': 0}
+            }],
+            'spares': [dict(drive('32:4'), target=0)],
+            'unassigned': [drive('32:3', 'Failed'), drive('32:2')]
+        }
+    }
+
+
+def sort_drives(drives):
+    drives.sort(key=lambda d: d['extra']['address'])
+
+
+def address(d):
+    return d['extra']['address']
+
+
+class AdapterModelTest(MercuryAgentUnitTest):
+    def setUp(self):
+        super(AdapterModelTest, self).setUp()
+        self.adapter = Adapter.from_dict(adapter_info(), sort_drives, address)
+
+    def test_indexes(self):
+        self.assertEqual([d.address for d in self.adapter.drives],
+                         ['32:0', '32:1', '32:2', '32:3', '32:4'])
+        self.assertEqual(self.adapter.get_drive(3).address, '32:3')
+        self.assertIsNone(self.adapter.get_drive(5))
+        self.assertEqual(self.adapter.get_drive_by_address('32:1').member_of,
+                         0)
+        self.assertEqual(
+            [d.index for d in self.adapter.get_drives_by_status('Failed')],
+            [3])
+        self.assertEqual([d.index for d in self.adapter.get_available()],
+                         [2, 3])
+        self.assertEqual(self.adapter.total_size, 500)
+        self.assertEqual(self.adapter.total_drives, 5)
+
+    def test_to_dict(self):
+        info = self.adapter.to_dict()
+        configuration = info['configuration']
+        self.assertEqual(configuration['arrays'][0]['physical_drives'][0],
+                         dict(drive('32:1'), index=1, member_of=0))
+        self.assertEqual(configuration['spares'],
+                         [dict(drive('32:4'), index=4, target=0)])
+        self.assertEqual([d['index'] for d in configuration['unassigned']],
+                         [3, 2])
+        self.assertEqual(info['vendor_info'], {'general': {'Controller': 0}})
+        self.assertEqual((info['total_size'], info['total_drives']),
+                         (500, 5))
+
+        # Serialized copies do not change the model
+        configuration['unassigned'][0]['extra']['address'] = '99:0'
+        self.assertEqual(self.adapter.get_drive(3).extra['address'], '32:3')
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.adapter.drives[0].member = 1
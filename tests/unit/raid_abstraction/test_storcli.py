@@ -75,6 +75,12 @@ class StorcliTest(MercuryAgentUnitTest):
         self.assertRaises(storcli.StorcliException, s.add,
                           *(0, 'r10', '32:0-3'))
 
+        s.add(0, 'r0', '32:0,1,5', each=True)
+        self.assertTrue(mock_cli.run.call_args[0][0].startswith(
+            '/sbin/storcli64 /c0 add vd each type=r0 drives=32:0,1,5'))
+        self.assertRaises(storcli.StorcliException, s.add,
+                          *(0, 'r1', '32:0-1'), **{'each': True})
+
         with open(os.path.join(os.path.dirname(__file__),
                                '../resources/storcli_err.txt')) as fp:
             error_data = fp.read()
@@ -150,3 +156,52 @@ class StorcliTest(MercuryAgentUnitTest):
         s.add_hotspare(0, 32, 10, [0, 1, 2])
 
         s.run.assert_called_with('/c0/e32/s10 add hotsparedrive DGs=0,1,2')
+
+    @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
+    def test_get_event_log_info(self, mock_cli):
+        mock_cli.run.return_value = CLIResult('', '', 0)
+        mock_cli.find_in_path.return_value = '/sbin/storcli64'
+
+        s = storcli.Storcli()
+        s.run_json = mock.Mock()
+        s.run_json.return_value = {'Controllers': [
+            {'Response Data': {'Newest sequence number': 1042}}]}
+
+        self.assertEqual(s.get_event_log_info(),
+                         [{'Newest sequence number': 1042}])
+        s.run_json.assert_called_with('/call show eventloginfo')
+
+        s.run_json.return_value = {}
+        self.assertRaises(storcli.StorcliException, s.get_event_log_info)
+
+    @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
+    def test_get_inventory(self, mock_cli):
+        mock_cli.find_in_path.return_value = '/sbin/storcli64'
+
+        s = storcli.Storcli()
+        s.run_json = mock.Mock()
+
+        def disk_groups(controller_id):
+            return {'Command Status': {'Controller': controller_id,
+                                       'Status': 'Success'},
+                    'Response Data': {'Response Data': {'DG': controller_id}}}
+
+        outputs = {
+            '/call show all': {'Controllers': [
+                {'Response Data': {'Basics': {'Controller': 0}}},
+                {'Response Data': {'Basics': {'Controller': 1}}}]},
+            '/call/dall show all': {'Controllers': [disk_groups(1),
+                                                    disk_groups(0)]}
+        }
+        s.run_json.side_effect = lambda command: outputs[command]
+
+        self.assertEqual(
+            [(c['Basics']['Controller'], dg['DG'])
+             for c, dg in s.get_inventory()], [(0, 0), (1, 1)])
+        self.assertEqual(s.run_json.call_count, 2)
+
+        outputs['/call/dall show all']['Controllers'].pop()
+        self.assertRaises(storcli.StorcliException, s.get_inventory)
+
+        outputs['/call/dall show all'] = {}
+        self.assertRaises(storcli.StorcliException, s.get_inventory)
@@ -0,0 +1,100 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.backend_client"""
+
+import mock
+
+from mercury_agent import backend_client
+from tests.unit.base import MercuryAgentUnitTest
+
+MERCURY_ID = '0112426690d6f7ecb8c0d1ee1d0b3a2b9e5d8a1c4f'
+
+
+def update_payload(update, base_revision):
+    return {
+        'endpoint': 'update',
+        'args': [MERCURY_ID, update],
+        'kwargs': {'base_revision': base_revision,
+                   'inventory_revision': base_revision + 1}
+    }
+
+
+class TestInventoryUpdates(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestInventoryUpdates, self).setUp()
+        patch = mock.patch.object(backend_client, 'get_backend_client')
+        self.client = patch.start().return_value
+        self.client.transceiver.return_value = {'error': False}
+        self.addCleanup(patch.stop)
+
+        backend_client.set_inventory_baseline({
+            'mercury_id': MERCURY_ID,
+            'os_storage': [{'devname': 'sda', 'size': 1},
+                           {'devname': 'sdb', 'size': 2}]
+        })
+
+    def test_only_changes_are_sent(self):
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': [
+            {'devname': 'sda', 'size': 1}, {'devname': 'sdb', 'size': 3}]})
+        self.client.transceiver.assert_called_with(
+            update_payload({'os_storage.1.size': 3}, 0))
+
+        # The next update is computed against the acknowledged revision
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': [
+            {'devname': 'sda', 'size': 4}, {'devname': 'sdb', 'size': 3}]})
+        self.client.transceiver.assert_called_with(
+            update_payload({'os_storage.0.size': 4}, 1))
+
+    def test_unchanged(self):
+        self.assertIsNone(backend_client.update_inventory(MERCURY_ID, {
+            'os_storage': [{'devname': 'sda', 'size': 1},
+                           {'devname': 'sdb', 'size': 2}]}))
+        self.client.transceiver.assert_not_called()
+
+    def test_unknown_section_is_sent_whole(self):
+        backend_client.update_inventory(MERCURY_ID, {'raid': []})
+        self.client.transceiver.assert_called_with(
+            update_payload({'raid': []}, 0))
+
+    def test_failed_update_resends_section(self):
+        self.client.transceiver.return_value = {'error': True}
+        section = [{'devname': 'sda', 'size': 5}]
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': section})
+
+        self.client.transceiver.return_value = {'error': False}
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': section})
+        self.client.transceiver.assert_called_with(
+            update_payload({'os_storage': section}, 0))
+
+    def test_revision_mismatch_resends_sections_whole(self):
+        section = [{'devname': 'sda', 'size': 1},
+                   {'devname': 'sdb', 'size': 3}]
+        self.client.transceiver.side_effect = [
+            {'error': True, 'inventory_revision': 4},
+            {'error': False, 'inventory_revision': 5}
+        ]
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': section})
+        self.client.transceiver.assert_has_calls([
+            mock.call(update_payload({'os_storage.1.size': 3}, 0)),
+            mock.call(update_payload({'os_storage': section}, 4))
+        ])
+
+        # Later updates are computed against the resynchronized revision
+        self.client.transceiver.side_effect = None
+        section = [{'devname': 'sda', 'size': 2},
+                   {'devname': 'sdb', 'size': 3}]
+        backend_client.update_inventory(MERCURY_ID, {'os_storage': section})
+        self.client.transceiver.assert_called_with(
+            update_payload({'os_storage.0.size': 2}, 5))
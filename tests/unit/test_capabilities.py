@@ -14,6 +14,9 @@
 #    limitations under the License.
 """Unit tests for mercury_agent.capabilities"""
 
+import importlib
+import sys
+
 import mock
 
 from mercury_agent import capabilities
@@ -56,3 +59,52 @@ def test_capability(mock_add_capability):
                                                 dependency_callback=None,
                                                 timeout=1800,
                                                 task_id_kwargs=False)
+
+
+def test_lazy_capabilities_match_decorators():
+    """Test describe_capabilities() against the registered procedures"""
+    from mercury_agent.procedures import PROCEDURE_MODULES
+
+    described = {}
+    for module in PROCEDURE_MODULES:
+        for descriptor in capabilities.describe_capabilities(module):
+            described[descriptor['name']] = descriptor
+
+    registered = {}
+    with mock.patch.object(capabilities, 'runtime_capabilities', registered):
+        for module in PROCEDURE_MODULES:
+            importlib.reload(importlib.import_module(module))
+
+    assert sorted(described) == sorted(registered)
+    for name, capability in registered.items():
+        descriptor = described[name]
+        assert descriptor['entry'].__name__ == capability['entry'].__name__
+        callback = capability['dependency_callback']
+        if callback is None:
+            assert descriptor['dependency_callback'] is None
+        else:
+            assert descriptor['dependency_callback'].__name__ == \
+                callback.__name__
+        for key in ('description', 'doc', 'serial', 'num_args', 'kwarg_names',
+                    'no_return', 'timeout', 'task_id_kwargs'):
+            assert descriptor[key] == capability[key], (name, key)
+
+
+@mock.patch.dict('mercury_agent.capabilities.runtime_capabilities', clear=True)
+def test_add_lazy_capabilities():
+    """Test add_lazy_capabilities() imports modules on first call"""
+    module = 'mercury_agent.procedures.misc'
+    with mock.patch.dict(sys.modules):
+        sys.modules.pop(module, None)
+        capabilities.add_lazy_capabilities([module])
+        assert module not in sys.modules
+
+        entry = capabilities.runtime_capabilities['echo']['entry']
+        assert isinstance(entry, capabilities.LazyEntry)
+        assert entry.__name__ == 'echo'
+
+        entry('hello')
+        assert module in sys.modules
+        assert not isinstance(
+            capabilities.runtime_capabilities['echo']['entry'],
+            capabilities.LazyEntry)
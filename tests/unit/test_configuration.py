@@ -0,0 +1,105 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.configuration"""
+
+import functools
+import os
+import shutil
+import sys
+import tempfile
+
+import mock
+import yaml
+
+from mercury.common import configuration as common_configuration
+
+from mercury_agent import configuration
+from tests.unit.base import MercuryAgentUnitTest
+
+CONFIGURATION = """
+agent:
+  remote:
+    backend_url: tcp://mercury-backend:9002
+"""
+
+
+class TestConfiguration(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestConfiguration, self).setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        # PyYAML 5.1+ requires an explicit loader
+        patch = mock.patch.object(
+            common_configuration.yaml, 'load',
+            functools.partial(yaml.load, Loader=yaml.SafeLoader))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def load(self, text='', environ=None):
+        """ Scan options from a configuration file, as the agent does """
+        path = os.path.join(self.tmp, 'mercury-agent.yaml')
+        with open(path, 'w') as fp:
+            fp.write(CONFIGURATION + text)
+        with mock.patch.object(sys, 'argv', ['mercury-agent', '-c', path]), \
+                mock.patch.dict(os.environ, environ or {}):
+            return configuration.parse_options()
+
+    def test_defaults(self):
+        agent = self.load().agent
+        self.assertEqual(agent.hardware.raid.snapshot_ttl, 30)
+        inspector = agent.inspector
+        self.assertEqual(inspector.timeout, 300)
+        self.assertEqual(inspector.cache_path,
+                         '/run/mercury-agent/inspection.msgpack')
+        self.assertIs(inspector.watch, True)
+
+    def test_inspector_timeout(self):
+        self.assertEqual(self.load("""
+  inspector:
+    timeout: 60
+""").agent.inspector.timeout, 60)
+        self.assertIsNone(self.load("""
+  inspector:
+    timeout: disabled
+""").agent.inspector.timeout)
+        self.assertEqual(self.load(environ={
+            'AGENT_INSPECTOR_TIMEOUT': '30'}).agent.inspector.timeout, 30)
+
+    def test_inspection_cache_disabled(self):
+        self.assertIsNone(self.load("""
+  inspector:
+    cache_path: disabled
+""").agent.inspector.cache_path)
+        inspector = self.load(environ={
+            'MERCURY_INSPECTION_CACHE': 'disabled'}).agent.inspector
+        self.assertIsNone(inspector.cache_path)
+
+    def test_udev_watcher_disabled(self):
+        self.assertIs(self.load("""
+  inspector:
+    watch: disabled
+""").agent.inspector.watch, False)
+        self.assertIs(self.load(environ={
+            'AGENT_INSPECTOR_WATCH': 'false'}).agent.inspector.watch, False)
+
+    def test_raid_snapshots_disabled(self):
+        self.assertEqual(self.load("""
+  hardware:
+    raid:
+      snapshot_ttl: disabled
+""").agent.hardware.raid.snapshot_ttl, 0)
+        self.assertEqual(self.load(environ={
+            'AGENT_HARDWARE_RAID_SNAPSHOT_TTL': '5'
+        }).agent.hardware.raid.snapshot_ttl, 5)
@@ -0,0 +1,104 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Agent startup import budget, measured with python -X importtime"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.unit.base import MercuryAgentUnitTest
+
+# Cumulative import time of mercury_agent.agent, in milliseconds. Wall clock
+# limits are unreliable on shared runners, the budget is only checked when set
+IMPORT_BUDGET_MS = os.environ.get('MERCURY_IMPORT_BUDGET_MS')
+
+# Loaded by procedures, drivers, and inspectors once they are needed
+DEFERRED_MODULES = [
+    'lxml',
+    'pkg_resources',
+    'press',
+    'requests',
+    'mercury_agent.hardware.drivers.hp_raid',
+    'mercury_agent.hardware.drivers.megaraid',
+    'mercury_agent.hardware.drivers.obm',
+    'mercury_agent.hardware.raid.interfaces.hpssa',
+    'mercury_agent.procedures.dell_firmware',
+    'mercury_agent.procedures.hp_raid',
+    'mercury_agent.procedures.press_native'
+]
+
+
+# Registration checks the dependency callback of every capability
+REGISTRATION = """
+import sys
+from mercury_agent import agent, procedures, register
+from mercury_agent.capabilities import runtime_capabilities
+procedures.load_capabilities()
+register._serialize_capabilities(runtime_capabilities)
+print('\\n'.join(sys.modules))
+"""
+
+
+def is_deferred(name, modules):
+    return any(name == m or name.startswith(m + '.') for m in modules)
+
+
+def import_times(module):
+    """
+    :return: dictionary of imported module: cumulative microseconds
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(MercuryAgentUnitTest):
+    def setUp(self):
+        super(TestImportTime, self).setUp()
+        self.times = import_times('mercury_agent.agent')
+
+    def test_deferred_modules(self):
+        imported = [name for name in self.times
+                    if is_deferred(name, DEFERRED_MODULES)]
+        self.assertEqual(imported, [])
+
+    def test_registration_does_not_import_procedures(self):
+        from mercury_agent.procedures import PROCEDURE_MODULES
+
+        process = subprocess.run(
+            [sys.executable, '-c', REGISTRATION], stdout=subprocess.PIPE,
+            universal_newlines=True, check=True)
+        imported = [name for name in process.stdout.split()
+                    if is_deferred(name, DEFERRED_MODULES + PROCEDURE_MODULES)]
+        self.assertEqual(imported, [])
+
+    @pytest.mark.skipif(not IMPORT_BUDGET_MS,
+                        reason='set MERCURY_IMPORT_BUDGET_MS, ie 400')
+    def test_budget(self):
+        elapsed = self.times['mercury_agent.agent'] / 1000.0
+        self.assertLess(elapsed, float(IMPORT_BUDGET_MS),
+                        'importing mercury_agent.agent took {:.1f}ms'.format(
+                            elapsed))
@@ -0,0 +1,119 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.register"""
+
+import socket
+
+import mock
+
+from mercury.common.exceptions import MercuryCritical
+
+from mercury_agent import register
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.hwlib.test_route_table import ROUTES
+
+INTERFACES = [
+    {'devname': 'eth0',
+     'address_info': [{'addr': '10.0.0.5', 'netmask': '255.255.255.0',
+                       'broadcast': '10.0.0.255'},
+                      {'addr': '10.1.0.5', 'netmask': '255.255.255.0',
+                       'broadcast': '10.1.0.255'}],
+     'address_info_v6': [{'addr': 'fe80::1%eth0',
+                          'netmask': 'ffff:ffff:ffff:ffff::/64'},
+                         {'addr': '2001:db8::5',
+                          'netmask': 'ffff:ffff:ffff:ffff::/64'}]}
+]
+
+DEVICE_INFO = {'routes': ROUTES, 'interfaces': INTERFACES}
+
+
+def configuration(backend_url):
+    return {'agent': {'local_ip': None,
+                      'remote': {'backend_url': backend_url}}}
+
+
+def addrinfo(*addresses):
+    return [(socket.AF_INET6 if ':' in a else socket.AF_INET,
+             socket.SOCK_STREAM, 6, '', (a, 0)) for a in addresses]
+
+
+class TestGetDHCPIP(MercuryAgentUnitTest):
+    def get_dhcp_ip(self, backend_url, *addresses):
+        with mock.patch.object(register, 'get_configuration',
+                               return_value=configuration(backend_url)), \
+                mock.patch.object(register.socket, 'getaddrinfo',
+                                  return_value=addrinfo(*addresses)):
+            return register.get_dhcp_ip(DEVICE_INFO, method='routing_table')
+
+    def test_simple(self):
+        with mock.patch.object(register, 'get_configuration',
+                               return_value=configuration('tcp://x:9001')):
+            self.assertEqual(register.get_dhcp_ip(DEVICE_INFO), '10.0.0.5')
+
+    def test_route_source(self):
+        self.assertEqual(self.get_dhcp_ip('tcp://10.0.0.9:9001', '10.0.0.9'),
+                         '10.0.0.5')
+
+    def test_gateway_network(self):
+        # 172.16.4.0/24 is reached through 10.0.0.3, the route has no src
+        self.assertEqual(
+            self.get_dhcp_ip('tcp://mercury:9001', '172.16.4.20'),
+            '10.0.0.5')
+
+    def test_ipv6(self):
+        self.assertEqual(
+            self.get_dhcp_ip('tcp://[2001:db8:1::9]:9001', '2001:db8:1::9'),
+            '2001:db8::5')
+
+    def test_unreachable(self):
+        # The first address is blackholed, the second is routed
+        self.assertEqual(
+            self.get_dhcp_ip('tcp://mercury:9001', '192.168.1.1',
+                             '172.16.5.1'),
+            '10.0.0.5')
+        with self.assertRaises(MercuryCritical):
+            self.get_dhcp_ip('tcp://mercury:9001', '192.168.1.1')
+
+    def test_find_source_address(self):
+        table = register.RouteTable([
+            {'destination': 'default', 'via': '10.1.0.1', 'dev': 'eth0'}])
+
+        self.assertEqual(
+            register.find_source_address(table, INTERFACES, '8.8.8.8'),
+            ('10.1.0.5', 'eth0'))
+        self.assertEqual(
+            register.find_source_address(table, [], '8.8.8.8'),
+            (None, None))
+
+    def test_find_source_address_multipath(self):
+        # ECMP default routes only carry dev and via in their next hops
+        table = register.RouteTable([
+            {'destination': 'default', 'nexthops': [
+                {'dev': 'eth1', 'via': '10.2.0.1', 'weight': '1',
+                 'dead': True, 'linkdown': True},
+                {'dev': 'eth0', 'via': '10.1.0.1', 'weight': '1'}]}])
+
+        self.assertEqual(
+            register.find_source_address(table, INTERFACES, '8.8.8.8'),
+            ('10.1.0.5', 'eth0'))
+
+    def test_simple_ignores_ipv6_default(self):
+        device_info = dict(DEVICE_INFO, routes=[
+            {'destination': 'default', 'via': '2001:db8::1', 'dev': 'eth1'},
+            {'destination': 'default', 'via': '10.0.0.1', 'dev': 'eth0',
+             'metric': '100'}])
+        with mock.patch.object(register, 'get_configuration',
+                               return_value=configuration('tcp://x:9001')):
+            self.assertEqual(register.get_dhcp_ip(device_info), '10.0.0.5')